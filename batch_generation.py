@@ -0,0 +1,216 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Batch generation of large initial shape sets on a pool of worker processes.
+# PyPRT objects cannot be pickled, therefore the initial shapes are described by plain data
+# (see shape_data) and the generated models come back as BatchModel instances, which offer the
+# same getters as pyprt.GeneratedModel. Each worker initializes PRT and warms up the rule package once.
+#
+# generate_stream and BatchGenerator.generate_stream take an iterator of (initial shape, attributes)
+# pairs and lazily yield (initial shape index, model) pairs, only a bounded number of chunks is
+# held in memory at once. This allows processing arbitrarily large runs with constant memory.
+#
+# Example:
+#   with BatchGenerator(rpk, processes=4, chunk_size=1000) as batch_generator:
+#       models = batch_generator.generate(shapes, attrs)
+
+import os
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pyprt
+
+from rpk_cache import warm_up
+
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+
+
+def shape_data(vertices, indices=None, face_counts=None, holes=None):
+    # picklable description of an initial shape: either a file path or the arguments of pyprt.InitialShape
+    if isinstance(vertices, str):
+        return vertices
+    return (list(vertices), None if indices is None else list(indices),
+            None if face_counts is None else list(face_counts), holes)
+
+
+def make_initial_shape(data):
+    if isinstance(data, pyprt.InitialShape):
+        return data
+    if isinstance(data, str):
+        return pyprt.InitialShape(data)
+    vertices, indices, face_counts, holes = data
+    if indices is None:
+        return pyprt.InitialShape(vertices)
+    if holes is None:
+        return pyprt.InitialShape(vertices, indices, face_counts)
+    return pyprt.InitialShape(vertices, indices, face_counts, holes)
+
+
+def iter_chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def generate_stream(shapes_and_attributes, rpk, encoder_options=None, chunk_size=1000):
+    # in-process streaming generation with the PyEncoder
+    # shapes_and_attributes: iterable of (initial shape or shape_data, shape attribute dictionary)
+    # yields (initial shape index, pyprt.GeneratedModel), in input order
+    encoder_options = encoder_options if encoder_options else {}
+    first_shape_index = 0
+    for chunk in iter_chunks(shapes_and_attributes, chunk_size):
+        model_generator = pyprt.ModelGenerator([make_initial_shape(shape) for shape, _ in chunk])
+        models = model_generator.generate_model([attrs for _, attrs in chunk], rpk, PY_ENCODER, encoder_options)
+        for model in models:
+            if model:
+                yield first_shape_index + model.get_initial_shape_index(), model
+        first_shape_index += len(chunk)
+
+
+class BatchModel:
+    def __init__(self, model, initial_shape_index):
+        self.initial_shape_index = initial_shape_index
+        self.vertices = model.get_vertices()
+        self.indices = model.get_indices()
+        self.faces = model.get_faces()
+        self.report = model.get_report()
+        self.attributes = model.get_attributes()
+        self.cga_prints = model.get_cga_prints()
+        self.cga_errors = model.get_cga_errors()
+
+    def get_initial_shape_index(self):
+        return self.initial_shape_index
+
+    def get_vertices(self):
+        return self.vertices
+
+    def get_indices(self):
+        return self.indices
+
+    def get_faces(self):
+        return self.faces
+
+    def get_report(self):
+        return self.report
+
+    def get_attributes(self):
+        return self.attributes
+
+    def get_cga_prints(self):
+        return self.cga_prints
+
+    def get_cga_errors(self):
+        return self.cga_errors
+
+
+# state of a worker process
+_worker_rpk = None
+_worker_encoder = None
+_worker_encoder_options = None
+
+
+def _init_worker(rpk, encoder, encoder_options):
+    global _worker_rpk, _worker_encoder, _worker_encoder_options
+    _worker_rpk = rpk
+    _worker_encoder = encoder
+    _worker_encoder_options = encoder_options
+    warm_up(rpk)
+
+
+def _generate_chunk(chunk_index, first_shape_index, shapes, attributes):
+    encoder_options = dict(_worker_encoder_options)
+    if _worker_encoder != PY_ENCODER and 'baseName' in encoder_options:
+        # file based encoders: one output per chunk
+        encoder_options['baseName'] = f"{encoder_options['baseName']}_{chunk_index}"
+
+    model_generator = pyprt.ModelGenerator([make_initial_shape(shape) for shape in shapes])
+    models = model_generator.generate_model(attributes, _worker_rpk, _worker_encoder, encoder_options)
+    return chunk_index, [BatchModel(model, first_shape_index + model.get_initial_shape_index())
+                         for model in models if model]
+
+
+class BatchGenerator:
+    def __init__(self, rpk, encoder=PY_ENCODER, encoder_options=None, processes=None, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.processes = processes if processes else os.cpu_count()
+        # PRT does not survive a fork once initialized, the workers are started from scratch
+        self.executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker, initargs=(rpk, encoder, encoder_options if encoder_options else {}))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def chunks(self, shapes, attributes):
+        # as for generate_model, a single attribute dictionary applies to all initial shapes
+        for start in range(0, len(shapes), self.chunk_size):
+            end = min(start + self.chunk_size, len(shapes))
+            chunk_attributes = attributes if len(attributes) == 1 else attributes[start:end]
+            yield start, shapes[start:end], chunk_attributes
+
+    def generate(self, shapes, attributes, progress=None):
+        # shapes: list of shape_data, attributes: list of shape attribute dictionaries
+        # progress: optional callback(generated_shapes_count, shapes_count)
+        if len(attributes) != 1 and len(attributes) != len(shapes):
+            raise ValueError('Expected one shape attribute dictionary per initial shape or a single one for all.')
+
+        # future -> number of shapes in its chunk
+        futures = {}
+        for chunk_index, (start, chunk_shapes, chunk_attributes) in enumerate(self.chunks(shapes, attributes)):
+            future = self.executor.submit(_generate_chunk, chunk_index, start, chunk_shapes, chunk_attributes)
+            futures[future] = len(chunk_shapes)
+
+        chunk_results = [None] * len(futures)
+        generated_shapes = 0
+        for future in as_completed(futures):
+            chunk_index, chunk_models = future.result()
+            chunk_results[chunk_index] = chunk_models
+            generated_shapes += futures[future]
+            if progress:
+                progress(generated_shapes, len(shapes))
+
+        # merged back in input order
+        return [model for chunk_models in chunk_results for model in chunk_models]
+
+    def generate_stream(self, shapes_and_attributes, max_pending_chunks=None):
+        # shapes_and_attributes: iterable of (shape_data, shape attribute dictionary)
+        # yields (initial shape index, BatchModel) in input order, at most max_pending_chunks are in flight
+        max_pending_chunks = max_pending_chunks if max_pending_chunks else 2 * self.processes
+        pending = deque()
+        first_shape_index = 0
+        for chunk_index, chunk in enumerate(iter_chunks(shapes_and_attributes, self.chunk_size)):
+            if len(pending) >= max_pending_chunks:
+                yield from self.chunk_results(pending.popleft())
+            pending.append(self.executor.submit(_generate_chunk, chunk_index, first_shape_index,
+                                                [shape for shape, _ in chunk], [attrs for _, attrs in chunk]))
+            first_shape_index += len(chunk)
+        while pending:
+            yield from self.chunk_results(pending.popleft())
+
+    @staticmethod
+    def chunk_results(future):
+        _, chunk_models = future.result()
+        for model in chunk_models:
+            yield model.get_initial_shape_index(), model
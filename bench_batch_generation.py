@@ -0,0 +1,80 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Scaling benchmark of the batch generation (batch_generation.py) on synthetic parcels,
+# from 1 to N worker processes, compared to a single generate_model call.
+# Usage: python bench_batch_generation.py --shapes 2000 --processes 1 2 4 8
+
+import os
+import argparse
+import time
+
+import pyprt
+
+from batch_generation import BatchGenerator, make_initial_shape
+from synthetic_data import synthetic_attributes, synthetic_parcels
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling benchmark of the batch generation')
+    parser.add_argument('--rpks', help='rule packages from the data directory', type=str, nargs='+',
+                        default=['extrusion_rule.rpk', 'candler.rpk'])
+    parser.add_argument('--shapes', help='number of synthetic parcels', type=int, default=200)
+    parser.add_argument('--processes', help='worker process counts to benchmark', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count()} & set(range(1, os.cpu_count() + 1))))
+    parser.add_argument('--chunk_size', help='initial shapes per chunk', type=int, default=25)
+    # candler.rpk generates ~250k vertices per parcel, emitting the geometry quickly gets memory bound
+    parser.add_argument('--emit_geometry', help='also emit (and transfer back) the geometry', action='store_true')
+    args = parser.parse_args()
+
+    encoder_options = {'emitGeometry': args.emit_geometry, 'emitReport': True}
+    shapes = synthetic_parcels(args.shapes)
+
+    for rpk_name in args.rpks:
+        rpk = asset_file(rpk_name)
+        attrs = synthetic_attributes(rpk_name, args.shapes)
+
+        start = time.perf_counter()
+        model_generator = pyprt.ModelGenerator([make_initial_shape(shape) for shape in shapes])
+        models = model_generator.generate_model(attrs, rpk, 'com.esri.pyprt.PyEncoder', encoder_options)
+        t_single = time.perf_counter() - start
+        assert len(models) == args.shapes
+
+        print(f'\n{rpk_name}, {args.shapes} shapes, chunks of {args.chunk_size}')
+        print(f"{'processes':>10} {'time [s]':>10} {'shapes/s':>10} {'speedup':>8}")
+        print(f"{'single':>10} {t_single:>10.2f} {args.shapes / t_single:>10.1f} {1.0:>7.2f}x")
+
+        for processes in args.processes:
+            with BatchGenerator(rpk, encoder_options=encoder_options, processes=processes,
+                                chunk_size=args.chunk_size) as batch_generator:
+                # warm up the worker processes (PRT initialization, rule package loading)
+                batch_generator.generate(shapes[:processes], attrs[:processes])
+
+                start = time.perf_counter()
+                batch_models = batch_generator.generate(shapes, attrs)
+                t_batch = time.perf_counter() - start
+
+            assert [m.get_initial_shape_index() for m in batch_models] == list(range(args.shapes))
+            print(f'{processes:>10} {t_batch:>10.2f} {args.shapes / t_batch:>10.1f} {t_single / t_batch:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark suite of the workloads of examples 1 to 4 and 6, each one over growing numbers of
+# synthetic parcels. The results are written to JSON together with the PyPRT and Python versions,
+# so that the runs of different PyPRT builds can be compared (see test_venv.py --benchmark_output).
+# Usage:
+#   python bench_examples.py --shapes 1 10 100 --output pyprt_a.json
+#   python bench_examples.py --shapes 1 10 100 --output pyprt_b.json --compare pyprt_a.json
+
+import os
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pyprt
+
+from synthetic_data import synthetic_parcels
+from batch_generation import make_initial_shape
+from mesh_batching import merge_models, model_vertex_colors
+from model_geometry import ModelGeometry
+from scene_culling import model_bounds
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def parcels(shapes_count):
+    return [make_initial_shape(shape) for shape in synthetic_parcels(shapes_count)]
+
+
+# Each workload prepares its data for a number of shapes and returns the function to measure.
+
+def ex1_geometry_and_report(shapes_count, output_dir):
+    model_generator = pyprt.ModelGenerator(parcels(shapes_count))
+    return lambda: model_generator.generate_model(
+        [{}], asset_file('extrusion_rule.rpk'), PY_ENCODER, {'emitGeometry': True, 'emitReport': True})
+
+
+def ex1_geometry(shapes_count, output_dir):
+    model_generator = pyprt.ModelGenerator(parcels(shapes_count))
+    return lambda: model_generator.generate_model(
+        [{}], asset_file('extrusion_rule.rpk'), PY_ENCODER, {'emitGeometry': True, 'emitReport': False})
+
+
+def ex1_report(shapes_count, output_dir):
+    model_generator = pyprt.ModelGenerator(parcels(shapes_count))
+    return lambda: model_generator.generate_model(
+        [{}], asset_file('extrusion_rule.rpk'), PY_ENCODER, {'emitGeometry': False, 'emitReport': True})
+
+
+def ex2_obj_initial_shape(shapes_count, output_dir):
+    # the OBJ file is read when the initial shapes are created and generated
+    def run():
+        initial_shapes = [pyprt.InitialShape(asset_file('building_parcel.obj')) for _ in range(shapes_count)]
+        return pyprt.ModelGenerator(initial_shapes).generate_model(
+            [{}], asset_file('extrusion_rule.rpk'), PY_ENCODER, {})
+    return run
+
+
+def ex3_obj_export(shapes_count, output_dir):
+    model_generator = pyprt.ModelGenerator(parcels(shapes_count))
+    return lambda: model_generator.generate_model(
+        [{}], asset_file('candler.rpk'), 'com.esri.prt.codecs.OBJEncoder', {'outputPath': output_dir})
+
+
+def ex4_multi_generations(shapes_count, output_dir):
+    # a generation with attributes per shape followed by a generation with the same attributes for all the shapes
+    model_generator = pyprt.ModelGenerator(parcels(shapes_count))
+    attrs = [{'minBuildingHeight': 10.0 + k % 20} for k in range(shapes_count)]
+
+    def run():
+        model_generator.generate_model(attrs, asset_file('extrusion_rule.rpk'), PY_ENCODER, {})
+        return model_generator.generate_model([{'text': 'hello'}], asset_file('extrusion_rule.rpk'), PY_ENCODER, {})
+    return run
+
+
+def ex6_mesh_preparation(shapes_count, output_dir):
+    # from the generated models to the merged buffers of example 6, without rendering
+    models = pyprt.ModelGenerator(parcels(shapes_count)).generate_model(
+        [{}], asset_file('extrusion_rule.rpk'), PY_ENCODER, {'emitReport': False})
+
+    def run():
+        geometries = [ModelGeometry.from_model(model) for model in models if model]
+        vertices, faces, model_ids = merge_models([geometry.vertices[:, [0, 2, 1]] for geometry in geometries],
+                                                  [geometry.triangles() for geometry in geometries])
+        colors = model_vertex_colors(model_ids, [[0.5, 0.5, 0.5, 1.0], [0.8, 0.8, 0.8, 1.0]])
+        return vertices, faces, colors, model_bounds(vertices, model_ids)
+    return run
+
+
+WORKLOADS = {
+    'ex1_geometry_and_report': ex1_geometry_and_report,
+    'ex1_geometry': ex1_geometry,
+    'ex1_report': ex1_report,
+    'ex2_obj_initial_shape': ex2_obj_initial_shape,
+    'ex3_obj_export': ex3_obj_export,
+    'ex4_multi_generations': ex4_multi_generations,
+    'ex6_mesh_preparation': ex6_mesh_preparation
+}
+
+
+def measure(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def environment():
+    return {
+        'pyprtVersion': pyprt.get_api_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor()
+    }
+
+
+def compare(results, baseline_path, threshold):
+    # ratio of the best times to the baseline, returns the number of regressions above threshold
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    baseline_times = {(result['workload'], result['shapes']): result['best'] for result in baseline['results']}
+
+    print(f"\nCompared to {baseline_path} (PyPRT {baseline['environment']['pyprtVersion']}):")
+    print(f"{'workload':>24} {'shapes':>7} {'baseline [s]':>13} {'best [s]':>9} {'ratio':>6}")
+    regressions = 0
+    for result in results:
+        baseline_best = baseline_times.get((result['workload'], result['shapes']))
+        if baseline_best is None:
+            continue
+        ratio = result['best'] / baseline_best
+        flag = ' regression' if ratio > threshold else ''
+        regressions += ratio > threshold
+        print(f"{result['workload']:>24} {result['shapes']:>7} {baseline_best:>13.4f} {result['best']:>9.4f}"
+              f" {ratio:>6.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite of the example workloads')
+    parser.add_argument('--shapes', help='numbers of shapes of each workload', type=int, nargs='+',
+                        default=[1, 10, 100])
+    parser.add_argument('--workloads', help='workloads to run (default: all)', type=str, nargs='+',
+                        choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument('--repeat', help='measures per workload and number of shapes', type=int, default=5)
+    parser.add_argument('--output', help='JSON file of the results', type=str)
+    parser.add_argument('--compare', help='JSON file of baseline results to compare with', type=str)
+    parser.add_argument('--threshold', help='ratio to the baseline reported as regression', type=float,
+                        default=1.1)
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'workload':>24} {'shapes':>7} {'best [s]':>9} {'median [s]':>11} {'per shape [ms]':>15}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in args.workloads:
+            for shapes_count in args.shapes:
+                run = WORKLOADS[name](shapes_count, output_dir)
+                # the first call initializes PRT and loads the rule package
+                run()
+                times = measure(run, args.repeat)
+                best = min(times)
+                results.append({'workload': name, 'shapes': shapes_count, 'best': best,
+                                'median': statistics.median(times), 'times': times})
+                print(f'{name:>24} {shapes_count:>7} {best:>9.4f} {statistics.median(times):>11.4f}'
+                      f' {best / shapes_count * 1000:>15.3f}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'repeat': args.repeat, 'results': results}, f, indent=1)
+        print(f'\nResults written to {args.output}')
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions > 0:
+            sys.exit(f'{regressions} regression(s) above {args.threshold:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of the bulk conversion of polygon features (feature_shapes.py) against the feature by
+# feature conversion of arcgis_to_pyprt and the attribute dictionaries built row by row (example 10),
+# on synthetic polygon features stored in a GeoArrow table.
+# Usage: python bench_feature_shapes.py --features 10000 100000
+
+import argparse
+import time
+
+import numpy as np
+
+from feature_shapes import initial_shapes_from_arrow, shape_attributes
+import pyprt
+from synthetic_data import synthetic_features
+
+
+def convert_legacy(table):
+    # the steps of arcgis_to_pyprt and of the attribute loop of example 10, feature by feature
+    initial_shapes = []
+    attrs = []
+    for feature in table.to_pylist():
+        vert_coord_list = []
+        face_count_list = []
+        for coord_part in feature['geometry']:
+            coord_part = np.array([[point['x'], point['y']] for point in coord_part])
+            coord_inverse = np.flip(coord_part[:-1], axis=0)
+            coord_inverse[:, 1] *= -1
+            coord_fin = np.insert(coord_inverse, 1, 0, axis=1).reshape(1, -1)
+            vert_coord_list.extend(coord_fin[0])
+            face_count_list.append(len(coord_fin[0]) // 3)
+        face_indices_list = list(range(0, sum(face_count_list)))
+        initial_shapes.append(pyprt.InitialShape(vert_coord_list, face_indices_list, face_count_list, [[0]]))
+        attrs.append({
+            'populationDensityMode': 'linear',
+            'population': float(feature['TOTPOP_CY']),
+            'area': float(feature['AREA'])
+        })
+    return initial_shapes, attrs
+
+
+def convert_bulk(table):
+    initial_shapes, feature_indices = initial_shapes_from_arrow(table.column('geometry'))
+    attrs = shape_attributes({'population': table.column('TOTPOP_CY').to_numpy(), 'area': table.column('AREA').to_numpy()},
+                             feature_indices, {'populationDensityMode': 'linear'})
+    return initial_shapes, attrs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the bulk conversion of polygon features')
+    parser.add_argument('--features', help='feature counts to benchmark', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'features':>10} {'legacy [s]':>11} {'bulk [s]':>9} {'speedup':>8}")
+    for features_count in args.features:
+        table = synthetic_features(features_count)
+
+        start = time.perf_counter()
+        legacy_shapes, legacy_attrs = convert_legacy(table)
+        t_legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bulk_shapes, bulk_attrs = convert_bulk(table)
+        t_bulk = time.perf_counter() - start
+
+        assert len(bulk_shapes) == len(legacy_shapes) and bulk_attrs == legacy_attrs
+        assert [s.get_vertex_count() for s in bulk_shapes] == [s.get_vertex_count() for s in legacy_shapes]
+        print(f'{features_count:>10} {t_legacy:>11.2f} {t_bulk:>9.2f} {t_legacy / t_bulk:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
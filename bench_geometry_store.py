@@ -0,0 +1,102 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of geometry_store.py: getting the geometry and the reports of generated models again, by
+# generating them again with the PyEncoder, by exporting them with the OBJ encoder and parsing the file
+# (obj_loader.read_obj, without the reports) or by loading them from a geometry store.
+# The load of the store includes the ModelGeometry of every model and the sum of a report column.
+# Usage: python bench_geometry_store.py --shapes 1000 10000 100000 --rpk extrusion_rule.rpk
+
+import os
+import glob
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pyprt
+
+from batch_generation import make_initial_shape
+from synthetic_data import synthetic_parcels
+from geometry_store import GeometryStore, GeometryStoreWriter
+from obj_loader import read_obj
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+OBJ_ENCODER = 'com.esri.prt.codecs.OBJEncoder'
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, filename)) for filename in os.listdir(path))
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def load_store(store_dir):
+    store = GeometryStore(store_dir)
+    geometries = [store.model(k) for k in range(len(store))]
+    report_names = store.meta['numericReports']
+    if report_names:
+        np.nansum(store.report_column(report_names[0]))
+    return geometries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the geometry store')
+    parser.add_argument('--shapes', help='numbers of parcels', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--rpk', help='rule package of the data folder', type=str, default='extrusion_rule.rpk')
+    args = parser.parse_args()
+
+    rpk = asset_file(args.rpk)
+    print(f"{'shapes':>7} {'vertices':>10} {'generate [s]':>13} {'obj export [s]':>15} {'obj load [s]':>13}"
+          f" {'obj [MB]':>9} {'store write [s]':>16} {'store load [s]':>15} {'store [MB]':>11}")
+    for shapes_count in args.shapes:
+        initial_shapes = [make_initial_shape(shape) for shape in synthetic_parcels(shapes_count)]
+        model_generator = pyprt.ModelGenerator(initial_shapes)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            models, t_generate = timed(lambda: model_generator.generate_model([{}], rpk, PY_ENCODER, {}))
+
+            obj_options = {'outputPath': temp_dir, 'baseName': 'models'}
+            _, t_obj_export = timed(lambda: model_generator.generate_model([{}], rpk, OBJ_ENCODER, obj_options))
+            # the encoder splits large outputs into models_0.obj, models_1.obj...
+            obj_paths = sorted(glob.glob(os.path.join(temp_dir, 'models_*.obj')))
+            _, t_obj_load = timed(lambda: [read_obj(obj_path) for obj_path in obj_paths])
+            obj_size = sum(os.path.getsize(obj_path) for obj_path in obj_paths)
+
+            store_dir = os.path.join(temp_dir, 'store')
+
+            def write_store():
+                with GeometryStoreWriter(store_dir) as writer:
+                    writer.append(models)
+            _, t_store_write = timed(write_store)
+            geometries, t_store_load = timed(lambda: load_store(store_dir))
+            vertices_count = sum(geometry.vertex_count for geometry in geometries)
+            del geometries
+
+            print(f'{shapes_count:>7} {vertices_count:>10} {t_generate:>13.3f} {t_obj_export:>15.3f} {t_obj_load:>13.3f}'
+                  f' {obj_size / 1e6:>9.2f} {t_store_write:>16.3f} {t_store_load:>15.3f}'
+                  f' {directory_size(store_dir) / 1e6:>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
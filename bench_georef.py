@@ -0,0 +1,84 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Micro-benchmark of the NumPy georeferencing (georef.py) against the former
+# pure Python implementation of example 9.
+# Usage: python bench_georef.py --vertices 1000 100000 1000000
+
+import argparse
+import timeit
+
+import numpy as np
+
+from georef import georef_shift_vertices
+
+
+def georef_shift_vertices_legacy(model_vertices, x_coord_goal, y_coord_goal, z_coord_goal):
+    shifted_vertices = model_vertices.copy()
+
+    # Bounding box
+    min_y_value = min(model_vertices[1::3])
+    mod_x_values = model_vertices[0::3]
+    center_x_value = (max(mod_x_values)+min(mod_x_values))/2.0
+    mod_z_values = model_vertices[2::3]
+    center_z_value = (max(mod_z_values)+min(mod_z_values))/2.0
+
+    # Offset the initial shape at the right location
+    shifted_vertices[0::3] = [a-center_x_value +
+                              x_coord_goal for a in shifted_vertices[0::3]]
+    shifted_vertices[1::3] = [
+        a-min_y_value+z_coord_goal for a in shifted_vertices[1::3]]
+    shifted_vertices[2::3] = [a-center_z_value -
+                              y_coord_goal for a in shifted_vertices[2::3]]
+
+    return shifted_vertices
+
+
+def make_vertices(vertices_count, seed=0):
+    # same type as GeneratedModel.get_vertices(): a flat list of floats
+    rng = np.random.default_rng(seed)
+    return (rng.random(vertices_count * 3) * 100.0).tolist()
+
+
+def best_time(fct, repeat):
+    return min(timeit.repeat(fct, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the example 9 georeferencing')
+    parser.add_argument('--vertices', help='vertex counts to benchmark', type=int, nargs='+',
+                        default=[1000, 100000, 1000000])
+    parser.add_argument('--repeat', help='number of repetitions (best time is reported)', type=int, default=3)
+    args = parser.parse_args()
+
+    goal = (950654.3290831866, 6004190.025580572, 411.0)
+
+    print(f"{'vertices':>10} {'legacy [s]':>12} {'numpy [s]':>12} {'numpy, preallocated [s]':>24} {'speedup':>8}")
+    for vertices_count in args.vertices:
+        vertices = make_vertices(vertices_count)
+        buffer = np.empty(len(vertices), dtype=np.float64)
+
+        expected = georef_shift_vertices_legacy(vertices, *goal)
+        assert np.allclose(georef_shift_vertices(vertices, *goal), expected)
+
+        t_legacy = best_time(lambda: georef_shift_vertices_legacy(vertices, *goal), args.repeat)
+        t_numpy = best_time(lambda: georef_shift_vertices(vertices, *goal), args.repeat)
+        t_prealloc = best_time(lambda: georef_shift_vertices(vertices, *goal, out=buffer), args.repeat)
+
+        print(f'{vertices_count:>10} {t_legacy:>12.4f} {t_numpy:>12.4f} {t_prealloc:>24.4f} {t_legacy / t_numpy:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of the incremental regeneration of example 10 (incremental_generation.py) on a local portal:
+# full generation, then incremental updates with an empty cache, without changes and after changing the
+# attributes of a fraction of the features (the package is then generated again from all the features).
+# Usage: python bench_incremental_generation.py --features 1000 --changed 0.01 0.1 --rpk candler.rpk
+
+import os
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+
+import numpy as np
+import pyarrow
+import pyarrow.parquet
+
+import ex10_update_scene_layer_package as ex10
+from bench_portal_pipeline import seed_portal
+from incremental_generation import IncrementalGenerator
+
+
+def change_features(portal, fraction, seed):
+    # changes the population of a fraction of the features
+    path = os.path.join(portal.features_dir, f'{ex10.SOURCE_FEATURE_LAYER_ID}.parquet')
+    table = pyarrow.parquet.read_table(path)
+    population = table.column('TOTPOP_CY').to_numpy().copy()
+    changed = np.random.default_rng(seed).choice(len(population), max(1, int(fraction * len(population))),
+                                                 replace=False)
+    population[changed] += 1
+    table = table.set_column(table.schema.get_field_index('TOTPOP_CY'), 'TOTPOP_CY', pyarrow.array(population))
+    pyarrow.parquet.write_table(table, path)
+
+
+def run(portal, target_id, cache_dir):
+    feature_cache = IncrementalGenerator(cache_dir) if cache_dir else None
+    with contextlib.redirect_stdout(io.StringIO()):
+        target_id, timings = ex10.update_scene_layer(portal, target_id, feature_cache=feature_cache)
+    stats = feature_cache.stats() if feature_cache else {'regenerated': '-', 'changed': '-', 'skipped': '-'}
+    return target_id, timings, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the incremental regeneration of example 10')
+    parser.add_argument('--features', help='feature counts to benchmark', type=int, nargs='+', default=[1000])
+    parser.add_argument('--changed', help='fractions of changed features', type=float, nargs='+',
+                        default=[0.01, 0.1])
+    parser.add_argument('--rpk', help='rule package of the data directory', type=str, default='extrusion_rule.rpk')
+    args = parser.parse_args()
+
+    print(f"{'features':>10} {'run':>16} {'regenerated':>12} {'changed':>8} {'skipped':>8} {'generate [s]':>13}"
+          f" {'total [s]':>10}")
+    for features_count in args.features:
+        with tempfile.TemporaryDirectory() as root_dir:
+            portal = seed_portal(root_dir, features_count, 0.0)
+            shutil.copyfile(ex10.SCRIPT_DIR / 'data' / args.rpk,
+                            os.path.join(portal.rule_packages_dir, f'{ex10.RULE_PACKAGE_ITEM_ID}.rpk'))
+            cache_dir = os.path.join(root_dir, 'feature_cache')
+
+            # (run, feature cache, fraction of the features changed before the run)
+            runs = [('full', None, 0.0), ('incremental cold', cache_dir, 0.0), ('unchanged', cache_dir, 0.0)]
+            runs += [(f'{fraction:.0%} changed', cache_dir, fraction) for fraction in args.changed]
+            target_id = '0'
+            for k, (name, run_cache_dir, fraction) in enumerate(runs):
+                if fraction > 0.0:
+                    change_features(portal, fraction, seed=k)
+                target_id, timings, stats = run(portal, target_id, run_cache_dir)
+                total = sum(timings.values())
+                print(f"{features_count:>10} {name:>16} {stats['regenerated']:>12} {stats['changed']:>8}"
+                      f" {stats['skipped']:>8} {timings.get('generate', 0.0):>13.2f} {total:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
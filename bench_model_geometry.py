@@ -0,0 +1,99 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of the NumPy geometry access (model_geometry.py) against the pyprt_utils conversions
+# to lists of lists: time and additional memory per million vertices, on candler.rpk buildings.
+# Usage: python bench_model_geometry.py --buildings 4 16
+
+import os
+import argparse
+import timeit
+import tracemalloc
+
+import numpy as np
+import pyprt
+from pyprt.pyprt_utils import vertices_vector_to_matrix, faces_indices_vectors_to_matrix
+
+from batch_generation import make_initial_shape
+from synthetic_data import synthetic_parcels
+from model_geometry import ModelGeometry
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def generate_buildings(buildings_count):
+    shapes = [make_initial_shape(shape) for shape in synthetic_parcels(buildings_count)]
+    return pyprt.ModelGenerator(shapes).generate_model(
+        [{'BuildingHeight': 100.0}], asset_file('candler.rpk'), 'com.esri.pyprt.PyEncoder', {'emitReport': False})
+
+
+def convert_legacy(model_lists):
+    return [(vertices_vector_to_matrix(vertices), faces_indices_vectors_to_matrix(indices, face_counts))
+            for vertices, indices, face_counts in model_lists]
+
+
+def convert_numpy(model_lists):
+    return [ModelGeometry(vertices, indices, face_counts) for vertices, indices, face_counts in model_lists]
+
+
+def peak_memory(fct):
+    # peak of the memory allocated by fct, the result is kept alive until the end of the measure
+    tracemalloc.start()
+    result = fct()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def best_time(fct, repeat):
+    return min(timeit.repeat(fct, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the NumPy geometry access')
+    parser.add_argument('--buildings', help='candler.rpk building counts to benchmark', type=int, nargs='+',
+                        default=[4, 16])
+    parser.add_argument('--repeat', help='number of repetitions (best time is reported)', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'buildings':>10} {'vertices':>10} {'legacy [s/M]':>13} {'numpy [s/M]':>12} {'speedup':>8}"
+          f" {'legacy [MB/M]':>14} {'numpy [MB/M]':>13}")
+    for buildings_count in args.buildings:
+        models = generate_buildings(buildings_count)
+        # the lists returned by the GeneratedModel getters, converted by both implementations
+        model_lists = [(model.get_vertices(), model.get_indices(), model.get_faces()) for model in models]
+        vertices_count = sum(len(vertices) // 3 for vertices, _, _ in model_lists)
+        millions = vertices_count / 1e6
+
+        for (legacy_vertices, legacy_faces), geometry in zip(convert_legacy(model_lists), convert_numpy(model_lists)):
+            assert np.array_equal(np.array(legacy_vertices), geometry.vertices)
+            assert all(np.array_equal(face, geometry.face(k)) for k, face in enumerate(legacy_faces))
+
+        t_legacy = best_time(lambda: convert_legacy(model_lists), args.repeat)
+        t_numpy = best_time(lambda: convert_numpy(model_lists), args.repeat)
+        m_legacy = peak_memory(lambda: convert_legacy(model_lists))
+        m_numpy = peak_memory(lambda: convert_numpy(model_lists))
+
+        print(f'{buildings_count:>10} {vertices_count:>10} {t_legacy / millions:>13.3f} {t_numpy / millions:>12.3f}'
+              f' {t_legacy / t_numpy:>7.1f}x {m_legacy / 1e6 / millions:>14.1f} {m_numpy / 1e6 / millions:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of multi_encoding.generate_many on synthetic parcels: PyEncoder geometry and report,
+# PyEncoder geometry only and file outputs (OBJ, glTF, I3S), generated with one call per output (a rule
+# evaluation each) and with generate_many.
+# Usage: python bench_multi_encoding.py --rpks candler.rpk extrusion_rule.rpk --shapes 10 --encoders obj gltf
+
+import os
+import argparse
+import tempfile
+import time
+
+import pyprt
+
+from batch_generation import make_initial_shape
+from synthetic_data import synthetic_attributes, synthetic_parcels
+from multi_encoding import PY_ENCODER, generate_many
+from rpk_cache import warm_up
+from slpk_conversion import SLPK_ENCODER, slpk_encoder_options
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+FILE_ENCODERS = {
+    'obj': lambda output_dir: ('com.esri.prt.codecs.OBJEncoder', {'outputPath': output_dir}),
+    'gltf': lambda output_dir: ('com.esri.prt.codecs.GLTFEncoder', {'outputPath': output_dir}),
+    'i3s': lambda output_dir: (SLPK_ENCODER, slpk_encoder_options('layer', output_dir))
+}
+
+
+def outputs(output_dir, file_encoders):
+    return [
+        (PY_ENCODER, {'emitGeometry': True, 'emitReport': True}),
+        (PY_ENCODER, {'emitGeometry': True, 'emitReport': False})
+    ] + [FILE_ENCODERS[name](output_dir) for name in file_encoders]
+
+
+def generate_separately(initial_shapes, attrs, rpk, outputs):
+    # one generate_model call per output
+    model_generator = pyprt.ModelGenerator(initial_shapes)
+    for encoder, encoder_options in outputs:
+        model_generator.generate_model(attrs, rpk, encoder, encoder_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the multi-encoder generation')
+    parser.add_argument('--rpks', help='rule packages of the data directory', type=str, nargs='+',
+                        default=['candler.rpk', 'extrusion_rule.rpk'])
+    parser.add_argument('--shapes', help='number of synthetic parcels', type=int, default=10)
+    parser.add_argument('--encoders', help='file encoders besides the two PyEncoder outputs', type=str, nargs='+',
+                        choices=list(FILE_ENCODERS), default=['obj', 'gltf'])
+    args = parser.parse_args()
+
+    initial_shapes = [make_initial_shape(shape) for shape in synthetic_parcels(args.shapes)]
+    runs = {
+        'separate calls': lambda attrs, rpk, run_outputs: generate_separately(initial_shapes, attrs, rpk, run_outputs),
+        'shared passes': lambda attrs, rpk, run_outputs: generate_many(initial_shapes, attrs, rpk, run_outputs)
+    }
+
+    print(f"{'rpk':>20} {'shapes':>7} {'run':>18} {'time [s]':>9} {'saved [s]':>10}")
+    for rpk_name in args.rpks:
+        rpk = asset_file(rpk_name)
+        attrs = synthetic_attributes(rpk_name, args.shapes)
+        warm_up(rpk)
+        t_separate = None
+        for name, run in runs.items():
+            with tempfile.TemporaryDirectory() as output_dir:
+                start = time.perf_counter()
+                run(attrs, rpk, outputs(output_dir, args.encoders))
+                duration = time.perf_counter() - start
+            t_separate = t_separate if t_separate is not None else duration
+            print(f'{rpk_name:>20} {args.shapes:>7} {name:>18} {duration:>9.2f} {t_separate - duration:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of obj_loader.py against pyprt.InitialShape(obj_path) on building_parcel.obj and on synthetic
+# grid meshes. PRT reads an OBJ file during the generation, each path is therefore measured with a
+# generation (noRule.rpk, geometry only) and the load time is the difference to the generation of an
+# already built initial shape. The geometry of each loader is checked against the path constructor,
+# also on a copy of building_parcel.obj with indented records and trailing comments.
+# Usage: python bench_obj_loader.py --vertices 10000 1000000 --repeat 3
+
+import os
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pyprt
+
+from obj_loader import ObjShapeCache, make_initial_shape, read_obj
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def write_grid_obj(obj_path, vertices_count):
+    # square grid of quads in the xz plane
+    side = max(2, int(round(vertices_count ** 0.5)))
+    x, z = np.meshgrid(np.arange(side, dtype=np.float64), np.arange(side, dtype=np.float64))
+    vertices = np.column_stack([x.ravel(), np.zeros(side * side), z.ravel()])
+    corners = np.arange(side * side).reshape(side, side)[:-1, :-1].ravel() + 1
+    faces = np.column_stack([corners, corners + side, corners + side + 1, corners + 1])
+    with open(obj_path, 'w') as obj_file:
+        np.savetxt(obj_file, vertices, fmt='v %.3f %.3f %.3f')
+        np.savetxt(obj_file, faces, fmt='f %d %d %d %d')
+
+
+def write_commented_obj(source_path, obj_path):
+    # indented records with a trailing comment, CRLF line endings
+    with open(source_path, 'r') as source_file, open(obj_path, 'w', newline='') as obj_file:
+        for line in source_file.read().splitlines():
+            obj_file.write(f'  {line} # comment\r\n' if line and not line.startswith('#') else f'{line}\r\n')
+
+
+def face_coordinates(model):
+    # the path constructor numbers the vertices in the order of their first use
+    return np.asarray(model.get_vertices()).reshape(-1, 3)[model.get_indices()], model.get_faces()
+
+
+def best_time(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the OBJ loader')
+    parser.add_argument('--vertices', help='vertex counts of the synthetic OBJ files', type=int, nargs='+',
+                        default=[10000, 1000000])
+    parser.add_argument('--repeat', help='measures per loader', type=int, default=3)
+    args = parser.parse_args()
+
+    rpk = asset_file('noRule.rpk')
+
+    def generate(initial_shape):
+        return pyprt.ModelGenerator([initial_shape]).generate_model([{}], rpk, PY_ENCODER, {'emitReport': False})[0]
+
+    print(f"{'file':>24} {'size [MB]':>10} {'generate [s]':>13} {'path [s]':>9} {'read_obj [s]':>13}"
+          f" {'npz cache [s]':>14} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        obj_files = [asset_file('building_parcel.obj'), os.path.join(temp_dir, 'commented_parcel.obj')]
+        write_commented_obj(obj_files[0], obj_files[1])
+        for vertices_count in args.vertices:
+            obj_files.append(os.path.join(temp_dir, f'grid_{vertices_count}.obj'))
+            write_grid_obj(obj_files[-1], vertices_count)
+
+        obj_cache = ObjShapeCache(os.path.join(temp_dir, 'obj_cache'))
+        for obj_path in obj_files:
+            parsed = read_obj(obj_path)
+            coordinates, faces = face_coordinates(generate(make_initial_shape(*parsed)))
+            path_coordinates, path_faces = face_coordinates(generate(pyprt.InitialShape(obj_path)))
+            assert np.array_equal(coordinates, path_coordinates) and faces == path_faces
+            del coordinates, path_coordinates
+            obj_cache.load(obj_path)
+
+            prebuilt_shape = make_initial_shape(*parsed)
+            t_generate = best_time(lambda: generate(prebuilt_shape), args.repeat)
+            t_path = best_time(lambda: generate(pyprt.InitialShape(obj_path)), args.repeat) - t_generate
+            t_read = best_time(lambda: generate(make_initial_shape(*read_obj(obj_path))), args.repeat) - t_generate
+            t_cache = best_time(lambda: generate(obj_cache.initial_shape(obj_path)), args.repeat) - t_generate
+            print(f'{os.path.basename(obj_path):>24} {os.path.getsize(obj_path) / 1e6:>10.2f} {t_generate:>13.3f}'
+                  f' {t_path:>9.3f} {t_read:>13.3f} {t_cache:>14.3f} {t_path / max(t_cache, 1e-6):>7.1f}x')
+        print(f'cache: {obj_cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Time to convergence of the example 7 optimizations (parallel_objective.py): serial evaluation,
+# evaluation on 1 to N worker processes and vectorized evaluation, for the green area objective and
+# the weighted green and floor area objective.
+# Usage: python bench_optimization.py --processes 1 2 4 8
+
+import os
+import argparse
+import time
+
+from scipy import optimize
+
+from parallel_objective import ParallelMap, ReportObjective
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def make_problems(rpk, parcel_path):
+    # same problems as in example 7
+    green = ReportObjective(parcel_path, rpk, {'report_but_not_display_green': True, 'seed': 666},
+                            ['lot_coverage_parameter', 'height_first_tier', 'shape_of_building'],
+                            {'Greenery Area_sum': 1.0}, integer_attrs=['shape_of_building'])
+    green_floor = ReportObjective(parcel_path, rpk,
+                                  {'report_but_not_display_green': True, 'seed': 666, 'shape_of_building': 4.0},
+                                  ['lot_coverage_parameter', 'height_first_tier'],
+                                  {'Greenery Area_sum': 1.0, 'Floor area_sum': 0.07})
+    return {
+        'green': (green, [(0, 100), (8, 13), (1, 4)], 0.15),
+        'green+floor': (green_floor, [(0, 100), (8, 13)], 0.1)
+    }
+
+
+def run(objective, bounds, tol, **kwargs):
+    start = time.perf_counter()
+    res = optimize.differential_evolution(objective, bounds, tol=tol, seed=666, updating='deferred', **kwargs)
+    return res, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the example 7 optimizations')
+    parser.add_argument('--rpk', help='rule package from the data directory', type=str, default='envelope2002.rpk')
+    parser.add_argument('--processes', help='worker process counts to benchmark', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count()} & set(range(1, os.cpu_count() + 1))))
+    args = parser.parse_args()
+
+    rpk = asset_file(args.rpk)
+    if not os.path.exists(rpk):
+        parser.error(f'rule package not found: {rpk}')
+    problems = make_problems(rpk, asset_file('building_parcel.obj'))
+
+    for name, (objective, bounds, tol) in problems.items():
+        res_serial, t_serial = run(objective, bounds, tol)
+
+        print(f'\n{name}')
+        print(f"{'evaluation':>12} {'time [s]':>10} {'nfev':>6} {'objective':>12} {'speedup':>8}")
+        print(f"{'serial':>12} {t_serial:>10.2f} {res_serial.nfev:>6} {res_serial.fun:>12.2f} {1.0:>7.2f}x")
+
+        res, t_vectorized = run(objective, bounds, tol, vectorized=True)
+        print(f"{'vectorized':>12} {t_vectorized:>10.2f} {res.nfev:>6} {res.fun:>12.2f} {t_serial / t_vectorized:>7.2f}x")
+
+        for processes in args.processes:
+            with ParallelMap(processes) as workers:
+                # warm up the worker processes (PRT initialization, rule package loading)
+                workers(objective, [[bound[0] for bound in bounds]] * processes)
+                res, t_parallel = run(objective, bounds, tol, workers=workers)
+            print(f'{processes:>12} {t_parallel:>10.2f} {res.nfev:>6} {res.fun:>12.2f} {t_serial / t_parallel:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of the update cycle of example 10 (fetch, generate, upload, publish, replace) on a local
+# portal (portal_services.LocalPortal) seeded with synthetic polygon features and extrusion_rule.rpk.
+# The simulated round trip of the portal operations shows the effect of the concurrent fetches.
+# Usage: python bench_portal_pipeline.py --features 100 1000 --delay 0.5
+
+import os
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+
+import pyarrow.parquet
+
+import ex10_update_scene_layer_package as ex10
+from synthetic_data import synthetic_features
+from portal_services import LocalPortal
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+STAGES = ['fetch', 'generate', 'upload', 'publish', 'replace']
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def seed_portal(root_dir, features_count, delay):
+    portal = LocalPortal(root_dir, delay)
+    pyarrow.parquet.write_table(synthetic_features(features_count),
+                                os.path.join(portal.features_dir, f'{ex10.SOURCE_FEATURE_LAYER_ID}.parquet'))
+    shutil.copyfile(asset_file('extrusion_rule.rpk'),
+                    os.path.join(portal.rule_packages_dir, f'{ex10.RULE_PACKAGE_ITEM_ID}.rpk'))
+    return portal
+
+
+def serial_fetch_time(portal, target_id):
+    # the fetch stage without overlap, as before
+    start = time.perf_counter()
+    portal.fetch_features(ex10.SOURCE_FEATURE_LAYER_ID, ex10.SOURCE_FEATURE_LAYER_NAME, ex10.SOURCE_ATTRIBUTE_COLUMNS)
+    portal.fetch_rule_package(ex10.RULE_PACKAGE_ITEM_ID)
+    portal.get_title(target_id)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the example 10 update cycle on a local portal')
+    parser.add_argument('--features', help='feature counts to benchmark', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--delay', help='simulated round trip of the portal operations in seconds', type=float,
+                        default=0.5)
+    args = parser.parse_args()
+
+    print(f"{'features':>10} {'run':>8} " + ' '.join(f'{name + " [s]":>12}' for name in STAGES)
+          + f" {'total [s]':>10} {'serial fetch [s]':>17}")
+    for features_count in args.features:
+        with tempfile.TemporaryDirectory() as root_dir:
+            portal = seed_portal(root_dir, features_count, args.delay)
+            # the first run creates the scene layer, the second one replaces it
+            target_id = '0'
+            for run in ('create', 'replace'):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    target_id, timings = ex10.update_scene_layer(portal, target_id)
+                assert os.path.exists(portal.layer_path(target_id, '.slpk'))
+                t_serial = serial_fetch_time(portal, target_id)
+                print(f'{features_count:>10} {run:>8} ' + ' '.join(f'{timings[name]:>12.2f}' for name in STAGES)
+                      + f' {sum(timings.values()):>10.2f} {t_serial:>17.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of the columnar report collection (report_collector.py) against the dict per row
+# collection of example 5, on reports generated with extrusion_rule.rpk.
+# Usage: python bench_report_collector.py --runs 100000
+
+import os
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+import pyprt
+
+from report_collector import ReportCollector
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def get_sum_report(report):
+    sum_rep = {}
+    for it in report:
+        if "_sum" in it:
+            sum_rep[it] = report[it]
+    return sum_rep
+
+
+def collect_dicts(reports):
+    rows = []
+    for run, report in enumerate(reports):
+        row = get_sum_report(report)
+        row['shape_index'] = run % 3
+        row['minBuildingHeight'] = float(run)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def collect_columns(reports):
+    collector = ReportCollector(key_filter=lambda key: '_sum' in key)
+    for run, report in enumerate(reports):
+        collector.append(report, run % 3, minBuildingHeight=float(run))
+    return collector.to_dataframe()
+
+
+def measure(collect_fct, reports):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = collect_fct(reports)
+    duration = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df, duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the report collection')
+    parser.add_argument('--runs', help='number of collected reports', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    # the reports of a sweep share the same keys, one generated report is reused for all runs
+    initial_shape = pyprt.InitialShape([0, 0, 0,  10, 0, 0,  10, 0, 10,  0, 0, 20])
+    model = pyprt.ModelGenerator([initial_shape]).generate_model(
+        [{}], asset_file('extrusion_rule.rpk'), 'com.esri.pyprt.PyEncoder', {'emitGeometry': False})
+    report = model[0].get_report()
+
+    print(f"{'runs':>8} {'dicts [s]':>10} {'columns [s]':>12} {'speedup':>8} {'dicts peak [MB]':>16} {'columns peak [MB]':>18}")
+    for runs in args.runs:
+        reports = [report] * runs
+        df_dicts, t_dicts, peak_dicts = measure(collect_dicts, reports)
+        df_columns, t_columns, peak_columns = measure(collect_columns, reports)
+        assert df_dicts.shape == df_columns.shape
+
+        print(f'{runs:>8} {t_dicts:>10.3f} {t_columns:>12.3f} {t_dicts / t_columns:>7.1f}x'
+              f' {peak_dicts / 1e6:>16.1f} {peak_columns / 1e6:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
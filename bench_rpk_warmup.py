@@ -0,0 +1,100 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of the worker warm-up (rpk_cache.preloaded_executor) on the conversion requests of example 9:
+# first request and steady-state latency of pools starting their workers on demand (forked, the Linux default,
+# or spawned, the Windows and macOS default) and of a preloaded pool, and lookup time of the rule package
+# cache for a stand-in portal item.
+# Usage: python bench_rpk_warmup.py --model Sternwarte.fbx --requests 10
+
+import os
+import argparse
+import multiprocessing
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rpk_cache import RulePackageCache, preloaded_executor
+from slpk_conversion import encode_slpk, georef_attributes
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+class LocalItem:
+    # stands in for a portal item, the download is a file copy
+    def __init__(self, item_id, modified, path):
+        self.id = item_id
+        self.modified = modified
+        self.path = path
+
+    def download(self, save_path):
+        return shutil.copy(self.path, save_path)
+
+
+def request_latencies(executor, model, rpk, output_dir, requests_count):
+    # the two steps of an example 9 conversion job, each one submitted to the pool
+    latencies = []
+    for k in range(requests_count):
+        start = time.perf_counter()
+        attributes = executor.submit(georef_attributes, model, rpk, 950000.0, 6000000.0, 400.0).result()
+        executor.submit(encode_slpk, model, f'model_{k}', output_dir, rpk, attributes).result()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the worker warm-up')
+    parser.add_argument('--model', help='model of the data directory to convert', type=str, default='Sternwarte.fbx')
+    parser.add_argument('--rpk', help='rule package of the data directory', type=str, default='translateModel.rpk')
+    parser.add_argument('--requests', help='number of requests per pool', type=int, default=10)
+    parser.add_argument('--workers', help='number of worker processes', type=int, default=1)
+    args = parser.parse_args()
+
+    model = asset_file(args.model)
+    rpk = asset_file(args.rpk)
+    print(f"{'pool':>16} {'startup [s]':>12} {'first [s]':>10} {'steady [s]':>11}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for pool in ('on demand fork', 'on demand spawn', 'preloaded'):
+            start = time.perf_counter()
+            if pool == 'preloaded':
+                executor = preloaded_executor([rpk], args.workers)
+            else:
+                executor = ProcessPoolExecutor(max_workers=args.workers,
+                                               mp_context=multiprocessing.get_context(pool.split()[-1]))
+            t_startup = time.perf_counter() - start
+            with executor:
+                latencies = request_latencies(executor, model, rpk, output_dir, args.requests)
+            print(f'{pool:>16} {t_startup:>12.2f} {latencies[0]:>10.3f} {statistics.median(latencies[1:]):>11.3f}')
+
+        rpk_cache = RulePackageCache(os.path.join(output_dir, 'rpk_cache'), 100 * 1024 * 1024)
+        item = LocalItem('rpk', 1, rpk)
+        lookups = []
+        for _ in range(2):
+            start = time.perf_counter()
+            cached_path = rpk_cache.get_item(item)
+            lookups.append(time.perf_counter() - start)
+        assert cached_path == rpk_cache.get_item(LocalItem('copy', 1, rpk))
+        print(f'rule package cache: miss {lookups[0] * 1000:.2f}ms, hit {lookups[1] * 1000:.2f}ms,'
+              f' stats {rpk_cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Timing harness comparing the SLPK conversion of example 9 (one pass for OBJ models, two passes for the other
+# formats) with the two-pass conversion of all the formats.
+# Usage: python bench_slpk_conversion.py --repeat 3
+
+import os
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pyprt
+
+from georef import georef_bounds, georef_shift_vertices
+from slpk_conversion import convert_to_slpk, convert_to_slpk_two_pass, georef_attributes
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+RPK = os.path.join(CS_FOLDER, 'data', 'translateModel.rpk')
+GOAL = (950654.3290831866, 6004190.025580572, 411.0)
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def check_same_georef(file_path):
+    # both paths must place the model at the same location
+    shape = pyprt.InitialShape(file_path)
+    model = pyprt.ModelGenerator([shape]).generate_model(
+        [{}], RPK, 'com.esri.pyprt.PyEncoder', {'emitReport': False})
+    two_pass_bounds = georef_bounds(georef_shift_vertices(model[0].get_vertices(), *GOAL))
+
+    model = pyprt.ModelGenerator([shape]).generate_model(
+        [georef_attributes(file_path, RPK, *GOAL)], RPK, 'com.esri.pyprt.PyEncoder', {'emitReport': False})
+    one_pass_bounds = georef_bounds(model[0].get_vertices())
+
+    assert np.allclose(two_pass_bounds, one_pass_bounds, atol=1e-3)
+
+
+def time_conversion(convert_fct, file_path, output_dir, repeat):
+    timings = []
+    slpk_size = 0
+    for run in range(repeat):
+        start = time.perf_counter()
+        slpk_path = convert_fct(file_path, f'bench_{run}', output_dir, RPK, *GOAL)
+        timings.append(time.perf_counter() - start)
+        slpk_size = os.path.getsize(slpk_path)
+        os.remove(slpk_path)
+    return min(timings), slpk_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the example 9 SLPK conversion')
+    parser.add_argument('--files', help='models to convert', type=str, nargs='+',
+                        default=[asset_file('building_parcel.obj'), asset_file('Sternwarte.fbx')])
+    parser.add_argument('--repeat', help='number of repetitions (best time is reported)', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'model':>22} {'two-pass [s]':>13} {'convert [s]':>12} {'speedup':>8} {'slpk two-pass/convert [bytes]':>30}")
+    with tempfile.TemporaryDirectory(prefix='pyprt-bench-slpk-') as output_dir:
+        for file_path in args.files:
+            file_path = os.path.abspath(file_path)
+            check_same_georef(file_path)
+
+            t_two, size_two = time_conversion(convert_to_slpk_two_pass, file_path, output_dir, args.repeat)
+            t_convert, size_convert = time_conversion(convert_to_slpk, file_path, output_dir, args.repeat)
+
+            print(f'{os.path.basename(file_path):>22} {t_two:>13.3f} {t_convert:>12.3f} {t_two / t_convert:>7.1f}x'
+                  f' {size_two:>15}/{size_convert:<14}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Benchmark of the tiled I3S encoding (tiled_encoding.py) against a single encoder call on synthetic parcels:
+# time and size of each tile, total time, speedup and peak memory of the worker processes.
+# The single call also runs in a worker process after a warm-up, the tiled time includes the start of its
+# pool. The peak memory of terminated child processes only grows (Linux and macOS), the tiled encoding
+# is therefore measured first.
+# Usage: python bench_tiled_encoding.py --shapes 2000 --max_features 250 --workers 4
+
+import os
+import argparse
+import json
+import tempfile
+import time
+
+from synthetic_data import synthetic_attributes, synthetic_parcels
+from rpk_cache import preloaded_executor
+from slpk_conversion import SLPK_ENCODER, slpk_encoder_options
+from tiled_encoding import add_baseline, encode_tile, encode_tiled
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def children_peak_memory():
+    # in MB, ru_maxrss is in kB on Linux and in bytes on macOS
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the tiled I3S encoding')
+    parser.add_argument('--shapes', help='number of synthetic parcels', type=int, default=2000)
+    parser.add_argument('--rpk', help='rule package of the data directory', type=str, default='extrusion_rule.rpk')
+    parser.add_argument('--max_features', help='maximum number of shapes per tile', type=int, default=250)
+    parser.add_argument('--workers', help='number of worker processes', type=int, default=os.cpu_count())
+    parser.add_argument('--manifest', help='JSON file receiving the manifest with the single call time', type=str)
+    args = parser.parse_args()
+
+    rpk = asset_file(args.rpk)
+    shapes = synthetic_parcels(args.shapes)
+    attrs = synthetic_attributes(args.rpk, args.shapes)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        tiled_dir = os.path.join(output_dir, 'tiled')
+        manifest = encode_tiled(shapes, attrs, rpk, SLPK_ENCODER, slpk_encoder_options('layer', tiled_dir),
+                                args.max_features, args.workers)
+        tiled_memory = children_peak_memory()
+
+        single_dir = os.path.join(output_dir, 'single')
+        with preloaded_executor([rpk], 1) as executor:
+            start = time.perf_counter()
+            single = executor.submit(encode_tile, 'all', shapes, attrs, rpk, SLPK_ENCODER,
+                                     slpk_encoder_options('layer', single_dir)).result()
+            t_single = time.perf_counter() - start
+        single_memory = children_peak_memory()
+        add_baseline(manifest, tiled_dir, t_single)
+    if args.manifest:
+        with open(args.manifest, 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+    print(f"{'tile':>6} {'features':>9} {'size [MB]':>10} {'time [s]':>9}")
+    for tile in manifest['tiles']:
+        print(f"{tile['name']:>6} {tile['features']:>9} {tile['bytes'] / 1e6:>10.2f} {tile['seconds']:>9.2f}")
+
+    print(f"\n{args.shapes} shapes, {len(manifest['tiles'])} tiles of at most {args.max_features} shapes,"
+          f" {args.workers} workers ({os.cpu_count()} cores)")
+    print(f"{'path':>8} {'time [s]':>9} {'size [MB]':>10} {'peak memory [MB]':>17}")
+    print(f"{'single':>8} {manifest['baselineSeconds']:>9.2f} {single['bytes'] / 1e6:>10.2f} {max(single_memory, tiled_memory):>17.0f}")
+    print(f"{'tiled':>8} {manifest['seconds']:>9.2f} {manifest['bytes'] / 1e6:>10.2f} {tiled_memory:>17.0f}")
+    print(f'speedup: {manifest["speedup"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Micro-benchmark of the vectorized fan triangulation (triangulation.py) against the former loop of
+# example 6 (all the vertex combinations of a face) and a pure Python fan triangulation, on synthetic
+# faces and on candler.rpk buildings.
+# Usage: python bench_triangulation.py --faces 100000 1000000 --buildings 4
+
+import os
+import argparse
+import itertools
+import timeit
+
+import numpy as np
+import pyprt
+
+from batch_generation import make_initial_shape
+from synthetic_data import synthetic_parcels
+from triangulation import fan_triangulate
+
+CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
+
+
+def asset_file(filename):
+    return os.path.join(CS_FOLDER, 'data', filename)
+
+
+def triangulate_legacy(indices, face_counts):
+    faces = []
+    start = 0
+    for count in face_counts:
+        faces.append(indices[start:start + count])
+        start += count
+
+    mat_faces = []
+    for f in faces:
+        if len(f) == 3:
+            mat_faces.append(f)
+        elif len(f) > 3:
+            for new_f in np.array(list(itertools.combinations(f, 3))):
+                mat_faces.append(new_f)
+        elif len(f) < 3:
+            current_ind = 0
+            new_f2 = []
+            while len(new_f2) < 3:
+                new_f2.append(f[current_ind])
+                if current_ind < len(f)-1:
+                    current_ind += 1
+                else:
+                    while len(new_f2) < 3:
+                        new_f2.append(f[current_ind])
+                    current_ind += 1
+            mat_faces.append(new_f2)
+    return np.array(mat_faces)
+
+
+def triangulate_python_fan(indices, face_counts):
+    triangles = []
+    start = 0
+    for count in face_counts:
+        face = indices[start:start + count]
+        if count >= 3:
+            triangles.extend((face[0], face[j + 1], face[j + 2]) for j in range(count - 2))
+        elif count > 0:
+            triangles.append((face[0], face[-1], face[-1]))
+        start += count
+    return np.array(triangles, dtype=np.int32)
+
+
+def synthetic_faces(faces_count, seed=0):
+    # mostly quads, some triangles, a few larger polygons and degenerate faces, as generated by PRT
+    rng = np.random.default_rng(seed)
+    face_counts = rng.choice([1, 2, 3, 4, 6, 8], size=faces_count, p=[0.005, 0.005, 0.1, 0.84, 0.03, 0.02])
+    indices = rng.integers(0, faces_count, size=int(face_counts.sum()))
+    return indices.tolist(), face_counts.tolist()
+
+
+def candler_faces(buildings_count):
+    shapes = [make_initial_shape(shape) for shape in synthetic_parcels(buildings_count)]
+    models = pyprt.ModelGenerator(shapes).generate_model(
+        [{'BuildingHeight': 100.0}], asset_file('candler.rpk'), 'com.esri.pyprt.PyEncoder', {'emitReport': False})
+    indices = []
+    face_counts = []
+    vertex_offset = 0
+    for model in models:
+        indices.extend(index + vertex_offset for index in model.get_indices())
+        face_counts.extend(model.get_faces())
+        vertex_offset += len(model.get_vertices()) // 3
+    return indices, face_counts
+
+
+def best_time(fct, repeat):
+    return min(timeit.repeat(fct, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the example 6 face triangulation')
+    parser.add_argument('--faces', help='synthetic face counts to benchmark', type=int, nargs='+',
+                        default=[100000, 1000000])
+    parser.add_argument('--buildings', help='number of candler.rpk buildings (0 to skip)', type=int, default=4)
+    parser.add_argument('--repeat', help='number of repetitions (best time is reported)', type=int, default=3)
+    args = parser.parse_args()
+
+    workloads = [(f'synthetic {faces_count}', *synthetic_faces(faces_count)) for faces_count in args.faces]
+    if args.buildings > 0:
+        workloads.append((f'candler x{args.buildings}', *candler_faces(args.buildings)))
+
+    print(f"{'model':>18} {'faces':>9} {'legacy [s]':>11} {'python fan [s]':>15} {'numpy [s]':>10}"
+          f" {'legacy triangles':>17} {'fan triangles':>14} {'speedup':>8}")
+    for name, indices, face_counts in workloads:
+        triangles = fan_triangulate(indices, face_counts)
+        assert np.array_equal(triangles, triangulate_python_fan(indices, face_counts))
+
+        legacy_triangles = triangulate_legacy(indices, face_counts)
+        t_legacy = best_time(lambda: triangulate_legacy(indices, face_counts), args.repeat)
+        t_python = best_time(lambda: triangulate_python_fan(indices, face_counts), args.repeat)
+        t_numpy = best_time(lambda: fan_triangulate(indices, face_counts), args.repeat)
+
+        print(f'{name:>18} {len(face_counts):>9} {t_legacy:>11.3f} {t_python:>15.3f} {t_numpy:>10.4f}'
+              f' {len(legacy_triangles):>17} {len(triangles):>14} {t_legacy / t_numpy:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Job model of the example 9 server: an upload becomes a job which goes through the
+# states below. Finished jobs are kept for ttl seconds so that clients can poll the result.
+
+import time
+import uuid
+
+JOB_STATES = ('queued', 'generating', 'encoding', 'publishing', 'done', 'failed')
+FINAL_JOB_STATES = ('done', 'failed')
+
+
+class ConversionJob:
+    def __init__(self, file_path, basename, x_coord, y_coord, elevation):
+        self.id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.basename = basename
+        self.x_coord = x_coord
+        self.y_coord = y_coord
+        self.elevation = elevation
+        self.upload_hash = ''
+
+        self.filename_slpk = ''
+        self.portal_id = None
+        self.error = None
+        self.cached = False
+
+        self.state = 'queued'
+        self.timings = {}
+        self.state_start = time.perf_counter()
+        self.finished_at = None
+
+    def set_state(self, state):
+        assert state in JOB_STATES
+        now = time.perf_counter()
+        self.timings[self.state] = now - self.state_start
+        self.state = state
+        self.state_start = now
+        if state in FINAL_JOB_STATES:
+            self.finished_at = time.monotonic()
+
+    def fail(self, error):
+        self.error = error
+        self.set_state('failed')
+
+    def is_finished(self):
+        return self.state in FINAL_JOB_STATES
+
+    def to_dict(self):
+        job_dict = {'jobId': self.id, 'state': self.state, 'timings': self.timings, 'cached': self.cached}
+        if self.portal_id is not None:
+            job_dict['portalId'] = self.portal_id
+        if self.error is not None:
+            job_dict['error'] = self.error
+        return job_dict
+
+
+class JobStore:
+    def __init__(self, ttl):
+        # ttl: seconds a finished job is kept
+        self.ttl = ttl
+        self.jobs = {}
+
+    def add(self, job):
+        self.jobs[job.id] = job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def evict_expired(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.is_finished() and now - job.finished_at > self.ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return len(expired)
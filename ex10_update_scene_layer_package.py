@@ -31,108 +31,202 @@
 # 4. Now change the POPULATION_DENSITY_MODE to 'logarithmic' and re-run the script
 # 5. After a while, the Web Scene will update automatically.
 
+# Offline mode: with --local_portal=<dir>, the portal operations are performed on a local directory instead of
+# ArcGIS Online (see portal_services.py for its layout), e.g. to run and benchmark the whole update cycle.
+# The source features and the rule package are then read from <dir>/features and <dir>/rule_packages.
+
+# Incremental mode: with --incremental, the hash of each feature (geometry, attributes, rule package and
+# encoder options) is stored in ex10_feature_cache after each update (see incremental_generation.py). If no
+# feature changed since the last update of the target scene layer, nothing is generated nor uploaded,
+# otherwise the whole package is generated again as without --incremental.
+
+# Tiled export: with --tiled_export=<dir>, the features are encoded into one SLPK per spatial tile of at most
+# --max_tile_features features, in parallel worker processes (see tiled_encoding.py), along with a JSON manifest
+# of the tiles. Nothing is uploaded nor published, the tiles cannot be merged into the single target scene layer.
+
+import argparse
 import getpass
 import os.path
 import string
 import random
-import keyring
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-import numpy as np
-
-from arcgis.gis import GIS, ItemProperties, ItemTypeEnum
-from arcgis.geometry import Geometry
 
 import pyprt
-from pyprt.pyprt_arcgis import arcgis_to_pyprt
+
+from feature_shapes import shape_attributes
+from incremental_generation import IncrementalGenerator, feature_keys
+from instrumentation import Instrumentation
+from portal_services import ArcGISPortal, LocalPortal
+from rpk_cache import RulePackageCache
+from hashing import file_sha256
+from tiled_encoding import encode_tiled
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 
 SOURCE_FEATURE_LAYER_ID = 'dfae9883bc3548dcbd29758ff8ea9234'  # Switzerland Kantone Boundaries 2021
+SOURCE_FEATURE_LAYER_NAME = 'CHE_Kantone'
 SOURCE_FEATURE_LAYER_WKID = '3857'
+# PRT attribute -> source feature attribute
+SOURCE_ATTRIBUTE_COLUMNS = {'population': 'TOTPOP_CY', 'area': 'AREA'}
 TARGET_SCENE_LAYER_ID = '0'
 TARGET_SCENE_LAYER_DEFAULT_NAME = 'PyPRT_Ex10_Scene_Layer'
 RULE_PACKAGE_ITEM_ID = '4ab3503cd32c46e3ab129aa976b4f373'
+RULE_PACKAGE_CACHE_DIR = SCRIPT_DIR / 'ex10_rpk_cache'
+RULE_PACKAGE_CACHE_SIZE = 500 * 1024 * 1024
+FEATURE_CACHE_DIR = SCRIPT_DIR / 'ex10_feature_cache'
+SLPK_ENCODER = 'com.esri.prt.codecs.I3SEncoder'
 PORTAL_DATA_DIR = 'PyPRT Example 10'
 
 POPULATION_DENSITY_MODE = 'linear'  # or 'logarithmic'
 
 
 def main():
-    gis = get_gis()
-
-    print(f"Fetching input features from item {SOURCE_FEATURE_LAYER_ID}... ")
-    source_features = fetch_source_features(gis, SOURCE_FEATURE_LAYER_ID)
-    print(f"   ... done. Got {len(source_features)} features.")
-
-    print('Fetching target scene layer item...')
-    target_scene_layer_item = gis.content.get(TARGET_SCENE_LAYER_ID)
-    target_scene_layer_name = target_scene_layer_item.title if target_scene_layer_item else make_name_unique(
-        TARGET_SCENE_LAYER_DEFAULT_NAME)
-    print(f'   ... done: {target_scene_layer_name}')
-
-    item_folder = gis.content.folders.get(folder=PORTAL_DATA_DIR)
-    if item_folder is None:
-        print(f"Creating portal folder '{PORTAL_DATA_DIR}' for scene layer item...")
-        item_folder = gis.content.folders.create(PORTAL_DATA_DIR)
+    parser = argparse.ArgumentParser(description='Update a scene layer with the Swiss population density')
+    parser.add_argument('--local_portal', help='directory standing in for ArcGIS Online (offline mode)', type=str)
+    parser.add_argument('--portal_delay', help='simulated round trip of the local portal operations in seconds',
+                        type=float, default=0.0)
+    parser.add_argument('--target', help='item id of the scene layer to update', type=str,
+                        default=TARGET_SCENE_LAYER_ID)
+    parser.add_argument('--incremental', help='skip the generation and the upload when no feature changed '
+                        'since the last update', action='store_true')
+    parser.add_argument('--tiled_export', help='directory receiving one SLPK per spatial tile and their manifest '
+                        'instead of updating the scene layer', type=str)
+    parser.add_argument('--max_tile_features', help='maximum number of features per tile of --tiled_export',
+                        type=int, default=1000)
+    parser.add_argument('--metrics_log', help='JSON lines file receiving the timing span of each stage', type=str)
+    parser.add_argument('--profile_spans', help='names of the stages to profile with cProfile (e.g. generate)',
+                        type=str, nargs='+', default=[])
+    args = parser.parse_args()
+
+    if args.local_portal:
+        portal = LocalPortal(args.local_portal, args.portal_delay)
+    else:
+        rpk_cache = RulePackageCache(str(RULE_PACKAGE_CACHE_DIR), RULE_PACKAGE_CACHE_SIZE)
+        portal = ArcGISPortal(get_gis(), PORTAL_DATA_DIR, rpk_cache)
+
+    if args.tiled_export:
+        manifest = export_tiled_scene_layers(portal, args.tiled_export, args.max_tile_features)
+        print(f"Encoded {manifest['features']} features into {len(manifest['tiles'])} tiles in "
+              f"{manifest['seconds']:.2f}s, see {args.tiled_export}")
+        return
+
+    feature_cache = IncrementalGenerator(str(FEATURE_CACHE_DIR)) if args.incremental else None
+    instrumentation = Instrumentation(args.metrics_log, profiled_spans=args.profile_spans)
+    scene_layer_id, timings = update_scene_layer(portal, args.target, feature_cache=feature_cache,
+                                                 instrumentation=instrumentation)
+    print(f"Scene layer item id = {scene_layer_id}")
+    print('Stage timings: ' + ', '.join(f'{name} {duration:.2f}s' for name, duration in timings.items()))
+    if not args.local_portal:
+        print("Please allow a few minutes for web scenes using the updated scene layer to update.")
+
+
+@contextmanager
+def stage(timings, name, instrumentation):
+    start = time.perf_counter()
+    try:
+        with instrumentation.span(name):
+            yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def update_scene_layer(portal, target_scene_layer_id, population_density_mode=POPULATION_DENSITY_MODE,
+                       feature_cache=None, instrumentation=None):
+    # returns the id of the updated (or created) scene layer and the duration of each stage
+    # feature_cache: IncrementalGenerator, nothing is generated again if no feature changed
+    # instrumentation: Instrumentation receiving a span per stage and the counters
+    timings = {}
+    instrumentation = instrumentation if instrumentation else Instrumentation()
+
+    # the source features and the rule package are fetched concurrently
+    with stage(timings, 'fetch', instrumentation), ThreadPoolExecutor(max_workers=3) as executor:
+        print(f"Fetching input features from item {SOURCE_FEATURE_LAYER_ID} and rule package... ")
+        features_future = executor.submit(portal.fetch_features, SOURCE_FEATURE_LAYER_ID, SOURCE_FEATURE_LAYER_NAME,
+                                          SOURCE_ATTRIBUTE_COLUMNS)
+        rpk_future = executor.submit(portal.fetch_rule_package, RULE_PACKAGE_ITEM_ID)
+        title_future = executor.submit(portal.get_title, target_scene_layer_id)
+        initial_shapes, columns, geometry_hashes = features_future.result()
+        rpk = rpk_future.result()
+        target_scene_layer_name = title_future.result()
+        instrumentation.count('shapes', len(initial_shapes))
+    attrs = shape_attributes(columns, constants={'populationDensityMode': population_density_mode})
+    print(f"   ... done. Got {len(initial_shapes)} features and rule package {rpk}.")
+
+    target_exists = target_scene_layer_name is not None
+    if not target_exists:
+        target_scene_layer_name = make_name_unique(TARGET_SCENE_LAYER_DEFAULT_NAME)
+    print(f'Target scene layer: {target_scene_layer_name}')
+
+    keys = None
+    if feature_cache is not None:
+        keys = feature_keys(geometry_hashes, attrs, file_sha256(rpk), scene_layer_encoder_options('', ''))
+        if target_exists and feature_cache.is_unchanged(keys, target_scene_layer_id):
+            print('No feature changed since the last update, the scene layer is up to date.')
+            return target_scene_layer_id, timings
 
     with tempfile.TemporaryDirectory() as temp_dir:
         slpk_name = make_name_unique(target_scene_layer_name)
 
         print(f"Generating new SLPK in {temp_dir}...")
-        scene_layer_package = generate_scene_layer_package(gis, slpk_name, source_features, temp_dir)
+        with stage(timings, 'generate', instrumentation):
+            scene_layer_package = generate_scene_layer_package(slpk_name, initial_shapes, attrs, rpk, temp_dir,
+                                                               feature_cache, keys, target_scene_layer_id)
+            instrumentation.count('bytes_written', os.path.getsize(scene_layer_package))
         print(f"   ... done: {scene_layer_package}")
 
         print(f"Uploading new SLPK ...")
-        item_properties = ItemProperties(title=slpk_name, item_type=ItemTypeEnum.SCENE_PACKAGE.value)
-        new_slpk_item = item_folder.add(file=scene_layer_package, item_properties=item_properties).result()
-        print(f"   ... done. Uploaded new SLPK item '{new_slpk_item.title}' with id '{new_slpk_item.id}'")
-
-    print("Publish new scene layer from new SLPK...")
-    new_scene_layer_item = new_slpk_item.publish()
-    print(f"   ... done, scene layer item id = {new_scene_layer_item.id}")
-
-    print("Removing new SLPK again...")
-    new_slpk_item.delete()
-    print("   ... done.")
-
-    if not target_scene_layer_item:
-        new_scene_layer_item.update(item_properties={'title': target_scene_layer_name})
-    else:
-        print(f"Replacing service for item '{target_scene_layer_name}' ...")
-        replacement_successful = gis.content.replace_service(target_scene_layer_item, new_scene_layer_item,
-                                                             replace_metadata=True)
-        print(f"   Replacement status: {replacement_successful}")
-        new_scene_layer_item.delete()
-        print(f"   ... done.")
-
-    print("Please allow a few minutes for web scenes using the updated scene layer to update.")
-
-
-def fetch_source_features(gis, source_item_id):
-    source_feature_layer_collection = gis.content.get(source_item_id)
-    assert len(source_feature_layer_collection.layers) == 9
-    source_feature_layer = source_feature_layer_collection.layers[2]
-    assert source_feature_layer.properties.name == 'CHE_Kantone'
-    source_features = source_feature_layer.query(return_z=True)
-    return source_features
-
-
-def generate_scene_layer_package(gis, name, source_features, output_dir):
-    pyprt_slpk_encoder = 'com.esri.prt.codecs.I3SEncoder'
-
-    rule_package_item = gis.content.get(RULE_PACKAGE_ITEM_ID)
-    rpk = rule_package_item.download()
-
-    attrs = []
-    for source_feature in source_features:
-        attrs.append({
-            'populationDensityMode': POPULATION_DENSITY_MODE,
-            'population': float(source_feature.get_value('TOTPOP_CY')),
-            'area': float(source_feature.get_value('AREA'))
-        })
-
-    pyprt_slpk_options = {
+        with stage(timings, 'upload', instrumentation):
+            new_slpk_id = portal.upload_package(scene_layer_package, slpk_name)
+        print(f"   ... done. Uploaded new SLPK item '{slpk_name}' with id '{new_slpk_id}'")
+
+    print("Publish new scene layer from new SLPK and remove the SLPK item...")
+    with stage(timings, 'publish', instrumentation):
+        new_scene_layer_id = portal.publish_package(new_slpk_id)
+    print(f"   ... done, scene layer item id = {new_scene_layer_id}")
+
+    with stage(timings, 'replace', instrumentation):
+        if not target_exists:
+            portal.set_title(new_scene_layer_id, target_scene_layer_name)
+            scene_layer_id = new_scene_layer_id
+        else:
+            print(f"Replacing service for item '{target_scene_layer_name}' ...")
+            replacement_successful = portal.replace_layer(target_scene_layer_id, new_scene_layer_id)
+            print(f"   Replacement status: {replacement_successful}")
+            scene_layer_id = target_scene_layer_id
+            print(f"   ... done.")
+
+    if feature_cache is not None:
+        feature_cache.commit(keys, scene_layer_id)
+        stats = feature_cache.stats()
+        print(f"Generated {stats['regenerated']} features, {stats['changed']} of them changed.")
+
+    return scene_layer_id, timings
+
+
+def export_tiled_scene_layers(portal, output_dir, max_features, population_density_mode=POPULATION_DENSITY_MODE):
+    # returns the manifest of the tiles (see tiled_encoding.py)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        print(f"Fetching input features from item {SOURCE_FEATURE_LAYER_ID} and rule package... ")
+        features_future = executor.submit(portal.fetch_features, SOURCE_FEATURE_LAYER_ID, SOURCE_FEATURE_LAYER_NAME,
+                                          SOURCE_ATTRIBUTE_COLUMNS, shape_data=True)
+        rpk_future = executor.submit(portal.fetch_rule_package, RULE_PACKAGE_ITEM_ID)
+        shapes, columns, _ = features_future.result()
+        rpk = rpk_future.result()
+    attrs = shape_attributes(columns, constants={'populationDensityMode': population_density_mode})
+    print(f"   ... done. Got {len(shapes)} features and rule package {rpk}.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Generating tiled SLPKs in {output_dir}...")
+    return encode_tiled(shapes, attrs, rpk, SLPK_ENCODER,
+                        scene_layer_encoder_options(TARGET_SCENE_LAYER_DEFAULT_NAME, output_dir), max_features)
+
+
+def scene_layer_encoder_options(name, output_dir):
+    return {
         'sceneType': 'Local',  # cannot use Global as PyPRT does not have reprojection capabilities
         'baseName': name,
         'sceneWkid': SOURCE_FEATURE_LAYER_WKID,
@@ -149,9 +243,16 @@ def generate_scene_layer_package(gis, name, source_features, output_dir):
         'outputPath': output_dir
     }
 
-    pyprt_initial_shapes = arcgis_to_pyprt(source_features)
-    pyprt_model_generator = pyprt.ModelGenerator(pyprt_initial_shapes)
-    pyprt_model_generator.generate_model(attrs, rpk, pyprt_slpk_encoder, pyprt_slpk_options)
+
+def generate_scene_layer_package(name, initial_shapes, attrs, rpk, output_dir, feature_cache=None, keys=None,
+                                 layer_id=None):
+    pyprt_slpk_options = scene_layer_encoder_options(name, output_dir)
+
+    if feature_cache is None:
+        pyprt_model_generator = pyprt.ModelGenerator(initial_shapes)
+        pyprt_model_generator.generate_model(attrs, rpk, SLPK_ENCODER, pyprt_slpk_options)
+    else:
+        feature_cache.generate(initial_shapes, attrs, keys, layer_id, rpk, SLPK_ENCODER, pyprt_slpk_options)
     pyprt_generated_slpk = os.path.join(output_dir, f'{name}.slpk')
     assert os.path.exists(pyprt_generated_slpk)
 
@@ -159,6 +260,9 @@ def generate_scene_layer_package(gis, name, source_features, output_dir):
 
 
 def get_gis():
+    import keyring
+    from arcgis.gis import GIS
+
     arcgis_credential = keyring.get_credential(service_name="arcgis.com", username=None)
     if arcgis_credential:
         user_name = arcgis_credential.username
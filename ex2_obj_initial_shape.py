@@ -19,6 +19,8 @@ import os
 import pyprt
 from pyprt.pyprt_utils import visualize_prt_results
 
+from obj_loader import make_initial_shape, read_obj
+
 CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
 
 
@@ -41,7 +43,9 @@ model1 = m1.generate_model([attrs], rpk, 'com.esri.pyprt.PyEncoder', {})
 visualize_prt_results(model1)
 
 # STEP 2: Initial Shape (OBJ file)
-initial_shape2 = pyprt.InitialShape(asset_file('building_parcel.obj'))
+# the geometry of the footprint is parsed with NumPy, pyprt.InitialShape(asset_file('building_parcel.obj'))
+# would also load its materials and texture coordinates
+initial_shape2 = make_initial_shape(*read_obj(asset_file('building_parcel.obj')))
 
 # PRT Generation
 print('\nSecond Generation:\n')
@@ -19,6 +19,8 @@ import os
 import pyprt
 from pyprt.pyprt_utils import visualize_prt_results
 
+from multi_encoding import PY_ENCODER, generate_many
+
 CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
 
 
@@ -38,12 +40,12 @@ shape_geometry_2 = pyprt.InitialShape(
     [0, 0, 0,  0, 0, -10,  -10, 0, -10,  -10, 0, 0, -5, 0, -5])
 
 
-# PRT Generation
-m = pyprt.ModelGenerator([shape_geometry_2, shape_geometry_1])
-
+# PRT Generation: OBJ export and reports of the models from one request
 encoder_options = {'outputPath': '/tmp/pyprt_output'}
 os.makedirs(encoder_options['outputPath'], exist_ok=True)
 
-models = m.generate_model(
-    [attrs], rpk, 'com.esri.prt.codecs.OBJEncoder', encoder_options)
+_, models = generate_many([shape_geometry_2, shape_geometry_1], [attrs], rpk, [
+    ('com.esri.prt.codecs.OBJEncoder', encoder_options),
+    (PY_ENCODER, {'emitGeometry': False, 'emitReport': True})])
 print('\nGenerated models located in '+encoder_options['outputPath'])
+visualize_prt_results(models)
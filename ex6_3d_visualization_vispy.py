@@ -15,16 +15,23 @@
 
 import sys
 import os
+import argparse
+import time
 
 import pyprt
-from pyprt.pyprt_utils import vertices_vector_to_matrix, faces_indices_vectors_to_matrix
 
 import numpy as np
-import itertools
 from vispy import app, scene
 from vispy.color import Color
 from vispy.geometry.meshdata import MeshData
 
+from instrumentation import Instrumentation
+from mesh_batching import merge_models, model_vertex_colors
+from geometry_store import META_FILENAME, GeometryStore, GeometryStoreWriter
+from model_geometry import ModelGeometry
+from hashing import file_sha256
+from scene_culling import LOD_BOX, LOD_FULL, LOD_HIDDEN, LodCuller, box_meshes, model_bounds
+
 CS_FOLDER = os.path.dirname(os.path.realpath(__file__))
 
 
@@ -32,8 +39,20 @@ def asset_file(filename):
     return os.path.join(CS_FOLDER, 'data', filename)
 
 
+def parcels_grid(parcels_number, parcel_size=10.0, street_width=5.0):
+    # square parcels in the xz plane, counter-clockwise seen from above (y-up)
+    columns = max(1, int(np.ceil(np.sqrt(parcels_number))))
+    parcels = []
+    for k in range(parcels_number):
+        x = (k % columns) * (parcel_size + street_width)
+        z = (k // columns) * (parcel_size + street_width)
+        parcels.append(pyprt.InitialShape(np.array([x, 0, z,  x, 0, z + parcel_size,  x + parcel_size, 0, z + parcel_size,
+                                                    x + parcel_size, 0, z], dtype='f')))
+    return parcels
+
+
 class Canvas(scene.SceneCanvas):
-    def __init__(self, geometries_number, generated_data, generated_data_faces, window_range_xmin, window_range_xmax, window_range_ymin, window_range_ymax, window_range_zmin, window_range_zmax):
+    def __init__(self, models_vertices, models_faces, window_range_xmin, window_range_xmax, window_range_ymin, window_range_ymax, window_range_zmin, window_range_zmax, culling=False):
         scene.SceneCanvas.__init__(self, keys='interactive', size=(
             800, 550), show=True, title='Visualization of the generated model(s)')
 
@@ -45,43 +64,99 @@ class Canvas(scene.SceneCanvas):
         self.selected_point = None
         scene.visuals.GridLines(parent=self.view.scene)
 
-        for k in range(geometries_number):
-            if generated_data_faces[k] is not None:
-                mdata = MeshData(
-                    vertices=generated_data[k], faces=generated_data_faces[k])
-
-                rng = np.random.RandomState(0)
-                nf = mdata.n_faces
-                fcolor = np.ones((nf, 4), dtype=np.float32)
-                someColors = [Color('green').RGBA, Color('yellow').RGBA, Color(
-                    'blue').RGBA, Color('red').RGBA, Color('white').RGBA, Color('fuchsia').RGBA]
-
-                for l in range(0, nf):
-                    k_ind = k
-                    if k >= len(someColors):
-                        k_ind -= len(someColors)
-                    fcolor[l] = someColors[k_ind]
-
-                mdata.set_face_colors(fcolor)
-                edge_v_index = mdata.get_edges()
-
-                mesh = scene.visuals.Mesh(meshdata=mdata)
-
-                mesh.set_gl_state('additive', depth_test=False)
-                mlines = scene.visuals.Line(
-                    pos=generated_data[k], color='red', connect=edge_v_index)
+        # all the models in one vertex/index buffer: one mesh, one line and one markers visual
+        self.vertices, self.faces, self.model_ids = merge_models(models_vertices, models_faces)
+        self.models_number = len(models_vertices)
+        someColors = [Color('green').RGBA, Color('yellow').RGBA, Color(
+            'blue').RGBA, Color('red').RGBA, Color('white').RGBA, Color('fuchsia').RGBA]
+        self.vertex_colors = model_vertex_colors(self.model_ids, someColors)
+
+        self.edges = np.empty((0, 2), dtype=np.uint32)
+        if len(self.faces) > 0:
+            self.edges = MeshData(vertices=self.vertices, faces=self.faces).get_edges()
+        # model of each face and edge, to select the models to draw
+        self.face_models = self.model_ids[self.faces[:, 0]]
+        self.edge_models = self.model_ids[self.edges[:, 0]]
+
+        self.mesh = scene.visuals.Mesh()
+        self.mesh.set_gl_state('additive', depth_test=False)
+        self.mlines = scene.visuals.Line(color='red')
+        self.markers = scene.Markers()
+        self.view.add(self.mesh)
+        self.view.add(self.mlines)
+        self.view.add(self.markers)
+
+        # level of detail per model: full mesh, bounding box or hidden, depending on the camera
+        self.culler = None
+        if culling:
+            bounds = model_bounds(self.vertices, self.model_ids)
+            self.culler = LodCuller(bounds)
+            self.box_vertices, self.box_faces, box_model_ids = box_meshes(bounds)
+            self.box_colors = model_vertex_colors(box_model_ids, someColors)
+            self.box_face_models = box_model_ids[self.box_faces[:, 0]]
+            self.boxes = scene.visuals.Mesh()
+            self.boxes.set_gl_state('additive', depth_test=False)
+            self.view.add(self.boxes)
+
+        self.set_lods(np.full(self.models_number, True), np.full(self.models_number, False))
+
+        # frame time overlay, in canvas pixels
+        self.frame_time = 0.0
+        self.culling_time = 0.0
+        self.frame_text = scene.visuals.Text('', parent=self.scene, color='white', font_size=9,
+                                             anchor_x='left', anchor_y='top', pos=(10, 10))
 
-                self.view.add(mesh)
-                self.view.add(mlines)
-
-            s = scene.Markers(pos=generated_data[k])
+        self.freeze()
 
-            self.view.add(s)
+    @staticmethod
+    def set_visual_data(visual, **data):
+        # vispy visuals do not accept empty data, they are hidden instead
+        visual.visible = all(len(value) > 0 for value in data.values() if isinstance(value, np.ndarray))
+        if visual.visible:
+            visual.set_data(**data)
+
+    def set_lods(self, full, box):
+        # full, box: boolean masks over the models
+        self.set_visual_data(self.mesh, vertices=self.vertices, faces=self.faces[full[self.face_models]],
+                             vertex_colors=self.vertex_colors)
+        self.set_visual_data(self.mlines, pos=self.vertices, connect=self.edges[full[self.edge_models]])
+        self.set_visual_data(self.markers, pos=self.vertices[full[self.model_ids]])
+        if self.culler is not None:
+            self.set_visual_data(self.boxes, vertices=self.box_vertices,
+                                 faces=self.box_faces[box[self.box_face_models]], vertex_colors=self.box_colors)
+
+    def on_draw(self, event):
+        start = time.perf_counter()
+        if self.culler is not None:
+            transform = self.view.scene.node_transform(self.view)
+            if self.culler.update(transform, self.view.size):
+                self.set_lods(self.culler.lods == LOD_FULL, self.culler.lods == LOD_BOX)
+            self.culling_time = time.perf_counter() - start
+
+        # timings of the previous frame
+        if self.culler is not None:
+            full, box, hidden = self.culler.counts()[[LOD_FULL, LOD_BOX, LOD_HIDDEN]]
+            lod_text = f'full: {full}, box: {box}, hidden: {hidden}'
+        else:
+            lod_text = f'full: {self.models_number}'
+        self.frame_text.text = (f'frame: {self.frame_time * 1000:.1f} ms, culling: {self.culling_time * 1000:.1f} ms'
+                                f' | {lod_text}')
 
-        self.freeze()
+        scene.SceneCanvas.on_draw(self, event)
+        # wait for the GPU to measure the whole frame
+        self.context.finish()
+        self.frame_time = time.perf_counter() - start
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Visualization of generated models with vispy')
+    parser.add_argument('--parcels', help='number of parcels on a grid (default: two initial shapes)', type=int, default=0)
+    parser.add_argument('--culling', help='level of detail and frustum culling of the models', action='store_true')
+    parser.add_argument('--metrics_log', help='JSON lines file receiving the timing spans of the generation and conversion', type=str)
+    parser.add_argument('--geometry_store', help='directory of the generated models, loaded instead of generating them if it exists', type=str)
+    args = parser.parse_args()
+    instrumentation = Instrumentation(args.metrics_log)
+
     initial_geometry = pyprt.InitialShape(
         np.array([0, 0, 0,  0, 0, 2,  1, 0, 1,  1, 0, 0], dtype='f'))
     initial_geometry2 = pyprt.InitialShape(
@@ -89,71 +164,68 @@ if __name__ == '__main__':
     rpk = asset_file('extrusion_rule.rpk')
     attrs = {}
 
-    mod = pyprt.ModelGenerator([initial_geometry, initial_geometry2])
-    generated_mod = mod.generate_model(
-        [attrs], rpk, 'com.esri.pyprt.PyEncoder', {})
+    # a store generated with other parameters is generated again
+    store_parameters = {'parcels': args.parcels, 'rpk': file_sha256(rpk), 'attributes': attrs}
+    geometry_store = None
+    if args.geometry_store and os.path.exists(os.path.join(args.geometry_store, META_FILENAME)):
+        geometry_store = GeometryStore(args.geometry_store)
+        if geometry_store.meta['parameters'] != store_parameters:
+            geometry_store = None
+
+    if geometry_store is not None:
+        with instrumentation.span('load'):
+            generated_mod = [geometry_store.model(k) for k in range(len(geometry_store))]
+            instrumentation.count('shapes', len(generated_mod))
+    else:
+        if args.parcels > 0:
+            mod = pyprt.ModelGenerator(parcels_grid(args.parcels))
+        else:
+            mod = pyprt.ModelGenerator([initial_geometry, initial_geometry2])
+        with instrumentation.span('generate'):
+            generated_mod = mod.generate_model(
+                [attrs], rpk, 'com.esri.pyprt.PyEncoder', {})
+            instrumentation.count('shapes', len(generated_mod))
+        if args.geometry_store:
+            with GeometryStoreWriter(args.geometry_store, store_parameters) as writer:
+                writer.append(generated_mod)
     all_vertices = []
     all_faces = []
 
-    for model in generated_mod:
-        if model:
-            geo = model.get_vertices()
-            ind = model.get_indices()
-            face_geo = model.get_faces()
-
-            model_vertices = vertices_vector_to_matrix(geo)
-            model_faces = faces_indices_vectors_to_matrix(ind, face_geo)
-
-            if len(geo) > 0:
-                print('Size of the model vertices matrix: (' +
-                      str(len(model_vertices)) + ', 3)')
-                all_vertices.append(model_vertices)
-            if len(face_geo) > 0:
-                print('Size (first dimension) of the model faces matrix: ' +
-                      str(len(model_faces)))
-                all_faces.append(model_faces)
-        else:
-            print('\nError while instanciating the model generator.')
-
-    # Data
-    mat = np.array(all_vertices).copy()
-    mat[:, :, 1], mat[:, :, 2] = mat[:, :, 2], mat[:, :, 1].copy()
-    mat_f = []
-
-    xmin = np.amin(mat[:, :, 0])
-    xmax = np.amax(mat[:, :, 0])
-    ymin = np.amin(mat[:, :, 1])
-    ymax = np.amax(mat[:, :, 1])
-    zmin = np.amin(mat[:, :, 2])
-    zmax = np.amax(mat[:, :, 2])
-
-    for k in range(mat.shape[0]):
-        mat_faces = []
-        for f in all_faces[k]:
-            if len(f) == 3:
-                mat_faces.append(f)
-            elif len(f) > 3:
+    with instrumentation.span('convert'):
+        for model in generated_mod:
+            if model:
+                geometry = model if isinstance(model, ModelGeometry) else ModelGeometry.from_model(model)
+                instrumentation.count('vertices', geometry.vertex_count)
+
+                model_vertices = geometry.vertices
                 # in vispy, 3 vertex indices per face
-                for new_f in np.array(list(itertools.combinations(f, 3))):
-                    mat_faces.append(new_f)
-            elif len(f) < 3:
-                # repeat one vertex index
-                current_ind = 0
-                new_f2 = []
-                while len(new_f2) < 3:
-                    new_f2.append(f[current_ind])
-                    if current_ind < len(f)-1:
-                        current_ind += 1
-                    else:
-                        while len(new_f2) < 3:
-                            new_f2.append(f[current_ind])
-                        current_ind += 1
-
-                mat_faces.append(new_f2)
-
-        mat_f.append(mat_faces)
-
-    win = Canvas(mat.shape[0], mat, np.array(mat_f),
-                 xmin, xmax, ymin, ymax, zmin, zmax)
+                model_faces = geometry.triangles()
+
+                if geometry.vertex_count > 0:
+                    all_vertices.append(model_vertices)
+                    all_faces.append(model_faces if geometry.face_count > 0 else None)
+                # sizes of the individual models, unless a whole grid of parcels is generated
+                if geometry.vertex_count > 0 and args.parcels == 0:
+                    print('Size of the model vertices matrix: (' +
+                          str(len(model_vertices)) + ', 3)')
+                if geometry.face_count > 0 and args.parcels == 0:
+                    print('Size of the model triangles matrix: (' +
+                          str(len(model_faces)) + ', 3)')
+            else:
+                print('\nError while instanciating the model generator.')
+
+    # Data, the models can have different vertex counts
+    all_vertices = [model_vertices[:, [0, 2, 1]] for model_vertices in all_vertices]
+    mat = np.concatenate(all_vertices)
+
+    xmin = np.amin(mat[:, 0])
+    xmax = np.amax(mat[:, 0])
+    ymin = np.amin(mat[:, 1])
+    ymax = np.amax(mat[:, 1])
+    zmin = np.amin(mat[:, 2])
+    zmax = np.amax(mat[:, 2])
+
+    win = Canvas(all_vertices, all_faces,
+                 xmin, xmax, ymin, ymax, zmin, zmax, culling=args.culling)
     if sys.flags.interactive != 1:
         app.run()
@@ -19,15 +19,26 @@ import string
 import json
 import argparse
 import getpass
-import math
+import hashlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import tornado.ioloop
+import tornado.queues
 import tornado.web
 import webbrowser
 from threading import Timer
-import pyprt
-from arcgis.gis import GIS, ItemProperties, ItemTypeEnum
-from arcgis.gis._impl._content_manager import SharingLevel
+
+from conversion_jobs import ConversionJob, JobStore
+from instrumentation import Instrumentation
+from multipart_stream import MultipartError, MultipartStreamParser, get_boundary
+from rpk_cache import preloaded_executor
+from hashing import file_sha256
+from slpk_cache import SlpkCache, make_cache_key
+from slpk_conversion import (convert_to_slpk_two_pass, encode_slpk, georef_attributes, has_file_bounds,
+                             slpk_encoder_options)
+from slpk_publishing import ArcGISPublisher, LocalPublisher
 
 DBG = True
 CS_FOLDER = Path().absolute()
@@ -36,6 +47,8 @@ OUTPUT_PATH = os.path.join(CS_FOLDER, 'ex9_output')
 RPK = os.path.join(CS_FOLDER, 'data', 'translateModel.rpk')
 PORT = 9999
 AGO_DATA_DIR = 'PyPRT Example 9'
+LOCAL_PUBLISH_PATH = os.path.join(CS_FOLDER, 'ex9_published')
+CACHE_PATH = os.path.join(CS_FOLDER, 'ex9_cache')
 
 
 allowed = set(string.ascii_letters + string.digits + '-' + '_')
@@ -45,135 +58,259 @@ def check(file_basename):
     return set(file_basename) <= allowed
 
 
-def georef_shift_vertices(model_vertices, x_coord_goal, y_coord_goal, z_coord_goal):
-    shifted_vertices = model_vertices.copy()
+def make_basename(original_filename):
+    basename = os.path.splitext(original_filename)[0] + '_' + ''.join(random.choice(string.ascii_lowercase +
+                                                                                   string.digits) for x in range(5))
+    if not check(basename):
+        basename = ''.join(random.choice(
+            string.ascii_lowercase + string.digits) for x in range(10))
+        print(
+            f'Warning: Invalid basename. Filename renamed to: {basename}')
+    return basename
 
-    # Bounding box
-    min_y_value = min(model_vertices[1::3])
-    mod_x_values = model_vertices[0::3]
-    center_x_value = (max(mod_x_values)+min(mod_x_values))/2.0
-    mod_z_values = model_vertices[2::3]
-    center_z_value = (max(mod_z_values)+min(mod_z_values))/2.0
 
-    # Offset the initial shape at the right location
-    shifted_vertices[0::3] = [a-center_x_value +
-                              x_coord_goal for a in shifted_vertices[0::3]]
-    shifted_vertices[1::3] = [
-        a-min_y_value+z_coord_goal for a in shifted_vertices[1::3]]
-    shifted_vertices[2::3] = [a-center_z_value -
-                              y_coord_goal for a in shifted_vertices[2::3]]
+class HashingWriter:
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.sha256 = hashlib.sha256()
 
-    return shifted_vertices
+    def write(self, data):
+        self.sha256.update(data)
+        self.output_file.write(data)
 
 
+@tornado.web.stream_request_body
 class MainHandler(tornado.web.RequestHandler):
-    def initialize(self, gis):
+    def initialize(self, jobs, job_queue, max_upload_size, instrumentation):
         self.basename = ''
         self.file_path = ''
-        self.filename_slpk = ''
-        self.gis = gis
-
-    def save_file(self):
-        uploaded_file = self.request.files['file'][0]
-        original_filename = uploaded_file['filename']
-        extension = os.path.splitext(original_filename)[1]
-        self.basename = os.path.splitext(original_filename)[0] + '_' + ''.join(random.choice(string.ascii_lowercase +
-                                                                                             string.digits) for x in range(5))
-        if not check(self.basename):
-            self.basename = ''.join(random.choice(
-                string.ascii_lowercase + string.digits) for x in range(10))
-            print(
-                f'Warning: Invalid basename. Filename renamed to: {self.basename}')
-
-        extension_filename = self.basename + extension
+        self.output_file = None
+        self.upload_writer = None
+        self.fields = {}
+        self.parser = None
+        self.bytes_received = 0
+        self.upload_start = 0.0
+        self.job = None
+        self.jobs = jobs
+        self.job_queue = job_queue
+        self.max_upload_size = max_upload_size
+        self.instrumentation = instrumentation
+
+    def prepare(self):
+        # reject the upload before its body is received
+        if self.job_queue.full():
+            self.reject_busy()
+            return
+
+        content_length = int(self.request.headers.get('Content-Length', 0))
+        if content_length > self.max_upload_size:
+            raise tornado.web.HTTPError(413, f'Upload larger than {self.max_upload_size} bytes')
+        self.request.connection.set_max_body_size(self.max_upload_size)
+
+        try:
+            boundary = get_boundary(self.request.headers.get('Content-Type', ''))
+        except MultipartError as e:
+            raise tornado.web.HTTPError(400, str(e))
+        self.parser = MultipartStreamParser(boundary, self.open_part)
+        self.upload_start = time.perf_counter()
+
+    def reject_busy(self):
+        self.set_status(503)
+        self.set_header('Retry-After', '10')
+        self.finish(json.dumps({'error': 'Server busy, too many conversions in progress.'}))
+
+    def open_part(self, name, filename):
+        if filename is None:
+            self.fields[name] = io.BytesIO()
+            return self.fields[name]
+        if name != 'file' or self.output_file is not None:
+            raise MultipartError(f'Unexpected file field: {name}')
+
+        self.basename = make_basename(filename)
+        extension_filename = self.basename + os.path.splitext(filename)[1]
         self.file_path = os.path.join(OUTPUT_PATH, extension_filename)
-        with open(self.file_path, 'wb') as output_file:
-            output_file.write(uploaded_file['body'])
-
-    def convert_to_slpk(self):
-        x_coord = self.get_argument("x_coordinate")
-        y_coord = self.get_argument("y_coordinate")
-        elev = self.get_argument("elevation")
-
-        if DBG:
-            print(
-                f'Setting georef to ({round(float(x_coord),2)}, {round(float(y_coord),2)}) (Web Mercator) with elevation {int(float(elev))} meters')
-
-        # Model Generator Instance
-        mod_generator1 = pyprt.ModelGenerator(
-            [pyprt.InitialShape(self.file_path)])
-
-        shape_attributes = {}
-
-        model = mod_generator1.generate_model([shape_attributes], RPK,
-                                              'com.esri.pyprt.PyEncoder', {'emitReport': False})
-
-        # Shift to right location
-        mod_vertices = model[0].get_vertices()
-        mod_vertices_shift = georef_shift_vertices(
-            mod_vertices, float(x_coord), float(y_coord), float(elev))
-
-        shifted_shape = pyprt.InitialShape(
-            mod_vertices_shift, model[0].get_indices(), model[0].get_faces())
-
-        mod_generator2 = pyprt.ModelGenerator([shifted_shape])
-
-        slpk_encoder = 'com.esri.prt.codecs.I3SEncoder'
-        slpk_encoder_options = {
-            'sceneType': "Local",
-            'baseName': self.basename,
-            'sceneWkid': "3857",
-            'layerTextureEncoding': ["2"],
-            'layerEnabled': [True],
-            'layerUID': ["1"],
-            'layerName': ["1"],
-            'layerTextureQuality': [1.0],
-            'layerTextureCompression': [9],
-            'layerTextureScaling': [1.0],
-            'layerTextureMaxDimension': [2048],
-            'layerFeatureGranularity': ["0"],
-            'layerBackfaceCulling': [False],
-            'outputPath': OUTPUT_PATH
-        }
-
-        mod_generator2.generate_model([shape_attributes], RPK,
-                                      slpk_encoder, slpk_encoder_options)
-        self.filename_slpk = os.path.join(
-            OUTPUT_PATH, self.basename + '.slpk')
-
-    def publish(self):
-
-        item_folder = gis.content.folders.get(folder=AGO_DATA_DIR)
-        item_properties = ItemProperties(title=f"PyPRT_webApp_{self.basename}", item_type=ItemTypeEnum.SCENE_PACKAGE.value, tags="slpk")
-        slpk_item = item_folder.add(file=self.filename_slpk, item_properties=item_properties).result()
-
-        slpk_item_published = slpk_item.publish()
-        sharing_mgr = slpk_item_published.sharing
-        sharing_mgr.sharing_level = SharingLevel.EVERYONE
-        slpk_item.delete()
-
-        return slpk_item_published.id
+        self.output_file = open(self.file_path, 'wb')
+        # the upload hash is computed while streaming, it is part of the SLPK cache key
+        self.upload_writer = HashingWriter(self.output_file)
+        return self.upload_writer
+
+    def data_received(self, chunk):
+        self.bytes_received += len(chunk)
+        if self.bytes_received > self.max_upload_size:
+            raise tornado.web.HTTPError(413, f'Upload larger than {self.max_upload_size} bytes')
+        try:
+            self.parser.feed(chunk)
+        except MultipartError as e:
+            raise tornado.web.HTTPError(400, str(e))
+
+    def get_field(self, name):
+        if name not in self.fields:
+            raise tornado.web.MissingArgumentError(name)
+        try:
+            return float(self.fields[name].getvalue().decode())
+        except (UnicodeDecodeError, ValueError):
+            raise tornado.web.HTTPError(400, f'{name} is not a number')
 
     def post(self):
-        self.save_file()
-        self.convert_to_slpk()
-
+        try:
+            self.parser.finish()
+        except MultipartError as e:
+            raise tornado.web.HTTPError(400, str(e))
+        if self.output_file is None:
+            raise tornado.web.MissingArgumentError('file')
+        self.output_file.close()
+
+        upload_time = time.perf_counter() - self.upload_start
+        self.instrumentation.count('bytes_received', self.bytes_received)
         if DBG:
-            print('Publishing file on ArcGIS Online:')
-            print(self.filename_slpk)
-
-        id = self.publish()
-        self.write(json.dumps({'portalId': id}))
+            print(f'Received {self.bytes_received} bytes in {upload_time:.2f}s '
+                  f'({self.bytes_received / max(upload_time, 1e-6) / 1e6:.2f} MB/s)')
+
+        job = ConversionJob(self.file_path, self.basename, self.get_field("x_coordinate"),
+                            self.get_field("y_coordinate"), self.get_field("elevation"))
+        job.timings['upload'] = upload_time
+        job.upload_hash = self.upload_writer.sha256.hexdigest()
+        try:
+            self.job_queue.put_nowait(job)
+        except tornado.queues.QueueFull:
+            # the queue filled up while the body was streamed, the upload is removed on finish
+            self.reject_busy()
+            return
+        self.job = job
+        self.jobs.add(self.job)
+
+        self.write(json.dumps({'jobId': self.job.id}))
         self.finish()
 
     def on_finish(self):
+        self.remove_partial_upload()
+
+    def on_connection_close(self):
+        self.remove_partial_upload()
+
+    def remove_partial_upload(self):
+        # once queued, the job owns the uploaded file
+        if self.output_file is not None:
+            self.output_file.close()
+        if self.job is None and self.file_path and os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class JobHandler(tornado.web.RequestHandler):
+    def initialize(self, jobs):
+        self.jobs = jobs
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404)
+        self.write(json.dumps(job.to_dict()))
+
+
+class ConversionService:
+    def __init__(self, publisher, generate_executor, publish_executor, slpk_cache, cache_precision, instrumentation):
+        self.publisher = publisher
+        self.generate_executor = generate_executor
+        self.publish_executor = publish_executor
+        self.slpk_cache = slpk_cache
+        self.cache_precision = cache_precision
+        self.instrumentation = instrumentation
+        self.rpk_hash = file_sha256(RPK)
+
+    def cache_key(self, job):
+        return make_cache_key(job.upload_hash, job.x_coord, job.y_coord, job.elevation, self.rpk_hash,
+                              slpk_encoder_options('', ''), self.cache_precision)
+
+    async def run_job(self, job):
+        io_loop = tornado.ioloop.IOLoop.current()
+        instrumentation = self.instrumentation
+
+        with instrumentation.span('cache_lookup'):
+            cache_key = self.cache_key(job)
+            cache_entry = self.slpk_cache.get(cache_key)
+        if cache_entry is not None:
+            if DBG:
+                print(f'Reusing cached SLPK {cache_entry["file"]}')
+            instrumentation.count('cache_hits')
+            job.cached = True
+            job.portal_id = cache_entry['portal_id']
+            job.set_state('done')
+            return
+
         if DBG:
-            print('Cleaning up files:')
-            print(self.file_path)
-            print(self.filename_slpk)
+            print(
+                f'Setting georef to ({round(job.x_coord,2)}, {round(job.y_coord,2)}) (Web Mercator) with elevation {int(job.elevation)} meters')
+
+        job.set_state('generating')
+        if has_file_bounds(job.file_path):
+            with instrumentation.span('georef', in_worker=True) as record:
+                shape_attributes = await instrumentation.run_in_worker(
+                    record, self.generate_executor, georef_attributes, job.file_path, RPK, job.x_coord, job.y_coord,
+                    job.elevation)
+            conversion = (encode_slpk, job.file_path, job.basename, OUTPUT_PATH, RPK, shape_attributes)
+        else:
+            # PRT decodes the model to get its bounds: it is generated, shifted and generated again
+            conversion = (convert_to_slpk_two_pass, job.file_path, job.basename, OUTPUT_PATH, RPK, job.x_coord,
+                          job.y_coord, job.elevation)
+
+        job.set_state('encoding')
+        with instrumentation.span('encode', in_worker=True) as record:
+            job.filename_slpk = await instrumentation.run_in_worker(record, self.generate_executor, *conversion)
+            instrumentation.count('shapes')
+            instrumentation.count('bytes_written', os.path.getsize(job.filename_slpk))
 
-        os.remove(self.file_path)
-        os.remove(self.filename_slpk)
+        if DBG:
+            print('Publishing file:')
+            print(job.filename_slpk)
+
+        job.set_state('publishing')
+        with instrumentation.span('publish', in_worker=True) as record:
+            job.portal_id = await instrumentation.run_in_worker(
+                record, self.publish_executor, self.publisher.publish, job.filename_slpk, job.basename)
+        await io_loop.run_in_executor(
+            self.publish_executor, self.slpk_cache.put, cache_key, job.filename_slpk, job.portal_id)
+        job.set_state('done')
+
+    async def worker(self, job_queue):
+        async for job in job_queue:
+            try:
+                with self.instrumentation.span('job') as job_span:
+                    job_span['jobId'] = job.id
+                    await self.run_job(job)
+            except Exception as e:
+                self.instrumentation.count('failed_jobs')
+                job.fail(str(e))
+            finally:
+                job_queue.task_done()
+
+            if DBG:
+                timings_str = ', '.join(f'{stage} {duration:.2f}s' for stage, duration in job.timings.items())
+                print(f'Job {job.id} ({job.basename}) {job.state}: {timings_str}')
+                print('Cleaning up files:')
+                print(job.file_path)
+                print(job.filename_slpk)
+
+            # the SLPK is gone if it was moved into the cache
+            for path in (job.file_path, job.filename_slpk):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+
+class StatsHandler(tornado.web.RequestHandler):
+    def initialize(self, slpk_cache):
+        self.slpk_cache = slpk_cache
+
+    def get(self):
+        self.write(json.dumps({'cache': self.slpk_cache.stats()}))
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def initialize(self, instrumentation):
+        self.instrumentation = instrumentation
+
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4')
+        self.write(self.instrumentation.prometheus_text())
 
 
 if not os.path.exists(OUTPUT_PATH):
@@ -187,27 +324,76 @@ def open_browser():
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='ArcGIS Online credentials')
     parser.add_argument(
-        '--username', help='Your username for AGO', type=str, required=True)
+        '--username', help='Your username for AGO', type=str, required=False)
     parser.add_argument(
         '--password', help='Your password for AGO', type=str, required=False)
+    parser.add_argument(
+        '--publisher', help='publish on ArcGIS Online or in a local directory (e.g. for load tests)', type=str,
+        choices=['arcgis', 'local'], default='arcgis')
+    parser.add_argument(
+        '--max_workers', help='number of processes generating the SLPKs', type=int, default=2)
+    parser.add_argument(
+        '--max_pending', help='number of queued conversions before answering 503', type=int, default=4)
+    parser.add_argument(
+        '--max_upload_size', help='maximum size of an uploaded model in MB', type=int, default=1024)
+    parser.add_argument(
+        '--job_ttl', help='seconds a finished job can still be polled', type=int, default=600)
+    parser.add_argument(
+        '--cache_size', help='maximum size of the cached SLPKs in MB', type=int, default=1024)
+    parser.add_argument(
+        '--cache_precision', help='uploads placed closer than this (in meters) reuse the cached SLPK', type=float,
+        default=1.0)
+    parser.add_argument(
+        '--metrics_log', help='JSON lines file receiving the timing span of each conversion stage', type=str)
+    parser.add_argument(
+        '--profile_spans', help='names of the spans to profile with cProfile (e.g. encode, profiled in the worker)',
+        type=str, nargs='+', default=[])
     args = parser.parse_args()
-    if args.password is None:
-        args.password = getpass.getpass(prompt='Enter your AGOL password: ')
 
-    gis = GIS(url='https://www.arcgis.com',
-              username=args.username, password=args.password)
-
-    # Create folder for scene layers
-    if gis.content.folders.get(folder=AGO_DATA_DIR) is None:
-        gis.content.folders.create(AGO_DATA_DIR)
+    if args.publisher == 'arcgis':
+        if args.username is None:
+            parser.error('--username is required to publish on ArcGIS Online')
+        if args.password is None:
+            args.password = getpass.getpass(prompt='Enter your AGOL password: ')
+
+        from arcgis.gis import GIS
+        gis = GIS(url='https://www.arcgis.com',
+                  username=args.username, password=args.password)
+        publisher = ArcGISPublisher(gis, AGO_DATA_DIR)
+    else:
+        publisher = LocalPublisher(LOCAL_PUBLISH_PATH)
+
+    instrumentation = Instrumentation(args.metrics_log, profiled_spans=args.profile_spans)
+    jobs = JobStore(args.job_ttl)
+    job_queue = tornado.queues.Queue(maxsize=args.max_pending)
+    # published ids are only valid for the publisher they were created with
+    slpk_cache = SlpkCache(os.path.join(CACHE_PATH, args.publisher), args.cache_size * 1024 * 1024)
+    # the workers load the rule package at startup, not on the first request
+    warm_up_start = time.perf_counter()
+    generate_executor = preloaded_executor([RPK], args.max_workers)
+    print(f'Started {args.max_workers} workers in {time.perf_counter() - warm_up_start:.2f}s')
+    conversion_service = ConversionService(publisher,
+                                           generate_executor,
+                                           ThreadPoolExecutor(max_workers=args.max_workers),
+                                           slpk_cache, args.cache_precision, instrumentation)
 
     application = tornado.web.Application([
-        (r"/file-upload", MainHandler, dict(gis=gis)),
+        (r"/file-upload", MainHandler, dict(jobs=jobs, job_queue=job_queue,
+                                            max_upload_size=args.max_upload_size * 1024 * 1024,
+                                            instrumentation=instrumentation)),
+        (r"/jobs/(\w+)", JobHandler, dict(jobs=jobs)),
+        (r"/stats", StatsHandler, dict(slpk_cache=slpk_cache)),
+        (r"/metrics", MetricsHandler, dict(instrumentation=instrumentation)),
         (r"/(.*)", tornado.web.StaticFileHandler,
          {"path": ROOT, "default_filename": "index.html"})
     ])
 
+    io_loop = tornado.ioloop.IOLoop.current()
+    for _ in range(args.max_workers):
+        io_loop.spawn_callback(conversion_service.worker, job_queue)
+    tornado.ioloop.PeriodicCallback(jobs.evict_expired, 60 * 1000).start()
+
     application.listen(PORT)
     print(f'Listening on Port={PORT}')
     Timer(1, open_browser).start()
-    tornado.ioloop.IOLoop.instance().start()
+    tornado.ioloop.IOLoop.current().start()
@@ -0,0 +1,323 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Bulk conversion of polygon features from columnar sources into PyPRT initial shapes and shape
+# attributes (see example 10), instead of the feature by feature conversion of arcgis_to_pyprt.
+# The polygons are handled as ragged arrays: the coordinates of all the rings and the offsets of the
+# rings, polygons and features. They are converted to the PRT coordinate system in one vectorized pass,
+# with the same conventions as arcgis_to_pyprt: exterior rings are taken clockwise, interior rings
+# counter-clockwise, the closing vertex is dropped and (x, y, z) maps to (x, z, -y) with y-up.
+#
+# Supported sources:
+#   - ragged arrays (initial_shapes_from_ragged, or shape_data_from_ragged for worker processes)
+#   - Shapely 2 geometry arrays, e.g. GeoDataFrame.geometry.values (initial_shapes_from_shapely)
+#   - Esri JSON polygons, e.g. the features of an ArcGIS FeatureSet (initial_shapes_from_esri_json)
+#   - Arrow geometry columns, GeoArrow polygon/multipolygon or WKB with Shapely (initial_shapes_from_arrow)
+#   - files readable by GeoPandas, e.g. GeoPackage or shapefile (read_features)
+# Features which cannot be converted (missing or empty geometry) are skipped, the functions return the
+# indices of the converted features to align the attributes. The ragged_from_* functions extract the
+# ragged arrays of a source, e.g. to compute the geometry_hashes of its features.
+#
+# Example:
+#   initial_shapes, attrs = read_features('kantone.gpkg', {'population': 'TOTPOP_CY', 'area': 'AREA'})
+
+import hashlib
+import itertools
+
+import numpy as np
+import pyprt
+
+
+def ring_orientations(coords, ring_offsets):
+    # True for the counter-clockwise rings (shoelace formula on closed rings)
+    x = coords[:, 0]
+    y = coords[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    # products between the last vertex of a ring and the first vertex of the next ring, the offsets of the empty
+    # rings at the start or at the end of coords have no previous or next vertex
+    ring_boundaries = ring_offsets[1:-1]
+    ring_boundaries = ring_boundaries[(ring_boundaries > 0) & (ring_boundaries < len(coords))]
+    cross[ring_boundaries - 1] = 0.0
+    ring_starts = ring_offsets[:-1]
+    non_empty = np.diff(ring_offsets) > 0
+    areas = np.zeros(len(ring_starts))
+    if len(cross) > 0 and non_empty.any():
+        areas[non_empty] = np.add.reduceat(cross, np.minimum(ring_starts[non_empty], len(cross) - 1))
+    return areas > 0
+
+
+def prt_geometry_from_ragged(coords, ring_offsets, polygon_offsets, feature_offsets):
+    # coords: (N, 2) or (N, 3) coordinates of the closed rings
+    # ring_offsets: (R + 1,) offsets into coords, polygon_offsets: (P + 1,) offsets into the rings,
+    # feature_offsets: (F + 1,) offsets into the polygons
+    # returns the (V, 3) PRT vertices, the vertex count of each ring (faces) and the ring offsets of the features
+    coords = np.asarray(coords, dtype=np.float64)
+    ring_offsets = np.asarray(ring_offsets, dtype=np.int64)
+    polygon_offsets = np.asarray(polygon_offsets, dtype=np.int64)
+    feature_offsets = np.asarray(feature_offsets, dtype=np.int64)
+
+    # the closing vertex is dropped
+    face_counts = np.maximum(np.diff(ring_offsets) - 1, 0)
+
+    is_exterior = np.zeros(len(face_counts), dtype=bool)
+    is_exterior[polygon_offsets[:-1][np.diff(polygon_offsets) > 0]] = True
+    # rings already oriented as expected are reversed, as in arcgis_to_pyprt
+    reverse = is_exterior != ring_orientations(coords, ring_offsets)
+
+    ring_of_vertex = np.repeat(np.arange(len(face_counts)), face_counts)
+    face_starts = np.cumsum(face_counts) - face_counts
+    position = np.arange(int(face_counts.sum())) - face_starts[ring_of_vertex]
+    position = np.where(reverse[ring_of_vertex], face_counts[ring_of_vertex] - 1 - position, position)
+    selected = coords[ring_offsets[:-1][ring_of_vertex] + position]
+
+    vertices = np.zeros((len(selected), 3))
+    vertices[:, 0] = selected[:, 0]
+    vertices[:, 2] = -selected[:, 1]
+    if coords.shape[1] > 2:
+        vertices[:, 1] = selected[:, 2]
+
+    feature_ring_offsets = polygon_offsets[feature_offsets]
+    return vertices, face_counts, feature_ring_offsets
+
+
+def shape_data_from_ragged(coords, ring_offsets, polygon_offsets, feature_offsets):
+    # returns the arguments of pyprt.InitialShape of each converted feature (picklable, see batch_generation.shape_data)
+    # and the indices of the converted features
+    vertices, face_counts, feature_ring_offsets = prt_geometry_from_ragged(
+        coords, ring_offsets, polygon_offsets, feature_offsets)
+    feature_offsets = np.asarray(feature_offsets, dtype=np.int64)
+    vertex_offsets = np.zeros(len(face_counts) + 1, dtype=np.int64)
+    np.cumsum(face_counts, out=vertex_offsets[1:])
+
+    # features without rings or with degenerate rings are skipped
+    feature_ring_counts = np.diff(feature_ring_offsets)
+    smallest_faces = np.full(len(feature_ring_counts), 3)
+    has_rings = feature_ring_counts > 0
+    if has_rings.any():
+        smallest_faces[has_rings] = np.minimum.reduceat(face_counts, feature_ring_offsets[:-1][has_rings])
+    feature_indices = np.flatnonzero(has_rings & (smallest_faces >= 3))
+
+    # pyprt.InitialShape converts Python lists faster than NumPy arrays
+    vertex_list = vertices.reshape(-1).tolist()
+    face_count_list = face_counts.tolist()
+    vertex_offsets = vertex_offsets.tolist()
+    ring_offsets_list = feature_ring_offsets.tolist()
+    polygon_ring_offsets = np.asarray(polygon_offsets, dtype=np.int64).tolist()
+    feature_polygon_offsets = feature_offsets.tolist()
+
+    shapes = []
+    for feature_index in feature_indices.tolist():
+        first_ring, end_ring = ring_offsets_list[feature_index], ring_offsets_list[feature_index + 1]
+        first_vertex, end_vertex = vertex_offsets[first_ring], vertex_offsets[end_ring]
+
+        # one group per polygon: the exterior ring followed by its holes
+        first_polygon, end_polygon = feature_polygon_offsets[feature_index], feature_polygon_offsets[feature_index + 1]
+        holes = [list(range(polygon_ring_offsets[k] - first_ring, polygon_ring_offsets[k + 1] - first_ring))
+                 for k in range(first_polygon, end_polygon)]
+
+        shapes.append((vertex_list[3 * first_vertex:3 * end_vertex], list(range(end_vertex - first_vertex)),
+                       face_count_list[first_ring:end_ring], holes))
+    return shapes, feature_indices
+
+
+def initial_shapes_from_ragged(coords, ring_offsets, polygon_offsets, feature_offsets):
+    # returns the initial shapes and the indices of the converted features
+    shapes, feature_indices = shape_data_from_ragged(coords, ring_offsets, polygon_offsets, feature_offsets)
+    return [pyprt.InitialShape(*shape) for shape in shapes], feature_indices
+
+
+def ragged_from_shapely(geometries):
+    # geometries: array of Shapely 2 Polygon/MultiPolygon (None and empty geometries are skipped)
+    # returns the ragged arrays expected by initial_shapes_from_ragged
+    import shapely
+
+    geometries = np.asarray(geometries, dtype=object)
+    geometries = np.where(shapely.is_missing(geometries), shapely.MultiPolygon(), geometries)
+    geometry_type, coords, offsets = shapely.to_ragged_array(geometries, include_z=bool(shapely.has_z(geometries).any()))
+    if geometry_type == shapely.GeometryType.POLYGON:
+        ring_offsets, polygon_offsets = offsets
+        feature_offsets = np.arange(len(polygon_offsets))
+    elif geometry_type == shapely.GeometryType.MULTIPOLYGON:
+        ring_offsets, polygon_offsets, feature_offsets = offsets
+    else:
+        raise ValueError(f'Expected polygon geometries, got {geometry_type.name}')
+    return coords, ring_offsets, polygon_offsets, feature_offsets
+
+
+def initial_shapes_from_shapely(geometries):
+    return initial_shapes_from_ragged(*ragged_from_shapely(geometries))
+
+
+def ragged_from_esri_json(geometries):
+    # geometries: Esri JSON polygons ({'rings': [[[x, y(, z)], ...], ...]}), None and empty geometries are skipped
+    # the clockwise rings are exterior rings, the counter-clockwise rings are the holes of the preceding exterior
+    # ring (as assumed by arcgis_to_pyprt)
+    # returns the ragged arrays expected by initial_shapes_from_ragged
+    rings = []
+    feature_ring_counts = []
+    for geometry in geometries:
+        geometry_rings = [] if geometry is None else geometry.get('rings', [])
+        # the M values of the 'hasM' geometries without Z are not heights
+        dimension = 2 if geometry and geometry.get('hasM') and not geometry.get('hasZ') else 3
+        rings.extend(np.asarray(ring, dtype=np.float64)[:, :dimension] for ring in geometry_rings)
+        feature_ring_counts.append(len(geometry_rings))
+
+    coords = np.zeros((sum(len(ring) for ring in rings), 3))
+    ring_offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    np.cumsum([len(ring) for ring in rings], out=ring_offsets[1:])
+    for ring, first_vertex in zip(rings, ring_offsets[:-1].tolist()):
+        coords[first_vertex:first_vertex + len(ring), :ring.shape[1]] = ring
+
+    feature_ring_offsets = np.zeros(len(feature_ring_counts) + 1, dtype=np.int64)
+    np.cumsum(feature_ring_counts, out=feature_ring_offsets[1:])
+    # a polygon starts at each exterior ring and at the first ring of each feature
+    polygon_starts = ~ring_orientations(coords, ring_offsets)
+    polygon_starts[feature_ring_offsets[:-1][np.diff(feature_ring_offsets) > 0]] = True
+    polygon_offsets = np.append(np.flatnonzero(polygon_starts), len(rings))
+    feature_offsets = np.searchsorted(polygon_offsets[:-1], feature_ring_offsets)
+    return coords, ring_offsets, polygon_offsets, feature_offsets
+
+
+def initial_shapes_from_esri_json(geometries):
+    return initial_shapes_from_ragged(*ragged_from_esri_json(geometries))
+
+
+def list_offsets(list_array):
+    # offsets of a pyarrow ListArray, relative to its flattened values
+    offsets = list_array.offsets.to_numpy()
+    return offsets - offsets[0]
+
+
+def arrow_coordinates(points):
+    # GeoArrow points: struct<x, y[, z]> or fixed_size_list<double>[2|3]
+    import pyarrow
+
+    if pyarrow.types.is_struct(points.type):
+        return np.column_stack([points.field(k).to_numpy(zero_copy_only=False) for k in range(points.type.num_fields)])
+    dimension = points.type.list_size
+    return points.flatten().to_numpy(zero_copy_only=False).reshape(-1, dimension)
+
+
+def ragged_from_arrow(geometry_column):
+    # geometry_column: pyarrow (chunked) array, GeoArrow native polygon/multipolygon or WKB
+    # returns the ragged arrays expected by initial_shapes_from_ragged
+    import pyarrow
+
+    if isinstance(geometry_column, pyarrow.ChunkedArray):
+        geometry_column = geometry_column.combine_chunks()
+    if pyarrow.types.is_binary(geometry_column.type) or pyarrow.types.is_large_binary(geometry_column.type):
+        import shapely
+        return ragged_from_shapely(shapely.from_wkb(geometry_column.to_numpy(zero_copy_only=False)))
+
+    # nesting depth: polygon = list<list<point>>, multipolygon = list<list<list<point>>>
+    depth = 0
+    value_type = geometry_column.type
+    while pyarrow.types.is_list(value_type) or pyarrow.types.is_large_list(value_type):
+        depth += 1
+        value_type = value_type.value_type
+    if depth not in (2, 3):
+        raise ValueError(f'Expected a GeoArrow polygon or multipolygon column, got {geometry_column.type}')
+
+    if depth == 2:
+        feature_offsets = np.arange(len(geometry_column) + 1)
+        polygons = geometry_column
+    else:
+        feature_offsets = list_offsets(geometry_column)
+        polygons = geometry_column.flatten()
+    polygon_offsets = list_offsets(polygons)
+    rings = polygons.flatten()
+    ring_offsets = list_offsets(rings)
+    return arrow_coordinates(rings.flatten()), ring_offsets, polygon_offsets, feature_offsets
+
+
+def initial_shapes_from_arrow(geometry_column):
+    return initial_shapes_from_ragged(*ragged_from_arrow(geometry_column))
+
+
+def geometry_hashes(coords, ring_offsets, polygon_offsets, feature_offsets):
+    # SHA-256 of the coordinates and the ring/polygon structure of each feature, e.g. to detect changed features
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    ring_offsets = np.asarray(ring_offsets, dtype=np.int64)
+    polygon_offsets = np.asarray(polygon_offsets, dtype=np.int64)
+    feature_offsets = np.asarray(feature_offsets, dtype=np.int64)
+
+    hashes = []
+    for first_polygon, end_polygon in zip(feature_offsets[:-1].tolist(), feature_offsets[1:].tolist()):
+        polygons = polygon_offsets[first_polygon:end_polygon + 1]
+        rings = ring_offsets[polygons[0]:polygons[-1] + 1]
+        feature_hash = hashlib.sha256()
+        feature_hash.update((polygons - polygons[0]).tobytes())
+        feature_hash.update((rings - rings[0]).tobytes())
+        feature_hash.update(coords[rings[0]:rings[-1]].tobytes())
+        hashes.append(feature_hash.hexdigest())
+    return hashes
+
+
+def is_missing(value):
+    # None, NaN, NaT or pandas.NA
+    try:
+        return value is None or bool(value != value)
+    except TypeError:
+        # the truth value of pandas.NA is ambiguous
+        return True
+
+
+def shape_attributes(columns, feature_indices=None, constants=None):
+    # columns: PRT attribute name -> column (array-like), numbers become float, booleans bool and other values str
+    # missing values (None, NaN) are left out of the attributes of the feature, the rule default applies
+    # feature_indices: rows to keep, e.g. as returned by the initial_shapes_from_* functions
+    # constants: attributes with the same value for all the shapes
+    names = list(columns)
+    values = []
+    has_missing = False
+    for name in names:
+        column = np.asarray(columns[name])
+        if feature_indices is not None:
+            column = column[feature_indices]
+        if column.dtype.kind == 'b':
+            values.append(column.tolist())
+            continue
+        if column.dtype.kind in 'iuf':
+            column = column.astype(np.float64)
+            missing = np.isnan(column)
+            column_values = column.tolist()
+        else:
+            missing = np.fromiter((is_missing(value) for value in column), dtype=bool, count=len(column))
+            column_values = column.astype(str).tolist()
+        if missing.any():
+            has_missing = True
+            for k in np.flatnonzero(missing):
+                column_values[k] = None
+        values.append(column_values)
+
+    constants = constants if constants else {}
+    names.extend(constants)
+    values.extend(itertools.repeat(value) for value in constants.values())
+    if not columns:
+        return [dict(constants)]
+    if has_missing:
+        return [{name: value for name, value in zip(names, row) if value is not None} for row in zip(*values)]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def read_features(path, attribute_columns, layer=None, constants=None):
+    # reads a file with GeoPandas (e.g. GeoPackage or shapefile)
+    # attribute_columns: PRT attribute name -> column name
+    import geopandas
+
+    data_frame = geopandas.read_file(path, layer=layer)
+    initial_shapes, feature_indices = initial_shapes_from_shapely(data_frame.geometry.values)
+    columns = {name: data_frame[column].to_numpy() for name, column in attribute_columns.items()}
+    return initial_shapes, shape_attributes(columns, feature_indices, constants)
@@ -0,0 +1,223 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Columnar on-disk store of the models generated with the PyEncoder, loaded back with numpy.memmap
+# instead of generating or parsing them again (e.g. example 6 with --geometry_store).
+# A store is a directory of raw little-endian arrays:
+#   - vertices.bin (float64, x y z), indices.bin (int32, per model as returned by get_indices) and
+#     face_offsets.bin (int64, F + 1 offsets of the faces into the indices)
+#   - model_vertex_offsets.bin and model_face_offsets.bin (int64, M + 1 offsets of the models into the
+#     vertices and the faces) and initial_shape_indices.bin (int64)
+#   - reports.bin (float64, one row of M values per numeric or boolean report, NaN for the models without
+#     it) and string_reports.json
+#   - meta.json: the counts, the report names (the boolean reports are read back as bool) and the
+#     parameters given to the writer (e.g. the rule package the models were generated with)
+# GeometryStoreWriter appends models as they are generated (e.g. from batch_generation.generate_stream),
+# only the reports are held in memory until close(). GeometryStore maps the arrays, model(k) returns a
+# ModelGeometry whose buffers are views on the mapped files.
+#
+# Example:
+#   with GeometryStoreWriter('city_store') as writer:
+#       writer.append(model_generator.generate_model(attrs, rpk, 'com.esri.pyprt.PyEncoder', {}))
+#   store = GeometryStore('city_store')
+#   store.model(0).triangles(), store.report_column('Min Height.0_avg')
+
+import os
+import json
+import numbers
+
+import numpy as np
+
+from model_geometry import ModelGeometry, flat_buffer
+
+META_FILENAME = 'meta.json'
+STRING_REPORTS_FILENAME = 'string_reports.json'
+ARRAY_DTYPES = {
+    'vertices': np.float64,
+    'indices': np.int32,
+    'face_offsets': np.int64,
+    'model_vertex_offsets': np.int64,
+    'model_face_offsets': np.int64,
+    'initial_shape_indices': np.int64
+}
+
+
+def array_path(store_dir, name):
+    return os.path.join(store_dir, f'{name}.bin')
+
+
+class GeometryStoreWriter:
+    def __init__(self, store_dir, parameters=None):
+        # parameters: JSON serializable, written to meta.json
+        self.store_dir = store_dir
+        self.parameters = parameters
+        os.makedirs(self.store_dir, exist_ok=True)
+        # meta.json is written last, an interrupted write leaves no loadable store
+        if os.path.exists(os.path.join(self.store_dir, META_FILENAME)):
+            os.remove(os.path.join(self.store_dir, META_FILENAME))
+        self.files = {name: open(array_path(store_dir, name), 'wb') for name in ('vertices', 'indices', 'face_offsets')}
+        self.vertex_count = 0
+        self.index_count = 0
+        self.face_count = 0
+        self.model_vertex_offsets = [0]
+        self.model_face_offsets = [0]
+        self.initial_shape_indices = []
+        # report name -> value of each model (None if missing)
+        self.reports = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, models):
+        # models: generated with the PyEncoder (pyprt.GeneratedModel or batch_generation.BatchModel)
+        for model in models:
+            if not model:
+                continue
+            vertices = flat_buffer(model.get_vertices(), np.float64)
+            indices = flat_buffer(model.get_indices(), np.int32)
+            face_counts = flat_buffer(model.get_faces(), np.int64)
+            vertices.tofile(self.files['vertices'])
+            indices.tofile(self.files['indices'])
+            (self.index_count + np.cumsum(face_counts) - face_counts).tofile(self.files['face_offsets'])
+
+            self.vertex_count += len(vertices) // 3
+            self.index_count += len(indices)
+            self.face_count += len(face_counts)
+            self.model_vertex_offsets.append(self.vertex_count)
+            self.model_face_offsets.append(self.face_count)
+            self.initial_shape_indices.append(model.get_initial_shape_index())
+
+            report = model.get_report()
+            models_before = len(self.initial_shape_indices) - 1
+            for name in report:
+                if name not in self.reports:
+                    self.reports[name] = [None] * models_before
+            for name, values in self.reports.items():
+                values.append(report.get(name))
+
+    def close(self):
+        if self.files is None:
+            return
+        np.array([self.index_count], dtype=np.int64).tofile(self.files['face_offsets'])
+        for f in self.files.values():
+            f.close()
+        self.files = None
+
+        for name in ('model_vertex_offsets', 'model_face_offsets', 'initial_shape_indices'):
+            np.asarray(getattr(self, name), dtype=ARRAY_DTYPES[name]).tofile(array_path(self.store_dir, name))
+
+        numeric_reports = []
+        boolean_reports = []
+        string_reports = {}
+        with open(array_path(self.store_dir, 'reports'), 'wb') as f:
+            for name, values in sorted(self.reports.items()):
+                if all(value is None or isinstance(value, numbers.Number) for value in values):
+                    np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64).tofile(f)
+                    numeric_reports.append(name)
+                    if all(value is None or isinstance(value, bool) for value in values):
+                        boolean_reports.append(name)
+                else:
+                    string_reports[name] = values
+        with open(os.path.join(self.store_dir, STRING_REPORTS_FILENAME), 'w') as f:
+            json.dump(string_reports, f)
+
+        meta = {
+            'models': len(self.initial_shape_indices),
+            'vertices': self.vertex_count,
+            'indices': self.index_count,
+            'faces': self.face_count,
+            'numericReports': numeric_reports,
+            'booleanReports': boolean_reports,
+            'stringReports': list(string_reports),
+            'parameters': self.parameters
+        }
+        with open(os.path.join(self.store_dir, META_FILENAME), 'w') as f:
+            json.dump(meta, f)
+
+
+def map_array(path, dtype):
+    # numpy.memmap cannot map empty files
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    # the slices of a plain array view on the map are much cheaper than the slices of the memmap
+    return np.memmap(path, dtype=dtype, mode='r').view(np.ndarray)
+
+
+class GeometryStore:
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_FILENAME), 'r') as f:
+            self.meta = json.load(f)
+        self.arrays = {name: map_array(array_path(store_dir, name), dtype) for name, dtype in ARRAY_DTYPES.items()}
+        self.numeric_reports = {name: k for k, name in enumerate(self.meta['numericReports'])}
+        self.boolean_reports = set(self.meta['booleanReports'])
+        self.reports = map_array(array_path(store_dir, 'reports'), np.float64).reshape(len(self.numeric_reports),
+                                                                                      self.meta['models'])
+        # loaded on the first access
+        self.string_reports = None
+
+    def __len__(self):
+        return self.meta['models']
+
+    @property
+    def vertices(self):
+        # (N, 3) view on the vertices of all the models
+        return self.arrays['vertices'].reshape(-1, 3)
+
+    @property
+    def initial_shape_indices(self):
+        return self.arrays['initial_shape_indices']
+
+    def model(self, k):
+        vertex_offsets = self.arrays['model_vertex_offsets']
+        model_face_offsets = self.arrays['model_face_offsets']
+        face_offsets = self.arrays['face_offsets'][model_face_offsets[k]:model_face_offsets[k + 1] + 1]
+        return ModelGeometry(self.arrays['vertices'][3 * vertex_offsets[k]:3 * vertex_offsets[k + 1]],
+                             self.arrays['indices'][face_offsets[0]:face_offsets[-1]],
+                             np.diff(face_offsets).astype(np.int32))
+
+    def model_ids(self):
+        # model of each vertex
+        return np.repeat(np.arange(len(self)), np.diff(self.arrays['model_vertex_offsets']))
+
+    def report_names(self):
+        return self.meta['numericReports'] + self.meta['stringReports']
+
+    def report_column(self, name):
+        # float64 values of a numeric or boolean report for all the models (NaN if missing, 1.0 and 0.0 for
+        # True and False), or the list of a string report
+        if name in self.numeric_reports:
+            return self.reports[self.numeric_reports[name]]
+        if self.string_reports is None:
+            with open(os.path.join(self.store_dir, STRING_REPORTS_FILENAME), 'r') as f:
+                self.string_reports = json.load(f)
+        return self.string_reports[name]
+
+    def report(self, k):
+        # report of model k, as returned by GeneratedModel.get_report
+        report = {}
+        for name in self.report_names():
+            value = self.report_column(name)[k]
+            if value is not None and not (isinstance(value, float) and np.isnan(value)):
+                if name in self.boolean_reports:
+                    report[name] = bool(value)
+                elif name in self.numeric_reports:
+                    report[name] = float(value)
+                else:
+                    report[name] = value
+        return report
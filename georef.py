@@ -0,0 +1,77 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# NumPy helpers to georeference PyPRT geometry (see example 9).
+# PRT uses a y-up coordinate system: the model is centered on the goal x coordinate,
+# its lowest point is placed at the goal elevation and the goal y coordinate maps to -z.
+
+import numpy as np
+
+
+def vertices_as_array(vertices):
+    # (N, 3) float64 view of a flat vertex buffer, only copies if the input is not float64 yet
+    return np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+
+
+def georef_bounds(vertices):
+    vert_mat = vertices_as_array(vertices)
+    return vert_mat.min(axis=0), vert_mat.max(axis=0)
+
+
+def obj_bounds(obj_path, chunk_lines=65536):
+    # streams the 'v' records of an OBJ file, only chunk_lines vertices are held in memory at once
+    bbox_min = np.full(3, np.inf)
+    bbox_max = np.full(3, -np.inf)
+
+    def update(chunk):
+        vert_mat = np.array(chunk, dtype=np.float64)
+        np.minimum(bbox_min, vert_mat.min(axis=0), out=bbox_min)
+        np.maximum(bbox_max, vert_mat.max(axis=0), out=bbox_max)
+
+    chunk = []
+    with open(obj_path, 'r') as obj_file:
+        for line in obj_file:
+            if line.startswith('v '):
+                chunk.append(line.split()[1:4])
+                if len(chunk) == chunk_lines:
+                    update(chunk)
+                    chunk = []
+    if chunk:
+        update(chunk)
+
+    if np.isinf(bbox_min).any():
+        raise ValueError(f'No vertices found in {obj_path}')
+    return bbox_min, bbox_max
+
+
+def georef_offset(bbox_min, bbox_max, x_coord_goal, y_coord_goal, z_coord_goal):
+    center = (bbox_min + bbox_max) / 2.0
+    return np.array([x_coord_goal - center[0],
+                     z_coord_goal - bbox_min[1],
+                     -y_coord_goal - center[2]], dtype=np.float64)
+
+
+def georef_shift_vertices(model_vertices, x_coord_goal, y_coord_goal, z_coord_goal, out=None):
+    # model_vertices can directly be the output of GeneratedModel.get_vertices()
+    # out: optional preallocated float64 buffer of the same size (pass model_vertices itself to shift in place)
+    vert_mat = vertices_as_array(model_vertices)
+    offset = georef_offset(*georef_bounds(vert_mat), x_coord_goal, y_coord_goal, z_coord_goal)
+
+    if out is None:
+        out = np.empty(vert_mat.size, dtype=np.float64)
+    np.add(vert_mat, offset, out=out.reshape(-1, 3))
+
+    # flat float64 array, as accepted by pyprt.InitialShape
+    return out
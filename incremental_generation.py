@@ -0,0 +1,109 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Incremental regeneration of a scene layer (see example 10). Each feature is keyed on the hash of its
+# geometry, its shape attributes, the rule package and the encoder options, the keys of the last run are
+# stored with the id of the published scene layer: when no feature changed, neither the generation nor the
+# upload are needed. Otherwise the package is generated again from all the features in one generate_model
+# call with the rule package, so that it is identical to a full generation.
+# The package is not assembled from cached models of the unchanged features: the attributes of the I3S
+# features are the CGA reports of the rule, which are lost when models are passed through another rule
+# (e.g. noRule.rpk), and encoding the models of each feature separately costs more than generating them
+# together.
+#
+# Example:
+#   generator = IncrementalGenerator('feature_cache')
+#   keys = feature_keys(geometry_hashes, attrs, file_sha256(rpk), encoder_options)
+#   if not generator.is_unchanged(keys, layer_id):
+#       generator.generate(initial_shapes, attrs, keys, layer_id, rpk, I3S_ENCODER, encoder_options)
+#       generator.commit(keys, layer_id)
+
+import os
+import json
+import hashlib
+
+import pyprt
+
+INDEX_FILENAME = 'index.json'
+
+
+def feature_keys(geometry_hashes, attrs, rpk_hash, encoder_options):
+    # attrs: one dictionary per feature or a single one for all the features
+    if len(attrs) == 1:
+        attrs = attrs * len(geometry_hashes)
+    # the output location and name do not change the generated content
+    options = {key: value for key, value in encoder_options.items() if key not in ('baseName', 'outputPath')}
+    common_data = json.dumps([rpk_hash, options], sort_keys=True)
+    return [hashlib.sha256(json.dumps([geometry_hash, feature_attrs, common_data], sort_keys=True).encode('utf-8'))
+            .hexdigest() for geometry_hash, feature_attrs in zip(geometry_hashes, attrs)]
+
+
+class IncrementalGenerator:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        # features generated again (changed or not) and features of the skipped scene layers
+        self.regenerated = 0
+        self.skipped = 0
+        # features whose key is not in the last published scene layer
+        self.changed = 0
+        self.last_keys = []
+        self.last_layer_id = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.load_index()
+
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def load_index(self):
+        if not os.path.exists(self.index_path()):
+            return
+        with open(self.index_path(), 'r') as f:
+            index = json.load(f)
+        self.last_keys = index['keys']
+        self.last_layer_id = index['layerId']
+
+    def is_unchanged(self, keys, layer_id):
+        # True if the scene layer was last generated from the same features, these are all skipped
+        unchanged = layer_id == self.last_layer_id and keys == self.last_keys
+        if unchanged:
+            self.skipped += len(keys)
+        return unchanged
+
+    def changed_features(self, keys, layer_id):
+        # indices of the features which are not in the last published scene layer (all of them for another layer)
+        last_keys = set(self.last_keys) if layer_id == self.last_layer_id else set()
+        return [k for k, key in enumerate(keys) if key not in last_keys]
+
+    def generate(self, initial_shapes, attrs, keys, layer_id, rpk, encoder, encoder_options):
+        # generates the package of all the features with the rule package
+        self.changed += len(self.changed_features(keys, layer_id))
+        pyprt.ModelGenerator(initial_shapes).generate_model(attrs, rpk, encoder, encoder_options)
+        self.regenerated += len(initial_shapes)
+
+    def commit(self, keys, layer_id):
+        # stores the keys of the published scene layer, written atomically
+        temp_path = self.index_path() + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'keys': keys, 'layerId': layer_id}, f)
+        os.replace(temp_path, self.index_path())
+        self.last_keys = list(keys)
+        self.last_layer_id = layer_id
+
+    def stats(self):
+        return {
+            'regenerated': self.regenerated,
+            'changed': self.changed,
+            'skipped': self.skipped
+        }
@@ -0,0 +1,172 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Timing spans and counters of the stages of a run (shape construction, rule package resolution, generation,
+# encoding, conversion, I/O), e.g. in examples 9 and 10.
+# Spans nest: a span opened inside another one is recorded under the path 'outer/inner'. The stack of open
+# spans is a context variable, so spans of concurrent coroutines (e.g. the jobs of the example 9 server)
+# and threads do not mix. A span can be profiled with cProfile (top functions by cumulative time) and
+# traced with tracemalloc (peak of the allocations), only the outermost of nested profiled or traced
+# spans is captured. The profile covers everything the thread runs meanwhile, e.g. other coroutines.
+# A span waiting for an executor (thread or process pool) is opened with in_worker=True and its call made
+# with run_in_worker: if it is profiled, the call is profiled in the worker, as the profile of the waiting
+# thread would only show the event loop. tracemalloc only traces the process of the span.
+# count() adds to the counters (e.g. shapes, vertices, bytes written), globally and in the innermost open
+# span.
+# Each finished span is appended as a JSON line to jsonl_path, the totals are exposed in the Prometheus
+# text format by prometheus_text() (the /metrics endpoint of example 9).
+#
+# Example:
+#   instrumentation = Instrumentation('run_metrics.jsonl', profiled_spans={'generate'})
+#   with instrumentation.span('generate'):
+#       models = model_generator.generate_model(attrs, rpk, 'com.esri.pyprt.PyEncoder', {})
+#       instrumentation.count('shapes', len(models))
+
+import re
+import json
+import asyncio
+import time
+import pstats
+import cProfile
+import threading
+import functools
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+
+PROFILE_TOP_FUNCTIONS = 10
+
+
+class Instrumentation:
+    def __init__(self, jsonl_path=None, profiled_spans=(), traced_spans=(), prefix='pyprt'):
+        # profiled_spans, traced_spans: names of the spans to profile or to trace in addition to the
+        # spans opened with profile=True or trace_memory=True
+        self.jsonl_path = jsonl_path
+        self.profiled_spans = set(profiled_spans)
+        self.traced_spans = set(traced_spans)
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        # span path -> [count, total seconds]
+        self.span_totals = {}
+        self.counters = {}
+        # open spans of the current context, innermost last
+        self.open_spans = contextvars.ContextVar('open_spans', default=())
+        self.profiling = False
+
+    @contextmanager
+    def span(self, name, profile=False, trace_memory=False, in_worker=False):
+        # yields the span record, fields added to it are written to the JSON line
+        # in_worker: the span waits for a call of run_in_worker, which is profiled instead of this thread
+        parents = self.open_spans.get()
+        path = f"{parents[-1]['span']}/{name}" if parents else name
+        record = {'span': path, 'start': time.time(), 'counters': {}}
+        token = self.open_spans.set(parents + (record,))
+
+        profiler = None
+        if in_worker:
+            record['profiledInWorker'] = profile or name in self.profiled_spans
+        with self.lock:
+            if (profile or name in self.profiled_spans) and not in_worker and not self.profiling:
+                self.profiling = True
+                profiler = cProfile.Profile()
+        tracing = (trace_memory or name in self.traced_spans) and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+                record['profile'] = profile_summary(profiler)
+                self.profiling = False
+            if tracing:
+                record['memoryPeak'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.open_spans.reset(token)
+            self.finish(record)
+
+    async def run_in_worker(self, record, executor, function, *args):
+        # runs function(*args) in executor for the span of record (opened with in_worker=True), a process pool
+        # requires a picklable function and arguments
+        loop = asyncio.get_running_loop()
+        if not record.get('profiledInWorker'):
+            return await loop.run_in_executor(executor, function, *args)
+        result, record['profile'] = await loop.run_in_executor(executor, profiled_call, function, *args)
+        return result
+
+    def timed(self, name=None, profile=False, trace_memory=False):
+        # decorator, the span is named after the function by default
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name if name else function.__name__, profile, trace_memory):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        open_spans = self.open_spans.get()
+        if open_spans:
+            span_counters = open_spans[-1]['counters']
+            span_counters[name] = span_counters.get(name, 0) + value
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self, record):
+        with self.lock:
+            totals = self.span_totals.setdefault(record['span'], [0, 0.0])
+            totals[0] += 1
+            totals[1] += record['seconds']
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+
+    def prometheus_text(self):
+        with self.lock:
+            span_totals = {path: list(totals) for path, totals in self.span_totals.items()}
+            counters = dict(self.counters)
+
+        lines = [f'# HELP {self.prefix}_span_seconds_total Time spent in the spans.',
+                 f'# TYPE {self.prefix}_span_seconds_total counter']
+        lines += [f'{self.prefix}_span_seconds_total{{span="{path}"}} {totals[1]}'
+                  for path, totals in sorted(span_totals.items())]
+        lines += [f'# HELP {self.prefix}_span_count_total Number of finished spans.',
+                  f'# TYPE {self.prefix}_span_count_total counter']
+        lines += [f'{self.prefix}_span_count_total{{span="{path}"}} {totals[0]}'
+                  for path, totals in sorted(span_totals.items())]
+        for name, value in sorted(counters.items()):
+            metric = f"{self.prefix}_{re.sub('[^a-zA-Z0-9_]', '_', name)}_total"
+            lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+def profiled_call(function, *args):
+    # runs in the worker, returns the result and the profile summary of the call
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args)
+    return result, profile_summary(profiler)
+
+
+def profile_summary(profiler):
+    # the functions with the largest cumulative time: 'file:line(function)', calls, cumulative seconds
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    return [{'function': f'{filename}:{line}({function})', 'calls': calls, 'seconds': cumulative}
+            for (filename, line, function), (_, calls, _, cumulative, _) in top]
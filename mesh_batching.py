@@ -0,0 +1,41 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Merging of many generated models into a single vertex/index buffer, used by example 6 to render
+# all the models with one visual per kind (mesh, edges, markers) instead of one per model.
+# The models can have different vertex and face counts.
+
+import numpy as np
+
+
+def merge_models(models_vertices, models_faces):
+    # models_vertices: list of (V, 3) vertex arrays, models_faces: list of (T, 3) triangle arrays (or None)
+    # returns the merged (V, 3) float32 vertices, (T, 3) uint32 faces and the model id of each vertex
+    vertex_counts = np.array([len(vertices) for vertices in models_vertices], dtype=np.int64)
+    vertex_offsets = np.cumsum(vertex_counts) - vertex_counts
+
+    vertices = np.concatenate([np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+                               for vertices in models_vertices])
+    faces = [np.asarray(model_faces, dtype=np.uint32).reshape(-1, 3) + np.uint32(offset)
+             for model_faces, offset in zip(models_faces, vertex_offsets) if model_faces is not None]
+    faces = np.concatenate(faces) if faces else np.empty((0, 3), dtype=np.uint32)
+    model_ids = np.repeat(np.arange(len(models_vertices)), vertex_counts)
+    return vertices, faces, model_ids
+
+
+def model_vertex_colors(model_ids, palette):
+    # palette: (C, 4) RGBA colors, cycled over the model ids
+    palette = np.asarray(palette, dtype=np.float32)
+    return palette[model_ids % len(palette)]
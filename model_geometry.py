@@ -0,0 +1,78 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# NumPy access to the geometry of generated models, instead of the list of lists built by
+# pyprt_utils.vertices_vector_to_matrix and faces_indices_vectors_to_matrix.
+#
+# Copy contract:
+#   - GeneratedModel.get_vertices(), get_indices() and get_faces() return Python lists, these are
+#     converted exactly once into flat NumPy buffers (float64 vertices, int32 indices and face counts).
+#     Inputs which already are NumPy arrays of these dtypes are used as is, without any copy.
+#   - vertices and face(k) return views on these buffers and never copy: writing into a view modifies
+#     the ModelGeometry, copy the view to modify it safely.
+#   - face_vertices(k) (gather) and triangles() are new arrays, computed on each call.
+#
+# Example:
+#   geometry = ModelGeometry.from_model(model)
+#   geometry.vertices[:, 1].max()  # (N, 3) view
+#   geometry.face(0)               # vertex indices of the first face, view
+
+import numpy as np
+
+from triangulation import fan_triangulate
+
+
+def flat_buffer(values, dtype):
+    # no copy if values is already a NumPy array of this dtype
+    if isinstance(values, np.ndarray):
+        return values.astype(dtype, copy=False).reshape(-1)
+    return np.fromiter(values, dtype=dtype, count=len(values))
+
+
+class ModelGeometry:
+    def __init__(self, vertices, indices, face_counts):
+        self.vertex_buffer = flat_buffer(vertices, np.float64)
+        self.indices = flat_buffer(indices, np.int32)
+        self.face_counts = flat_buffer(face_counts, np.int32)
+        # CSR layout: the indices of face k are indices[face_offsets[k]:face_offsets[k + 1]]
+        self.face_offsets = np.zeros(len(self.face_counts) + 1, dtype=np.int64)
+        np.cumsum(self.face_counts, out=self.face_offsets[1:])
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(model.get_vertices(), model.get_indices(), model.get_faces())
+
+    @property
+    def vertices(self):
+        # (N, 3) view
+        return self.vertex_buffer.reshape(-1, 3)
+
+    @property
+    def vertex_count(self):
+        return len(self.vertex_buffer) // 3
+
+    @property
+    def face_count(self):
+        return len(self.face_counts)
+
+    def face(self, k):
+        return self.indices[self.face_offsets[k]:self.face_offsets[k + 1]]
+
+    def face_vertices(self, k):
+        # (face size, 3) coordinates of the vertices of face k
+        return self.vertices[self.face(k)]
+
+    def triangles(self):
+        return fan_triangulate(self.indices, self.face_counts)
@@ -0,0 +1,58 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Generation of several outputs, e.g. PyEncoder reports and OBJ, glTF and I3S files, from one request.
+# PyPRT runs one encoder per generate_model call and every call evaluates the rule again, therefore the
+# PyEncoder outputs with the same triangulation share one pass, which emits the union of the requested
+# geometry and reports (these outputs get the same models). Each file encoder evaluates the rule again:
+# the models cannot be passed from one encoder to the next without losing their reports (the feature
+# attributes of I3S layers), and writing and reading them back costs more than evaluating the rule again.
+#
+# Example:
+#   models, _, _ = generate_many(initial_shapes, [attrs], rpk, [
+#       (PY_ENCODER, {'emitGeometry': False, 'emitReport': True}),
+#       ('com.esri.prt.codecs.GLTFEncoder', {'outputPath': output_dir}),
+#       ('com.esri.prt.codecs.I3SEncoder', slpk_encoder_options('layer', output_dir))])
+
+import pyprt
+
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+
+
+def generate_many(initial_shapes, attrs, rpk, outputs):
+    # outputs: list of (encoder id, encoder options)
+    # returns one entry per output: the generated models for the PyEncoder, None for the file encoders
+    results = [None] * len(outputs)
+    model_generator = pyprt.ModelGenerator(initial_shapes)
+
+    # triangulation -> indices of the PyEncoder outputs
+    py_outputs = {}
+    for k, (encoder, encoder_options) in enumerate(outputs):
+        if encoder == PY_ENCODER:
+            py_outputs.setdefault(bool(encoder_options.get('triangulate', False)), []).append(k)
+    for triangulate, indices in py_outputs.items():
+        encoder_options = {
+            'emitGeometry': any(outputs[k][1].get('emitGeometry', True) for k in indices),
+            'emitReport': any(outputs[k][1].get('emitReport', True) for k in indices),
+            'triangulate': triangulate
+        }
+        models = model_generator.generate_model(attrs, rpk, PY_ENCODER, encoder_options)
+        for k in indices:
+            results[k] = models
+
+    for encoder, encoder_options in outputs:
+        if encoder != PY_ENCODER:
+            model_generator.generate_model(attrs, rpk, encoder, encoder_options)
+    return results
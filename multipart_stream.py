@@ -0,0 +1,128 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Incremental multipart/form-data parser (see example 9): the request body is fed chunk by chunk
+# and the content of each part is directly written into the sink returned by open_part(name, filename),
+# so only a few bytes around the part boundaries are buffered in memory.
+
+from email.message import Message
+
+MAX_HEADERS_SIZE = 16 * 1024
+
+
+class MultipartError(Exception):
+    pass
+
+
+def parse_header_params(header_name, header_value):
+    # returns (value, params), e.g. ('form-data', {'name': 'file', 'filename': 'model.obj'})
+    msg = Message()
+    msg[header_name] = header_value
+    params = msg.get_params(header=header_name)
+    return params[0][0], {key.lower(): value for key, value in params[1:]}
+
+
+def get_boundary(content_type):
+    value, params = parse_header_params('Content-Type', content_type)
+    if value != 'multipart/form-data' or not params.get('boundary'):
+        raise MultipartError(f'Expected a multipart/form-data request, got: {content_type}')
+    return params['boundary'].encode('latin-1')
+
+
+class MultipartStreamParser:
+    def __init__(self, boundary, open_part):
+        # open_part(name, filename) returns an object with a write(bytes) method, filename is None for form fields
+        self.delimiter = b'\r\n--' + boundary
+        self.open_part = open_part
+        self.sink = None
+        self.state = 'preamble'
+        # the first boundary is not preceded by a line break
+        self.buffer = bytearray(b'\r\n')
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        while self.step():
+            pass
+
+    def finish(self):
+        if self.state != 'done':
+            raise MultipartError('Incomplete multipart body.')
+
+    # processes the buffer as far as possible, returns False when more data is needed
+    def step(self):
+        if self.state == 'preamble':
+            index = self.buffer.find(self.delimiter)
+            if index < 0:
+                del self.buffer[:-len(self.delimiter)]
+                return False
+            del self.buffer[:index + len(self.delimiter)]
+            self.state = 'delimiter'
+            return True
+
+        if self.state == 'delimiter':
+            if len(self.buffer) < 2:
+                return False
+            if self.buffer[:2] == b'--':
+                self.state = 'done'
+            elif self.buffer[:2] == b'\r\n':
+                self.state = 'headers'
+            else:
+                raise MultipartError('Invalid multipart boundary.')
+            del self.buffer[:2]
+            return self.state != 'done'
+
+        if self.state == 'headers':
+            index = self.buffer.find(b'\r\n\r\n')
+            if index < 0:
+                if len(self.buffer) > MAX_HEADERS_SIZE:
+                    raise MultipartError('Multipart headers too large.')
+                return False
+            self.begin_part(bytes(self.buffer[:index]).decode('utf-8'))
+            del self.buffer[:index + 4]
+            self.state = 'body'
+            return True
+
+        if self.state == 'body':
+            index = self.buffer.find(self.delimiter)
+            if index < 0:
+                # keep enough bytes to detect a delimiter split across chunks
+                flush_size = len(self.buffer) - len(self.delimiter) + 1
+                if flush_size > 0:
+                    self.sink.write(self.buffer[:flush_size])
+                    del self.buffer[:flush_size]
+                return False
+            self.sink.write(self.buffer[:index])
+            del self.buffer[:index + len(self.delimiter)]
+            self.sink = None
+            self.state = 'delimiter'
+            return True
+
+        # 'done': ignore the epilogue
+        self.buffer.clear()
+        return False
+
+    def begin_part(self, raw_headers):
+        disposition = None
+        for line in raw_headers.split('\r\n'):
+            header_name, _, header_value = line.partition(':')
+            if header_name.strip().lower() == 'content-disposition':
+                disposition = header_value.strip()
+        if disposition is None:
+            raise MultipartError('Multipart part without Content-Disposition header.')
+
+        _, params = parse_header_params('Content-Disposition', disposition)
+        if 'name' not in params:
+            raise MultipartError('Multipart part without name.')
+        self.sink = self.open_part(params['name'], params.get('filename'))
@@ -0,0 +1,199 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Vectorized OBJ geometry loader and cache of the parsed files, to build the initial shapes of OBJ files
+# used again and again (e.g. parcels of a parameter sweep) without parsing them each time.
+# read_obj maps the file and parses its 'v' and 'f' records with NumPy: float64 vertices, int32 vertex
+# indices (texture and normal indices are ignored, negative indices are resolved) and int32 face vertex
+# counts. Leading whitespace and trailing '#' comments of the records are ignored. All the faces form one
+# initial shape, as with pyprt.InitialShape(obj_path). Unlike the path constructor, materials and texture
+# coordinates are not loaded: use it for footprints, not for textured models such as the uploads of example 9.
+# ObjShapeCache stores the parsed arrays in <cache_dir>/<sha256 of the file>.npz. The files are looked up
+# by path, size and modification time, a touched but unchanged file is hashed again and still hits.
+#
+# Example:
+#   obj_cache = ObjShapeCache('obj_cache')
+#   initial_shape = obj_cache.initial_shape(asset_file('building_parcel.obj'))
+
+import os
+import json
+import mmap
+import tempfile
+
+import numpy as np
+import pyprt
+
+from hashing import file_sha256
+
+INDEX_FILENAME = 'index.json'
+
+
+def parse_numbers(data, starts, ends, dtype, strip_slashes=False):
+    # numbers in the byte ranges [starts, ends) of the records, which start with a whitespace
+    # strip_slashes: only the number before the first '/' of each token is kept (vertex index of a face record)
+    # returns the numbers and the number of tokens per record
+    if len(starts) == 0:
+        return np.empty(0, dtype=dtype), np.zeros(0, dtype=np.int64)
+    # the records are sorted and do not overlap: alternating runs of skipped and record bytes
+    runs = np.empty(2 * len(starts) + 1, dtype=np.int64)
+    runs[0:-1:2] = starts - np.concatenate([[0], ends[:-1]])
+    runs[1::2] = ends - starts
+    runs[-1] = len(data) - ends[-1]
+    in_record = np.zeros(len(runs), dtype=bool)
+    in_record[1::2] = True
+    record_bytes = data[np.repeat(in_record, runs)]
+    record_offsets = np.concatenate([[0], np.cumsum(runs[1::2])])
+
+    # space, tab, carriage return and newline
+    is_space = record_bytes <= ord(' ')
+    is_comment = record_bytes == ord('#')
+    if is_comment.any():
+        # blanks the bytes from a '#' to the end of the record
+        comments = np.cumsum(is_comment)
+        is_comment = comments > np.repeat(comments[record_offsets[:-1] - 1] * (record_offsets[:-1] > 0), runs[1::2])
+        record_bytes[is_comment] = ord(' ')
+        is_space |= is_comment
+    if strip_slashes and (record_bytes == ord('/')).any():
+        # blanks the bytes from a '/' to the end of the token
+        slashes = np.cumsum(record_bytes == ord('/'))
+        after_slash = slashes > np.maximum.accumulate(np.where(is_space, slashes, 0))
+        record_bytes[after_slash] = ord(' ')
+        is_space |= after_slash
+    token_starts = np.flatnonzero(~is_space[1:] & is_space[:-1]) + 1
+    tokens_per_record = np.diff(np.searchsorted(token_starts, record_offsets))
+    numbers = np.fromstring(record_bytes.tobytes(), dtype=dtype, sep=' ')
+    # older NumPy versions stop at the first token which is not a number instead of raising
+    if len(numbers) != len(token_starts):
+        raise ValueError('Invalid number')
+    return numbers, tokens_per_record
+
+
+def parse_obj(data):
+    # data: uint8 array of the OBJ file, returns the arrays of read_obj
+    newlines = np.flatnonzero(data == ord('\n'))
+    line_starts = np.concatenate([[0], newlines + 1])
+    line_ends = np.concatenate([newlines, [len(data)]])
+    # leading spaces and tabs
+    indented = np.flatnonzero(line_starts < line_ends)
+    indented = indented[(data[line_starts[indented]] == ord(' ')) | (data[line_starts[indented]] == ord('\t'))]
+    while len(indented) > 0:
+        line_starts[indented] += 1
+        indented = indented[line_starts[indented] < line_ends[indented]]
+        indented = indented[(data[line_starts[indented]] == ord(' ')) | (data[line_starts[indented]] == ord('\t'))]
+    # records: keyword of one byte followed by a whitespace, e.g. 'v ' but not 'vt '
+    is_record = line_starts + 1 < line_ends
+    line_starts, line_ends = line_starts[is_record], line_ends[is_record]
+    is_record = data[line_starts + 1] <= ord(' ')
+    vertex_lines = is_record & (data[line_starts] == ord('v'))
+    face_lines = is_record & (data[line_starts] == ord('f'))
+
+    vertex_starts = line_starts[vertex_lines]
+    vertices, coordinates_per_line = parse_numbers(data, vertex_starts + 1, line_ends[vertex_lines], np.float64)
+    if (coordinates_per_line != 3).any():
+        # e.g. homogeneous coordinates or vertex colors: the first three numbers of each record
+        first_coordinates = np.concatenate([[0], np.cumsum(coordinates_per_line)[:-1]])
+        vertices = vertices[first_coordinates[:, np.newaxis] + np.arange(3)].reshape(-1)
+    face_starts = line_starts[face_lines]
+    indices, face_counts = parse_numbers(data, face_starts + 1, line_ends[face_lines], np.int64, strip_slashes=True)
+
+    # OBJ indices start at 1, negative indices count back from the last vertex defined before the face
+    if (indices < 0).any():
+        vertices_before = np.repeat(np.searchsorted(vertex_starts, face_starts), face_counts)
+        indices = np.where(indices < 0, vertices_before + indices + 1, indices)
+    indices -= 1
+    if len(indices) > 0 and (indices.min() < 0 or indices.max() >= len(vertices) // 3):
+        raise ValueError('Face index out of range')
+    return vertices, indices.astype(np.int32), face_counts.astype(np.int32)
+
+
+def read_obj(obj_path):
+    # returns the (N * 3,) float64 vertices, the int32 vertex indices and the int32 vertex counts of the faces
+    with open(obj_path, 'rb') as obj_file, mmap.mmap(obj_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = np.frombuffer(mapped, dtype=np.uint8)
+        try:
+            return parse_obj(data)
+        except ValueError as e:
+            error = str(e)
+        finally:
+            # the map cannot be closed while an array (or a traceback) refers to it
+            del data
+    raise ValueError(f'{error} in {obj_path}')
+
+
+def make_initial_shape(vertices, indices, face_counts):
+    # pyprt.InitialShape converts Python lists faster than NumPy arrays
+    return pyprt.InitialShape(vertices.tolist(), indices.tolist(), face_counts.tolist())
+
+
+class ObjShapeCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        # '<path>/<size>/<modification time>' -> content hash
+        self.files = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.load_index()
+
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def load_index(self):
+        if os.path.exists(self.index_path()):
+            with open(self.index_path(), 'r') as f:
+                self.files = json.load(f)
+
+    def save_index(self):
+        with open(self.index_path(), 'w') as f:
+            json.dump(self.files, f)
+
+    def entry_path(self, content_hash):
+        return os.path.join(self.cache_dir, f'{content_hash}.npz')
+
+    def load(self, obj_path):
+        # returns the arrays of read_obj, parsed only if the content was not cached yet
+        obj_path = os.path.abspath(obj_path)
+        stat = os.stat(obj_path)
+        file_key = f'{obj_path}/{stat.st_size}/{stat.st_mtime_ns}'
+        content_hash = self.files.get(file_key)
+        if content_hash is None or not os.path.exists(self.entry_path(content_hash)):
+            content_hash = file_sha256(obj_path)
+            self.files[file_key] = content_hash
+            self.save_index()
+
+        if os.path.exists(self.entry_path(content_hash)):
+            self.hits += 1
+            with np.load(self.entry_path(content_hash)) as entry:
+                return entry['vertices'], entry['indices'], entry['face_counts']
+
+        self.misses += 1
+        vertices, indices, face_counts = read_obj(obj_path)
+        # written next to the entry first, an interrupted write leaves no partial entry
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.npz', delete=False) as f:
+            np.savez(f, vertices=vertices, indices=indices, face_counts=face_counts)
+        os.replace(f.name, self.entry_path(content_hash))
+        return vertices, indices, face_counts
+
+    def initial_shape(self, obj_path):
+        return make_initial_shape(*self.load(obj_path))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups > 0 else 0.0,
+            'entries': len(set(self.files.values()))
+        }
@@ -0,0 +1,143 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Picklable report based objective functions for scipy.optimize (see example 7).
+# A ReportObjective minimizes the negated weighted sum of report values. It only holds plain data, the
+# ModelGenerator is created on first use in each process, the few most recently used ones are kept.
+# It plugs into both parallel interfaces of differential_evolution:
+#   - workers=ParallelMap(processes): the population is evaluated on a pool of worker processes
+#   - vectorized=True: the whole population is generated with a single generate_model call
+# Given a report_cache.CachedReportGenerator, the reports are looked up in its cache first and only the
+# missing ones are generated (and stored). The report generator is not picklable, such an objective is
+# meant for a serial or vectorized optimization in the main process.
+#
+# Example:
+#   objective = ReportObjective(parcel_path, rpk, attrs, ['lot_coverage_parameter'], {'Greenery Area_sum': 1.0})
+#   with ParallelMap(4) as workers:
+#       res = optimize.differential_evolution(objective, bounds, workers=workers, updating='deferred')
+
+import os
+import time
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyprt
+
+from batch_generation import PY_ENCODER, make_initial_shape
+from report_cache import shape_hash
+
+MAX_MODEL_GENERATORS = 4
+
+# (initial shape hash, number of copies) -> pyprt.ModelGenerator, per process, least recently used first
+_model_generators = OrderedDict()
+
+
+def model_generator(shape_key, initial_shape, copies=1):
+    key = (shape_key, copies)
+    if key in _model_generators:
+        _model_generators.move_to_end(key)
+    else:
+        _model_generators[key] = pyprt.ModelGenerator([make_initial_shape(initial_shape) for _ in range(copies)])
+        if len(_model_generators) > MAX_MODEL_GENERATORS:
+            _model_generators.popitem(last=False)
+    return _model_generators[key]
+
+
+class ReportObjective:
+    def __init__(self, initial_shape, rpk, attrs, input_attrs, goal_weights, integer_attrs=(), report_generator=None):
+        # initial_shape: shape_data of the initial shape
+        # input_attrs: attribute names of the optimization variables, in the order of x
+        # goal_weights: report key -> weight, the objective is -sum(weight * report value)
+        # integer_attrs: optimization variables rounded to the closest integer
+        # report_generator: optional CachedReportGenerator of the same initial shape and rule package
+        self.initial_shape = initial_shape
+        self.shape_key = shape_hash(initial_shape)
+        self.rpk = rpk
+        self.attrs = dict(attrs)
+        self.input_attrs = list(input_attrs)
+        self.goal_weights = dict(goal_weights)
+        self.integer_attrs = set(integer_attrs)
+        self.report_generator = report_generator
+
+    def attributes(self, x):
+        attrs = dict(self.attrs)
+        for name, value in zip(self.input_attrs, x):
+            attrs[name] = float(round(value)) if name in self.integer_attrs else float(value)
+        return attrs
+
+    def report_value(self, report):
+        if not report:
+            return np.inf
+        return -sum(weight * report[key] for key, weight in self.goal_weights.items())
+
+    def cached_values(self, population):
+        lookups = [self.report_generator.lookup(self.attributes(member)) for member in population]
+        misses = [k for k, (_, _, report) in enumerate(lookups) if report is None]
+        reports = [report for _, _, report in lookups]
+        if misses:
+            start = time.perf_counter()
+            models = model_generator(self.shape_key, self.initial_shape, len(misses)).generate_model(
+                [lookups[k][1] for k in misses], self.rpk, PY_ENCODER, {'emitGeometry': False})
+            self.report_generator.add_generation(len(misses), time.perf_counter() - start)
+            for model in models:
+                k = misses[model.get_initial_shape_index()]
+                reports[k] = model.get_report()
+                self.report_generator.store(lookups[k][0], reports[k])
+        return np.array([self.report_value(report) for report in reports])
+
+    def __call__(self, x):
+        x = np.asarray(x)
+        if self.report_generator is not None:
+            values = self.cached_values(x.T if x.ndim == 2 else [x])
+            return values if x.ndim == 2 else values[0]
+
+        if x.ndim == 1:
+            models = model_generator(self.shape_key, self.initial_shape).generate_model(
+                [self.attributes(x)], self.rpk, PY_ENCODER, {'emitGeometry': False})
+            return self.report_value(models[0].get_report() if models else None)
+
+        # vectorized: x.shape == (len(input_attrs), population size)
+        population = x.T
+        models = model_generator(self.shape_key, self.initial_shape, len(population)).generate_model(
+            [self.attributes(member) for member in population], self.rpk, PY_ENCODER, {'emitGeometry': False})
+        values = np.full(len(population), np.inf)
+        for model in models:
+            values[model.get_initial_shape_index()] = self.report_value(model.get_report())
+        return values
+
+
+class ParallelMap:
+    # map-like callable for the workers argument of scipy.optimize functions
+    def __init__(self, processes=None):
+        self.processes = processes if processes else os.cpu_count()
+        # PRT does not survive a fork once initialized, the workers are started from scratch
+        self.executor = ProcessPoolExecutor(max_workers=self.processes,
+                                            mp_context=multiprocessing.get_context('spawn'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __call__(self, func, iterable):
+        items = list(iterable)
+        chunk_size = max(1, len(items) // (4 * self.processes))
+        return list(self.executor.map(func, items, chunksize=chunk_size))
@@ -0,0 +1,195 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Portal operations of example 10: fetching the source features and the rule package, uploading and
+# publishing the SLPK and replacing the existing scene layer. ArcGISPortal performs them on ArcGIS Online,
+# LocalPortal stands in for it with a directory, e.g. to run and benchmark the whole update cycle offline:
+#   <root>/features/<item id>.parquet    source features, GeoArrow polygon column 'geometry' and attribute columns
+#   <root>/features/<item id>.gpkg       or any file readable by GeoPandas, the layer name is passed to GeoPandas
+#   <root>/rule_packages/<item id>.rpk   rule packages
+#   <root>/uploads/<item id>.slpk        uploaded SLPKs
+#   <root>/layers/<item id>.slpk, .json  published scene layers and their title
+# Both portals convert the source features with feature_shapes.py and return them as initial shapes (or as
+# shape_data, e.g. for tiled_encoding.py), the aligned attribute columns (PRT attribute name -> list of
+# values) and a hash of the geometry of each feature.
+# The features which cannot be converted are left out of the three.
+
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+from feature_shapes import (geometry_hashes, initial_shapes_from_ragged, ragged_from_arrow, ragged_from_esri_json,
+                            ragged_from_shapely, shape_data_from_ragged)
+
+try:
+    from arcgis.gis import ItemProperties, ItemTypeEnum
+except ModuleNotFoundError:
+    ItemProperties = None
+
+
+def converted_features(ragged, source_columns, attribute_columns, shape_data=False):
+    # ragged: ragged arrays of the source features, source_columns: column name -> values of the source features
+    # attribute_columns: PRT attribute name -> column name
+    # shape_data: return the arguments of pyprt.InitialShape (picklable) instead of the initial shapes
+    convert = shape_data_from_ragged if shape_data else initial_shapes_from_ragged
+    initial_shapes, feature_indices = convert(*ragged)
+    columns = {name: np.asarray(source_columns[column])[feature_indices].tolist()
+               for name, column in attribute_columns.items()}
+    hashes = np.asarray(geometry_hashes(*ragged))[feature_indices].tolist()
+    return initial_shapes, columns, hashes
+
+
+class ArcGISPortal:
+    def __init__(self, gis, folder_name, rpk_cache):
+        if ItemProperties is None:
+            raise RuntimeError('The arcgis package is required to use ArcGIS Online.')
+        self.gis = gis
+        self.folder_name = folder_name
+        # RulePackageCache, the rule packages are only downloaded again when their item was modified
+        self.rpk_cache = rpk_cache
+
+    def fetch_features(self, item_id, layer_name, attribute_columns, shape_data=False):
+        feature_layer_collection = self.gis.content.get(item_id)
+        feature_layer = next(layer for layer in feature_layer_collection.layers
+                             if layer.properties.name == layer_name)
+        feature_set = feature_layer.query(return_z=True)
+        ragged = ragged_from_esri_json([feature.geometry for feature in feature_set.features])
+        source_columns = {column: np.array([feature.attributes[column] for feature in feature_set.features],
+                                           dtype=object)
+                          for column in attribute_columns.values()}
+        return converted_features(ragged, source_columns, attribute_columns, shape_data)
+
+    def fetch_rule_package(self, item_id):
+        return self.rpk_cache.get_item(self.gis.content.get(item_id))
+
+    def get_title(self, item_id):
+        # None if the item does not exist
+        item = self.gis.content.get(item_id)
+        return item.title if item else None
+
+    def set_title(self, item_id, title):
+        self.gis.content.get(item_id).update(item_properties={'title': title})
+
+    def upload_package(self, slpk_path, title):
+        item_folder = self.gis.content.folders.get(folder=self.folder_name)
+        if item_folder is None:
+            item_folder = self.gis.content.folders.create(self.folder_name)
+        item_properties = ItemProperties(title=title, item_type=ItemTypeEnum.SCENE_PACKAGE.value)
+        return item_folder.add(file=slpk_path, item_properties=item_properties).result().id
+
+    def publish_package(self, package_id):
+        # publishes the uploaded SLPK as a scene layer and deletes the SLPK item
+        package_item = self.gis.content.get(package_id)
+        scene_layer_item = package_item.publish()
+        package_item.delete()
+        return scene_layer_item.id
+
+    def replace_layer(self, target_id, new_id):
+        # the service of the new scene layer replaces the target one, the new item is deleted
+        target_item = self.gis.content.get(target_id)
+        new_item = self.gis.content.get(new_id)
+        replaced = self.gis.content.replace_service(target_item, new_item, replace_metadata=True)
+        new_item.delete()
+        return replaced
+
+
+class LocalPortal:
+    def __init__(self, root_dir, delay=0.0):
+        # delay (in seconds) simulates the round trip of each portal operation
+        self.root_dir = root_dir
+        self.delay = delay
+        self.features_dir = os.path.join(root_dir, 'features')
+        self.rule_packages_dir = os.path.join(root_dir, 'rule_packages')
+        self.uploads_dir = os.path.join(root_dir, 'uploads')
+        self.layers_dir = os.path.join(root_dir, 'layers')
+        for directory in (self.features_dir, self.rule_packages_dir, self.uploads_dir, self.layers_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def round_trip(self):
+        if self.delay > 0.0:
+            time.sleep(self.delay)
+
+    def fetch_features(self, item_id, layer_name, attribute_columns, shape_data=False):
+        self.round_trip()
+        parquet_path = os.path.join(self.features_dir, f'{item_id}.parquet')
+        if os.path.exists(parquet_path):
+            import pyarrow.parquet
+
+            table = pyarrow.parquet.read_table(parquet_path,
+                                               columns=['geometry'] + list(attribute_columns.values()))
+            ragged = ragged_from_arrow(table.column('geometry'))
+            source_columns = {column: table.column(column).to_numpy() for column in attribute_columns.values()}
+        else:
+            import geopandas
+
+            paths = [name for name in os.listdir(self.features_dir) if os.path.splitext(name)[0] == item_id]
+            if not paths:
+                raise FileNotFoundError(f'No features for item {item_id} in {self.features_dir}')
+            data_frame = geopandas.read_file(os.path.join(self.features_dir, paths[0]), layer=layer_name)
+            ragged = ragged_from_shapely(data_frame.geometry.values)
+            source_columns = {column: data_frame[column].to_numpy() for column in attribute_columns.values()}
+
+        return converted_features(ragged, source_columns, attribute_columns, shape_data)
+
+    def fetch_rule_package(self, item_id):
+        self.round_trip()
+        rpk_path = os.path.join(self.rule_packages_dir, f'{item_id}.rpk')
+        if not os.path.exists(rpk_path):
+            raise FileNotFoundError(f'No rule package for item {item_id} in {self.rule_packages_dir}')
+        return rpk_path
+
+    def layer_path(self, item_id, extension):
+        return os.path.join(self.layers_dir, f'{item_id}{extension}')
+
+    def get_title(self, item_id):
+        self.round_trip()
+        metadata_path = self.layer_path(item_id, '.json')
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path) as f:
+            return json.load(f)['title']
+
+    def set_title(self, item_id, title):
+        self.round_trip()
+        with open(self.layer_path(item_id, '.json'), 'w') as f:
+            json.dump({'title': title}, f)
+
+    def upload_package(self, slpk_path, title):
+        self.round_trip()
+        package_id = uuid.uuid4().hex
+        shutil.copyfile(slpk_path, os.path.join(self.uploads_dir, f'{package_id}.slpk'))
+        with open(os.path.join(self.uploads_dir, f'{package_id}.json'), 'w') as f:
+            json.dump({'title': title}, f)
+        return package_id
+
+    def publish_package(self, package_id):
+        self.round_trip()
+        layer_id = uuid.uuid4().hex
+        os.replace(os.path.join(self.uploads_dir, f'{package_id}.slpk'), self.layer_path(layer_id, '.slpk'))
+        os.replace(os.path.join(self.uploads_dir, f'{package_id}.json'), self.layer_path(layer_id, '.json'))
+        return layer_id
+
+    def replace_layer(self, target_id, new_id):
+        # the target keeps its id and title
+        self.round_trip()
+        if not os.path.exists(self.layer_path(target_id, '.json')):
+            return False
+        os.replace(self.layer_path(new_id, '.slpk'), self.layer_path(target_id, '.slpk'))
+        os.remove(self.layer_path(new_id, '.json'))
+        return True
@@ -0,0 +1,143 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Memoized report-only generation, e.g. for the objective functions of example 7.
+# Reports are keyed on the rule package content, the initial shape and the shape attributes. With the opt-in
+# quantization, an attribute with a quantization step is rounded to a multiple of that step before the
+# generation, so that all the evaluations falling into the same step share one report (this changes the
+# results of an optimization, the objective becomes a step function). The least recently used
+# reports are dropped above max_entries, the cache can be persisted to a JSON file between runs.
+#
+# Example:
+#   report_generator = CachedReportGenerator(shape_data(obj_path), rpk, quantization={'shape_of_building': 1.0})
+#   report = report_generator.get_report(attrs)
+
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+import pyprt
+
+from batch_generation import PY_ENCODER, make_initial_shape
+from hashing import file_sha256
+
+
+def shape_hash(data):
+    # data: shape_data, i.e. a file path or the arguments of pyprt.InitialShape
+    if isinstance(data, str):
+        return file_sha256(data)
+    return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+
+def quantize_attributes(attrs, quantization):
+    quantized_attrs = {}
+    for name, value in attrs.items():
+        step = quantization.get(name)
+        if step and isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(round(value / step) * step)
+        quantized_attrs[name] = value
+    return quantized_attrs
+
+
+class CachedReportGenerator:
+    def __init__(self, initial_shape, rpk, quantization=None, max_entries=10000, cache_path=None):
+        # initial_shape: shape_data of the initial shape
+        # quantization: attribute name -> quantization step, other attributes are matched exactly
+        self.rpk = rpk
+        self.quantization = quantization if quantization else {}
+        self.max_entries = max_entries
+        self.cache_path = cache_path
+        self.model_generator = pyprt.ModelGenerator([make_initial_shape(initial_shape)])
+        self.key_prefix = [file_sha256(rpk), shape_hash(initial_shape)]
+
+        self.hits = 0
+        self.misses = 0
+        self.generation_time = 0.0
+        # mean generation time of the previous runs, to estimate the time saved by a warm cache
+        self.previous_mean_generation_time = 0.0
+        # key -> report, least recently used first
+        self.reports = OrderedDict()
+        self.load()
+
+    def load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path, 'r') as f:
+            cache_data = json.load(f)
+        self.previous_mean_generation_time = cache_data['meanGenerationTime']
+        self.reports.update(cache_data['reports'][-self.max_entries:])
+
+    def make_key(self, quantized_attrs):
+        key_data = json.dumps([self.key_prefix, quantized_attrs], sort_keys=True)
+        return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+    def lookup(self, attrs):
+        # (key, quantized attributes, cached report or None), the caller generates and stores the missing report
+        quantized_attrs = quantize_attributes(attrs, self.quantization)
+        key = self.make_key(quantized_attrs)
+        report = self.reports.get(key)
+        if report is not None:
+            self.hits += 1
+            self.reports.move_to_end(key)
+        return key, quantized_attrs, report
+
+    def store(self, key, report):
+        self.reports[key] = report
+        if len(self.reports) > self.max_entries:
+            self.reports.popitem(last=False)
+
+    def add_generation(self, misses, generation_time):
+        self.misses += misses
+        self.generation_time += generation_time
+
+    def get_report(self, attrs):
+        key, quantized_attrs, report = self.lookup(attrs)
+        if report is not None:
+            return report
+
+        start = time.perf_counter()
+        models = self.model_generator.generate_model([quantized_attrs], self.rpk, PY_ENCODER, {'emitGeometry': False})
+        self.add_generation(1, time.perf_counter() - start)
+        if not models:
+            return None
+
+        report = models[0].get_report()
+        self.store(key, report)
+        return report
+
+    def mean_generation_time(self):
+        if self.misses > 0:
+            return self.generation_time / self.misses
+        return self.previous_mean_generation_time
+
+    def save(self):
+        if self.cache_path:
+            with open(self.cache_path, 'w') as f:
+                json.dump({'meanGenerationTime': self.mean_generation_time(),
+                           'reports': list(self.reports.items())}, f)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups > 0 else 0.0,
+            'entries': len(self.reports),
+            'generationTime': self.generation_time,
+            # estimated from the mean generation time of the misses
+            'savedTime': self.hits * self.mean_generation_time()
+        }
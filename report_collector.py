@@ -0,0 +1,185 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Columnar collection of CGA reports for parameter sweeps (see example 5).
+# The report schema is discovered from the first appended report (keys of later reports and new sweep
+# parameters add columns), the values are then appended into preallocated NumPy columns which grow
+# geometrically. A column whose values change type (e.g. a str in a float column) becomes an object
+# column. Each row is tagged with the initial shape index and the sweep parameters.
+# The DataFrame returned by to_dataframe shares the column buffers (no copy).
+# Writing Parquet/Feather files requires the optional pyarrow package.
+#
+# Example:
+#   collector = ReportCollector(key_filter=lambda key: '_sum' in key)
+#   collector.append(model.get_report(), shape_index, minBuildingHeight=10.0)
+#   df = collector.to_dataframe()
+
+import numpy as np
+import pandas as pd
+
+SHAPE_INDEX_COLUMN = 'shape_index'
+
+
+def column_dtype(value):
+    if isinstance(value, (bool, np.bool_)):
+        return np.bool_
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return np.float64
+    return object
+
+
+# exact types of the usual report and parameter values -> column_dtype
+VALUE_DTYPES = {bool: np.bool_, np.bool_: np.bool_, int: np.float64, float: np.float64, np.float64: np.float64}
+
+
+def missing_value(dtype):
+    # bool columns cannot hold a missing value, they are converted to object columns
+    return np.nan if dtype == np.float64 else None
+
+
+class ReportCollector:
+    def __init__(self, key_filter=None, initial_capacity=1024):
+        # key_filter: optional callable selecting the report keys to collect
+        self.key_filter = key_filter
+        self.capacity = initial_capacity
+        self.size = 0
+        self.report_keys = None
+        # all the keys of the appended reports, including the filtered out ones
+        self.seen_keys = set()
+        self.param_names = None
+        self.columns = {}
+        # column name -> dtype of its values (np.bool_, np.float64, np.int64 or object)
+        self.column_dtypes = {}
+        # column name -> type of the last value set (except None), the values of this type need no conversion
+        self.value_types = {}
+
+    def __len__(self):
+        return self.size
+
+    def add_column(self, name, dtype):
+        column = np.empty(self.capacity, dtype=dtype)
+        if self.size > 0:
+            column = column.astype(object) if dtype == np.bool_ else column
+            column[:self.size] = missing_value(column.dtype)
+        self.columns[name] = column
+        self.column_dtypes[name] = object if column.dtype == object else dtype
+
+    def to_object_column(self, name):
+        column = self.columns[name] = self.columns[name].astype(object)
+        self.column_dtypes[name] = object
+        return column
+
+    def init_schema(self, report, params):
+        self.report_keys = [key for key in report if self.key_filter is None or self.key_filter(key)]
+        self.seen_keys.update(report)
+        self.param_names = list(params)
+        self.add_column(SHAPE_INDEX_COLUMN, np.int64)
+        for name in self.param_names:
+            self.add_column(name, column_dtype(params[name]))
+        for key in self.report_keys:
+            self.add_column(key, column_dtype(report[key]))
+
+    def grow(self):
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown_column = np.empty(self.capacity, dtype=column.dtype)
+            grown_column[:self.size] = column[:self.size]
+            self.columns[name] = grown_column
+
+    def set_value(self, name, value):
+        column = self.columns[name]
+        dtype = self.column_dtypes[name]
+        if value is None:
+            if dtype is np.bool_:
+                column = self.to_object_column(name)
+            value = missing_value(column.dtype)
+        elif dtype is not object:
+            value_dtype = VALUE_DTYPES.get(type(value))
+            if value_dtype is not dtype and (value_dtype is not None or column_dtype(value) is not dtype):
+                # e.g. a str in a float column or a float in a bool column, which NumPy would convert
+                column = self.to_object_column(name)
+        column[self.size] = value
+        if value is not None:
+            self.value_types[name] = type(value)
+
+    def add_params(self, params):
+        for name, value in params.items():
+            if name not in self.columns:
+                self.add_column(name, column_dtype(value))
+                self.param_names.append(name)
+                self.set_value(name, value)
+
+    def append(self, report, shape_index, **params):
+        if self.report_keys is None:
+            self.init_schema(report, params)
+        elif self.size == self.capacity:
+            self.grow()
+
+        self.columns[SHAPE_INDEX_COLUMN][self.size] = shape_index
+        columns = self.columns
+        value_types = self.value_types
+        # a parameter which was not given to the first append makes params larger or leaves a known one missing
+        new_params = len(params) != len(self.param_names)
+        for name in self.param_names:
+            value = params.get(name)
+            if type(value) is value_types.get(name):
+                columns[name][self.size] = value
+            else:
+                new_params = new_params or value is None
+                self.set_value(name, value)
+        if new_params:
+            self.add_params(params)
+        for key in self.report_keys:
+            value = report.get(key)
+            if type(value) is value_types.get(key):
+                columns[key][self.size] = value
+            else:
+                self.set_value(key, value)
+
+        # report keys which did not exist in the previous reports (e.g. conditional reports)
+        if not self.seen_keys.issuperset(report):
+            new_keys = report.keys() - self.seen_keys
+            self.seen_keys.update(new_keys)
+            for key in report:
+                if key in new_keys and key not in self.columns and (self.key_filter is None or self.key_filter(key)):
+                    self.add_column(key, column_dtype(report[key]))
+                    self.report_keys.append(key)
+                    self.set_value(key, report[key])
+
+        self.size += 1
+
+    def to_dict(self):
+        # views on the filled part of the columns
+        return {name: column[:self.size] for name, column in self.columns.items()}
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.to_dict(), copy=False)
+
+    def to_arrow(self):
+        try:
+            import pyarrow
+        except ModuleNotFoundError:
+            raise RuntimeError('The pyarrow package is required to convert the reports to Arrow.')
+        return pyarrow.table(self.to_dict())
+
+    def write_parquet(self, path):
+        table = self.to_arrow()
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, path)
+
+    def write_feather(self, path):
+        table = self.to_arrow()
+        import pyarrow.feather
+        pyarrow.feather.write_feather(table, path)
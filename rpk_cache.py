@@ -0,0 +1,151 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Content-addressed cache of rule packages and warm-up of the processes using them.
+# RulePackageCache stores each rule package once under <cache_dir>/<sha256>.rpk. Portal items (e.g. in
+# examples 8 and 10) are mapped to the content by their id and modification time, an unchanged item is
+# not downloaded again and every caller passes the same path to PRT. The least recently used rule
+# packages are evicted once they exceed max_bytes.
+# warm_up initializes PRT and loads rule packages into the PRT cache of the current process. As initializer
+# of a worker pool (see preloaded_executor, used by example 9), this moves the latency of the first
+# generation from the first request to the start of the pool.
+#
+# Example:
+#   rpk_cache = RulePackageCache('rpk_cache', max_bytes=500 * 1024 * 1024)
+#   rpk = rpk_cache.get_item(gis.content.get(rpk_item_id))
+
+import os
+import json
+import shutil
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import pyprt
+
+from hashing import file_sha256
+
+INDEX_FILENAME = 'index.json'
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+
+
+class RulePackageCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # content hash -> {'file': ..., 'size': ...}, least recently used first
+        self.entries = OrderedDict()
+        # '<item id>/<modification time>' -> content hash
+        self.items = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.load_index()
+
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def load_index(self):
+        if not os.path.exists(self.index_path()):
+            return
+        with open(self.index_path(), 'r') as f:
+            index = json.load(f)
+        for content_hash, entry in index['entries']:
+            if os.path.exists(os.path.join(self.cache_dir, entry['file'])):
+                self.entries[content_hash] = entry
+        self.items = {item_key: content_hash for item_key, content_hash in index['items'].items()
+                      if content_hash in self.entries}
+
+    def save_index(self):
+        with open(self.index_path(), 'w') as f:
+            json.dump({'entries': list(self.entries.items()), 'items': self.items}, f)
+
+    def total_bytes(self):
+        return sum(entry['size'] for entry in self.entries.values())
+
+    def entry_path(self, content_hash):
+        self.entries.move_to_end(content_hash)
+        return os.path.join(self.cache_dir, self.entries[content_hash]['file'])
+
+    def add(self, rpk_path):
+        # copies the rule package into the cache (unless its content is already there), returns the cached path
+        content_hash = file_sha256(rpk_path)
+        if content_hash not in self.entries:
+            filename = f'{content_hash}.rpk'
+            shutil.copyfile(rpk_path, os.path.join(self.cache_dir, filename))
+            self.entries[content_hash] = {'file': filename, 'size': os.path.getsize(rpk_path)}
+        cached_path = self.entry_path(content_hash)
+        self.evict(keep=content_hash)
+        self.save_index()
+        return cached_path
+
+    def get_item(self, item):
+        # item: arcgis.gis.Item of a rule package, downloaded only if not cached yet
+        item_key = f'{item.id}/{item.modified}'
+        content_hash = self.items.get(item_key)
+        if content_hash in self.entries:
+            self.hits += 1
+            return self.entry_path(content_hash)
+
+        self.misses += 1
+        with tempfile.TemporaryDirectory() as download_dir:
+            cached_path = self.add(item.download(save_path=download_dir))
+        self.items[item_key] = os.path.splitext(os.path.basename(cached_path))[0]
+        self.save_index()
+        return cached_path
+
+    def evict(self, keep=None):
+        total = self.total_bytes()
+        for content_hash in list(self.entries):
+            if total <= self.max_bytes:
+                break
+            if content_hash == keep:
+                continue
+            entry = self.entries.pop(content_hash)
+            total -= entry['size']
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+        self.items = {item_key: content_hash for item_key, content_hash in self.items.items()
+                      if content_hash in self.entries}
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups > 0 else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.total_bytes(),
+            'maxBytes': self.max_bytes
+        }
+
+
+def warm_up(*rule_packages):
+    # a generation on a unit square initializes PRT and loads each rule package into the PRT cache
+    # (geometry only: report-only generations crash with rules without reports, e.g. translateModel.rpk)
+    warm_up_shape = pyprt.InitialShape([0, 0, 0,  0, 0, 1,  1, 0, 1,  1, 0, 0])
+    for rpk in rule_packages:
+        pyprt.ModelGenerator([warm_up_shape]).generate_model(
+            [{}], rpk, PY_ENCODER, {'emitReport': False})
+
+
+def preloaded_executor(rule_packages, max_workers):
+    # starts all the worker processes and waits until each of them warmed up the rule packages
+    # PRT does not survive a fork once initialized, the workers are started from scratch
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=warm_up, initargs=tuple(rule_packages))
+    # without idle workers, each submission starts a new process
+    wait([executor.submit(os.getpid) for _ in range(max_workers)])
+    return executor
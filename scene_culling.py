@@ -0,0 +1,125 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Camera driven culling and level of detail for large scenes of generated models, used by example 6.
+# The bounding boxes of the models are indexed in a uniform grid over the ground plane (z-up). For a
+# camera transform, the boxes of the grid cells and then of the models in the visible cells are projected
+# to the screen: a model is hidden outside of the view or below box_size pixels, drawn as its bounding
+# box below full_size pixels and drawn with its full mesh otherwise.
+
+import numpy as np
+
+LOD_HIDDEN = 0
+LOD_BOX = 1
+LOD_FULL = 2
+
+# corners and triangles of a box given as (min, max)
+BOX_CORNERS = np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)])
+BOX_FACES = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+                      [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]], dtype=np.uint32)
+
+
+def model_bounds(vertices, model_ids):
+    # vertices, model_ids: merged buffers (see mesh_batching.merge_models), every model has vertices
+    vertex_counts = np.bincount(model_ids)
+    offsets = np.cumsum(vertex_counts) - vertex_counts
+    return np.stack([np.minimum.reduceat(vertices, offsets), np.maximum.reduceat(vertices, offsets)], axis=1)
+
+
+def box_corners(bounds):
+    # bounds: (N, 2, 3) -> (N, 8, 3)
+    return bounds[:, BOX_CORNERS, [0, 1, 2]]
+
+
+def box_meshes(bounds):
+    # merged box meshes of the bounds: (N * 8, 3) float32 vertices, (N * 12, 3) uint32 faces, model id of each vertex
+    vertices = box_corners(bounds).reshape(-1, 3).astype(np.float32)
+    faces = (BOX_FACES[None, :, :] + 8 * np.arange(len(bounds), dtype=np.uint32)[:, None, None]).reshape(-1, 3)
+    return vertices, faces, np.repeat(np.arange(len(bounds)), 8)
+
+
+def screen_extents(bounds, transform, viewport_size):
+    # transform: scene to viewport pixels (e.g. view.scene.node_transform(view))
+    # returns, per box, whether it intersects the viewport and its size in pixels
+    corners = box_corners(bounds)
+    mapped = transform.map(corners.reshape(-1, 3)).reshape(len(bounds), 8, 4)
+    w = mapped[..., 3]
+    in_front = w > 0
+    xy = mapped[..., :2] / np.where(in_front, w, 1.0)[..., None]
+
+    xy_min = np.where(in_front[..., None], xy, np.inf).min(axis=1)
+    xy_max = np.where(in_front[..., None], xy, -np.inf).max(axis=1)
+    visible = np.all((xy_max >= 0) & (xy_min <= np.asarray(viewport_size)), axis=1)
+    sizes = (xy_max - xy_min).max(axis=1)
+
+    # boxes crossing the camera plane are always visible in full
+    crossing = in_front.any(axis=1) & ~in_front.all(axis=1)
+    visible = (visible & in_front.all(axis=1)) | crossing
+    sizes[crossing] = np.inf
+    return visible, sizes
+
+
+class UniformGrid:
+    def __init__(self, bounds, models_per_cell=16):
+        # each model is assigned to the cell containing the center of its box
+        self.bounds = bounds
+        origin = bounds[:, 0, :2].min(axis=0)
+        extent = np.maximum(bounds[:, 1, :2].max(axis=0) - origin, 1e-6)
+        cells_per_side = max(1, int(np.ceil(np.sqrt(len(bounds) / models_per_cell))))
+        cell_size = extent / cells_per_side
+
+        centers = bounds.mean(axis=1)[:, :2]
+        cell_xy = np.clip(((centers - origin) / cell_size).astype(np.int64), 0, cells_per_side - 1)
+        cell_ids = cell_xy[:, 0] * cells_per_side + cell_xy[:, 1]
+
+        # models sorted by cell, only the non-empty cells are kept
+        self.model_order = np.argsort(cell_ids, kind='stable')
+        _, cell_starts, self.cell_counts = np.unique(cell_ids[self.model_order], return_index=True,
+                                                     return_counts=True)
+        sorted_bounds = bounds[self.model_order]
+        self.cell_bounds = np.stack([np.minimum.reduceat(sorted_bounds[:, 0], cell_starts),
+                                     np.maximum.reduceat(sorted_bounds[:, 1], cell_starts)], axis=1)
+
+    def query(self, transform, viewport_size):
+        # indices of the models in the cells intersecting the viewport
+        cells_visible, _ = screen_extents(self.cell_bounds, transform, viewport_size)
+        return self.model_order[np.repeat(cells_visible, self.cell_counts)]
+
+
+class LodCuller:
+    def __init__(self, bounds, full_size=40.0, box_size=2.0, models_per_cell=16):
+        # full_size, box_size: screen sizes in pixels
+        self.bounds = bounds
+        self.full_size = full_size
+        self.box_size = box_size
+        self.grid = UniformGrid(bounds, models_per_cell)
+        self.lods = np.full(len(bounds), LOD_HIDDEN, dtype=np.int8)
+
+    def update(self, transform, viewport_size):
+        # returns True if the level of detail of any model changed
+        candidates = self.grid.query(transform, viewport_size)
+        lods = np.full(len(self.bounds), LOD_HIDDEN, dtype=np.int8)
+        if len(candidates) > 0:
+            visible, sizes = screen_extents(self.bounds[candidates], transform, viewport_size)
+            candidate_lods = np.where(sizes >= self.full_size, LOD_FULL, LOD_BOX)
+            candidate_lods[~visible | (sizes < self.box_size)] = LOD_HIDDEN
+            lods[candidates] = candidate_lods
+
+        changed = not np.array_equal(lods, self.lods)
+        self.lods = lods
+        return changed
+
+    def counts(self):
+        return np.bincount(self.lods, minlength=3)
@@ -0,0 +1,111 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Disk-backed cache of the SLPKs generated by example 9 together with their published portal id.
+# Entries are keyed on the content of the upload, the rounded georeference, the rule package and the
+# encoder options. The least recently used entries are evicted once the SLPKs exceed max_bytes.
+# The cache can be used from several threads, e.g. put() runs in an executor of the example 9 server while
+# get() runs on its IOLoop.
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+INDEX_FILENAME = 'index.json'
+
+
+def make_cache_key(upload_hash, x_coord, y_coord, elevation, rpk_hash, encoder_options, precision=1.0):
+    # coordinates closer than precision (in meters) map to the same key
+    rounded_georef = [round(coord / precision) for coord in (x_coord, y_coord, elevation)]
+    # the output location and name do not change the generated content
+    options = {key: value for key, value in encoder_options.items() if key not in ('baseName', 'outputPath')}
+    key_data = json.dumps([upload_hash, rounded_georef, rpk_hash, options], sort_keys=True)
+    return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+
+class SlpkCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # key -> {'file': ..., 'size': ..., 'portal_id': ...}, least recently used first
+        self.entries = OrderedDict()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.load_index()
+
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def load_index(self):
+        if not os.path.exists(self.index_path()):
+            return
+        with open(self.index_path(), 'r') as f:
+            for key, entry in json.load(f):
+                if os.path.exists(os.path.join(self.cache_dir, entry['file'])):
+                    self.entries[key] = entry
+
+    def save_index(self):
+        with open(self.index_path(), 'w') as f:
+            json.dump(list(self.entries.items()), f)
+
+    def total_bytes(self):
+        return sum(entry['size'] for entry in self.entries.values())
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return dict(entry, file=os.path.join(self.cache_dir, entry['file']))
+
+    def put(self, key, slpk_path, portal_id):
+        # moves the SLPK into the cache (blocking file operations, not to be called on an IOLoop)
+        size = os.path.getsize(slpk_path)
+        if size > self.max_bytes:
+            return
+        filename = f'{key}.slpk'
+        shutil.move(slpk_path, os.path.join(self.cache_dir, filename))
+        with self.lock:
+            self.entries[key] = {'file': filename, 'size': size, 'portal_id': portal_id}
+            self.entries.move_to_end(key)
+            self.evict()
+            self.save_index()
+
+    def evict(self):
+        total = self.total_bytes()
+        while total > self.max_bytes:
+            _, entry = self.entries.popitem(last=False)
+            total -= entry['size']
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': self.hits / lookups if lookups > 0 else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes(),
+                'maxBytes': self.max_bytes
+            }
@@ -0,0 +1,100 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Conversion of an uploaded 3D model into a georeferenced SLPK (see example 9).
+# OBJ models: the bounds are read from the file and the georeference offset is passed to the
+# translateModel.rpk rule (vec_x, vec_y, vec_z attributes), so the model is generated only once, directly
+# with the I3S encoder. Other formats (e.g. FBX) must be decoded by PRT to get their bounds, which costs as
+# much as a generation: they keep the two-pass conversion (generation, shift of the vertices, generation of
+# the shifted mesh with the I3S encoder), which is faster for them. Use convert_to_slpk for both.
+
+import os
+
+import pyprt
+
+from georef import georef_bounds, georef_offset, georef_shift_vertices, obj_bounds
+
+SLPK_ENCODER = 'com.esri.prt.codecs.I3SEncoder'
+
+
+def slpk_encoder_options(basename, output_path):
+    return {
+        'sceneType': "Local",
+        'baseName': basename,
+        'sceneWkid': "3857",
+        'layerTextureEncoding': ["2"],
+        'layerEnabled': [True],
+        'layerUID': ["1"],
+        'layerName': ["1"],
+        'layerTextureQuality': [1.0],
+        'layerTextureCompression': [9],
+        'layerTextureScaling': [1.0],
+        'layerTextureMaxDimension': [2048],
+        'layerFeatureGranularity': ["0"],
+        'layerBackfaceCulling': [False],
+        'outputPath': output_path
+    }
+
+
+def has_file_bounds(file_path):
+    # True if the bounds of the model are read from the file, without a generation
+    return os.path.splitext(file_path)[1].lower() == '.obj'
+
+
+def model_bounds(file_path, rpk):
+    # OBJ vertices are read directly from the file, other formats need to be decoded by PRT
+    if has_file_bounds(file_path):
+        return obj_bounds(file_path)
+
+    model = pyprt.ModelGenerator([pyprt.InitialShape(file_path)]).generate_model(
+        [{}], rpk, 'com.esri.pyprt.PyEncoder', {'emitReport': False})
+    return georef_bounds(model[0].get_vertices())
+
+
+def georef_attributes(file_path, rpk, x_coord, y_coord, elevation):
+    offset = georef_offset(*model_bounds(file_path, rpk), x_coord, y_coord, elevation)
+    return {'vec_x': float(offset[0]), 'vec_y': float(offset[1]), 'vec_z': float(offset[2])}
+
+
+def encode_slpk(file_path, basename, output_path, rpk, shape_attributes):
+    mod_generator = pyprt.ModelGenerator([pyprt.InitialShape(file_path)])
+    mod_generator.generate_model([shape_attributes], rpk, SLPK_ENCODER,
+                                 slpk_encoder_options(basename, output_path))
+    return os.path.join(output_path, basename + '.slpk')
+
+
+def convert_to_slpk(file_path, basename, output_path, rpk, x_coord, y_coord, elevation):
+    if not has_file_bounds(file_path):
+        return convert_to_slpk_two_pass(file_path, basename, output_path, rpk, x_coord, y_coord, elevation)
+    shape_attributes = georef_attributes(file_path, rpk, x_coord, y_coord, elevation)
+    return encode_slpk(file_path, basename, output_path, rpk, shape_attributes)
+
+
+# Generates the model a first time to read back and shift the vertices, then a second time from the shifted
+# vertices to encode the SLPK (the former conversion of all the formats, see bench_slpk_conversion.py).
+def convert_to_slpk_two_pass(file_path, basename, output_path, rpk, x_coord, y_coord, elevation):
+    shape_attributes = {}
+
+    mod_generator1 = pyprt.ModelGenerator([pyprt.InitialShape(file_path)])
+    model = mod_generator1.generate_model([shape_attributes], rpk,
+                                          'com.esri.pyprt.PyEncoder', {'emitReport': False})
+
+    mod_vertices_shift = georef_shift_vertices(model[0].get_vertices(), x_coord, y_coord, elevation)
+    shifted_shape = pyprt.InitialShape(mod_vertices_shift, model[0].get_indices(), model[0].get_faces())
+
+    mod_generator2 = pyprt.ModelGenerator([shifted_shape])
+    mod_generator2.generate_model([shape_attributes], rpk, SLPK_ENCODER,
+                                  slpk_encoder_options(basename, output_path))
+    return os.path.join(output_path, basename + '.slpk')
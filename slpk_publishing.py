@@ -0,0 +1,68 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Publishers for the SLPKs generated by example 9. A publisher has a single method
+# publish(slpk_path, basename) returning the id of the published scene layer.
+# LocalPublisher stands in for ArcGIS Online, e.g. for load tests.
+
+import os
+import shutil
+import time
+import uuid
+
+try:
+    from arcgis.gis import ItemProperties, ItemTypeEnum
+    from arcgis.gis._impl._content_manager import SharingLevel
+except ModuleNotFoundError:
+    ItemProperties = None
+
+
+class ArcGISPublisher:
+    def __init__(self, gis, folder_name):
+        if ItemProperties is None:
+            raise RuntimeError('The arcgis package is required to publish on ArcGIS Online.')
+        self.gis = gis
+        self.folder_name = folder_name
+
+        # Create folder for scene layers
+        if self.gis.content.folders.get(folder=self.folder_name) is None:
+            self.gis.content.folders.create(self.folder_name)
+
+    def publish(self, slpk_path, basename):
+        item_folder = self.gis.content.folders.get(folder=self.folder_name)
+        item_properties = ItemProperties(title=f"PyPRT_webApp_{basename}", item_type=ItemTypeEnum.SCENE_PACKAGE.value, tags="slpk")
+        slpk_item = item_folder.add(file=slpk_path, item_properties=item_properties).result()
+
+        slpk_item_published = slpk_item.publish()
+        sharing_mgr = slpk_item_published.sharing
+        sharing_mgr.sharing_level = SharingLevel.EVERYONE
+        slpk_item.delete()
+
+        return slpk_item_published.id
+
+
+class LocalPublisher:
+    def __init__(self, publish_dir, delay=0.0):
+        # delay (in seconds) simulates the portal upload and publishing time
+        self.publish_dir = publish_dir
+        self.delay = delay
+        os.makedirs(self.publish_dir, exist_ok=True)
+
+    def publish(self, slpk_path, basename):
+        if self.delay > 0.0:
+            time.sleep(self.delay)
+        item_id = uuid.uuid4().hex
+        shutil.copyfile(slpk_path, os.path.join(self.publish_dir, f'{item_id}.slpk'))
+        return item_id
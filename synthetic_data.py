@@ -0,0 +1,78 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Synthetic inputs of the benchmarks: a grid of square parcels (shape data of batch_generation.py),
+# seeded random attributes for the provided rule packages and polygon features in a GeoArrow table
+# (the latter requires the optional pyarrow package).
+#
+# Example:
+#   shapes = synthetic_parcels(1000)
+#   attrs = synthetic_attributes('extrusion_rule.rpk', 1000)
+#   table = synthetic_features(1000)
+
+import random
+
+import numpy as np
+
+from batch_generation import shape_data
+
+
+def synthetic_parcels(shapes_count, parcel_size=20.0, street_width=10.0):
+    # grid of square parcels in the xz plane, counter-clockwise seen from above (y-up)
+    columns = max(1, int(shapes_count ** 0.5))
+    shapes = []
+    for k in range(shapes_count):
+        x = (k % columns) * (parcel_size + street_width)
+        z = (k // columns) * (parcel_size + street_width)
+        shapes.append(shape_data([x, 0, z,  x, 0, z + parcel_size,
+                                  x + parcel_size, 0, z + parcel_size,  x + parcel_size, 0, z]))
+    return shapes
+
+
+def synthetic_attributes(rpk_name, shapes_count, seed=0):
+    rng = random.Random(seed)
+    if rpk_name == 'candler.rpk':
+        return [{'BuildingHeight': rng.uniform(28.0, 150.0)} for _ in range(shapes_count)]
+    return [{'minBuildingHeight': rng.uniform(5.0, 15.0), 'maxBuildingHeight': rng.uniform(20.0, 40.0)}
+            for _ in range(shapes_count)]
+
+
+def synthetic_features(features_count, seed=0):
+    # clockwise polygons (exterior rings in the Esri convention) with 4 to 16 vertices, without holes
+    try:
+        import pyarrow
+    except ModuleNotFoundError:
+        raise RuntimeError('The pyarrow package is required for the synthetic features.')
+    point_type = pyarrow.struct([('x', pyarrow.float64()), ('y', pyarrow.float64())])
+
+    rng = np.random.default_rng(seed)
+    vertex_counts = rng.integers(4, 17, size=features_count)
+    ring_offsets = np.zeros(features_count + 1, dtype=np.int32)
+    np.cumsum(vertex_counts + 1, out=ring_offsets[1:])
+
+    angles = [-np.linspace(0.0, 2.0 * np.pi, count, endpoint=False) for count in vertex_counts]
+    centers = rng.random((features_count, 2)) * 100000.0
+    coords = np.concatenate([np.column_stack([np.cos(a), np.sin(a)])[np.r_[0:len(a), 0]] * 10.0 + center
+                             for a, center in zip(angles, centers)])
+
+    points = pyarrow.StructArray.from_arrays([pyarrow.array(coords[:, 0]), pyarrow.array(coords[:, 1])],
+                                             fields=list(point_type))
+    rings = pyarrow.ListArray.from_arrays(pyarrow.array(ring_offsets), points)
+    polygons = pyarrow.ListArray.from_arrays(pyarrow.array(np.arange(features_count + 1, dtype=np.int32)), rings)
+    return pyarrow.table({
+        'geometry': polygons,
+        'TOTPOP_CY': rng.integers(1000, 1000000, size=features_count),
+        'AREA': rng.random(features_count) * 1000.0
+    })
@@ -17,6 +17,7 @@ import os
 import platform
 import argparse
 import shutil
+import subprocess
 import tempfile
 
 
@@ -47,6 +48,16 @@ def run_examples(conda_cmd, conda_env):
     os.system(f"{py_cmd} ex4_multi_generations.py")
 
 
+def run_benchmarks(conda_cmd, conda_env, output_path, baseline_path):
+    # the default Windows command contains %LOCALAPPDATA%, which is not expanded without a shell
+    bench_cmd = [os.path.expandvars(conda_cmd), 'run', '-n', conda_env, 'python', 'bench_examples.py',
+                 '--output', output_path]
+    if baseline_path:
+        bench_cmd += ['--compare', baseline_path]
+    # exits with an error on a regression against the baseline
+    subprocess.run(bench_cmd, check=True)
+
+
 def main():
     conda_cmd_default = "%LOCALAPPDATA%\\miniconda3\\condabin\\conda" if platform.system() == "Windows" else "/opt/miniconda3/bin"
 
@@ -57,6 +68,10 @@ def main():
     parser.add_argument('--conda_env_name', help='name of conda env', type=str, required=False)
     parser.add_argument("--conda_cmd", help="absolute path to conda executable", type=str,
                         default=conda_cmd_default)
+    parser.add_argument('--benchmark_output', help='run bench_examples.py and write its results to this JSON file',
+                        type=str, required=False)
+    parser.add_argument('--benchmark_baseline', help='JSON results of bench_examples.py to compare the benchmarks with',
+                        type=str, required=False)
     args = parser.parse_args()
 
     if not args.conda_env_name:
@@ -66,6 +81,8 @@ def main():
     if args.pyprt_conda_package:
         add_custom_pyprt_package(args.conda_cmd, args.conda_env_name, args.pyprt_conda_package)
     run_examples(args.conda_cmd, args.conda_env_name)
+    if args.benchmark_output:
+        run_benchmarks(args.conda_cmd, args.conda_env_name, args.benchmark_output, args.benchmark_baseline)
 
 
 if __name__ == '__main__':
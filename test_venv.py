@@ -15,6 +15,7 @@
 
 import os
 import sys
+import subprocess
 import tempfile
 import platform
 import venv
@@ -72,6 +73,16 @@ def run_examples(venv_dir):
     print(">>> DONE.")
 
 
+def run_benchmarks(venv_dir, output_path, baseline_path):
+    py_cmd = get_python_cmd(venv_dir)
+    print(">>> BENCHMARKS:")
+    bench_cmd = [py_cmd, 'bench_examples.py', '--output', output_path]
+    if baseline_path:
+        bench_cmd += ['--compare', baseline_path]
+    # exits with an error on a regression against the baseline
+    subprocess.run(bench_cmd, check=True)
+
+
 def main():
     env_py = f"py{sys.version_info[0]}{sys.version_info[1]}"
 
@@ -79,6 +90,10 @@ def main():
     parser.add_argument(
         '--pyprt_wheel', help='custom pyprt build to use in venv test', type=str, required=False)
     parser.add_argument('--venv_path', help='use specific venv location and keep it around', type=str, required=False)
+    parser.add_argument('--benchmark_output', help='run bench_examples.py and write its results to this JSON file',
+                        type=str, required=False)
+    parser.add_argument('--benchmark_baseline', help='JSON results of bench_examples.py to compare the benchmarks with',
+                        type=str, required=False)
     args = parser.parse_args()
 
     venv_temp_dir = None
@@ -91,6 +106,8 @@ def main():
 
     setup_venv_from_requirements(venv_dir, env_py, args.pyprt_wheel)
     run_examples(venv_dir)
+    if args.benchmark_output:
+        run_benchmarks(venv_dir, args.benchmark_output, args.benchmark_baseline)
 
 
 if __name__ == '__main__':
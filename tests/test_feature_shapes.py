@@ -0,0 +1,133 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+import numpy as np
+import pytest
+
+from feature_shapes import (geometry_hashes, initial_shapes_from_esri_json, ragged_from_arrow, ragged_from_esri_json,
+                            ring_orientations, shape_attributes, shape_data_from_ragged)
+from synthetic_data import synthetic_features
+
+# Esri JSON rings: clockwise exterior rings, counter-clockwise holes, closed
+SQUARE = [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]]
+HOLE = [[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]]
+OTHER_SQUARE = [[20, 0], [20, 10], [30, 10], [30, 0], [20, 0]]
+
+
+def legacy_vertices(ring):
+    # conversion of a ring by arcgis_to_pyprt: reversed without the closing vertex, (x, y) -> (x, 0, -y)
+    coords = np.flip(np.asarray(ring, dtype=np.float64)[:-1], axis=0)
+    return np.column_stack([coords[:, 0], np.zeros(len(coords)), -coords[:, 1]]).reshape(-1).tolist()
+
+
+def esri_shape_data(geometries):
+    return shape_data_from_ragged(*ragged_from_esri_json(geometries))
+
+
+def test_ring_orientations():
+    rings = [SQUARE, [], HOLE, OTHER_SQUARE[::-1]]
+    coords = np.array([point for ring in rings for point in ring], dtype=np.float64)
+    ring_offsets = np.concatenate([[0], np.cumsum([len(ring) for ring in rings])])
+    assert ring_orientations(coords, ring_offsets).tolist() == [False, False, True, True]
+
+
+def test_polygon_with_hole():
+    shapes, feature_indices = esri_shape_data([{'rings': [SQUARE, HOLE]}])
+    assert feature_indices.tolist() == [0]
+    vertices, indices, face_counts, holes = shapes[0]
+    # the hole is reversed as well, as by arcgis_to_pyprt
+    assert vertices == legacy_vertices(SQUARE) + legacy_vertices(HOLE)
+    assert indices == list(range(8))
+    assert face_counts == [4, 4]
+    assert holes == [[0, 1]]
+
+
+def test_esri_json_polygons():
+    geometries = [
+        {'rings': [SQUARE, OTHER_SQUARE]},
+        None,
+        {'rings': []},
+        # a counter-clockwise first ring still starts a polygon
+        {'rings': [SQUARE[::-1], HOLE]},
+        {'rings': [[[0, 0, 5], [0, 10, 5], [10, 10, 6], [10, 0, 6], [0, 0, 5]]], 'hasZ': True},
+        {'rings': [[[0, 0, 7], [0, 10, 7], [10, 10, 7], [10, 0, 7], [0, 0, 7]]], 'hasM': True},
+    ]
+    coords, ring_offsets, polygon_offsets, feature_offsets = ragged_from_esri_json(geometries)
+    assert coords.shape == (30, 3)
+    assert ring_offsets.tolist() == [0, 5, 10, 15, 20, 25, 30]
+    assert polygon_offsets.tolist() == [0, 1, 2, 4, 5, 6]
+    assert feature_offsets.tolist() == [0, 2, 2, 2, 3, 4, 5]
+
+    shapes, feature_indices = shape_data_from_ragged(coords, ring_offsets, polygon_offsets, feature_offsets)
+    assert feature_indices.tolist() == [0, 3, 4, 5]
+    assert [shape[3] for shape in shapes] == [[[0], [1]], [[0, 1]], [[0]], [[0]]]
+    assert shapes[2][0][1::3] == [6.0, 6.0, 5.0, 5.0]
+    # the M values are not heights
+    assert shapes[3][0][1::3] == [0.0, 0.0, 0.0, 0.0]
+    assert len(initial_shapes_from_esri_json(geometries)[0]) == 4
+
+
+def test_degenerate_rings_are_skipped():
+    shapes, feature_indices = esri_shape_data([{'rings': [[[0, 0], [1, 1], [0, 0]]]}, {'rings': [SQUARE]}])
+    assert feature_indices.tolist() == [1]
+    assert shapes[0][0] == legacy_vertices(SQUARE)
+
+
+def test_arrow_and_esri_json_agree():
+    table = synthetic_features(50)
+    arrow_shapes, arrow_indices = shape_data_from_ragged(*ragged_from_arrow(table.column('geometry')))
+    geometries = [{'rings': [[[point['x'], point['y']] for point in ring] for ring in polygon]}
+                  for polygon in table.column('geometry').to_pylist()]
+    esri_shapes, esri_indices = esri_shape_data(geometries)
+    assert arrow_indices.tolist() == esri_indices.tolist() == list(range(50))
+    assert arrow_shapes == esri_shapes
+    for shape, polygon in zip(esri_shapes, geometries):
+        assert shape[0] == legacy_vertices(polygon['rings'][0])
+
+
+def test_geometry_hashes():
+    hashes = geometry_hashes(*ragged_from_esri_json([{'rings': [SQUARE]}, {'rings': [SQUARE, HOLE]},
+                                                     {'rings': [SQUARE]}, {'rings': [SQUARE, OTHER_SQUARE]}]))
+    # the hash does not depend on the position of the feature, but on its coordinates and its structure
+    assert hashes[0] == hashes[2]
+    assert len(set(hashes)) == 3
+
+
+def test_shape_attributes():
+    columns = {
+        'population': np.array([1000, 2000, 3000]),
+        'area': [1.5, float('nan'), 3.5],
+        'name': np.array(['a', None, 'c'], dtype=object),
+        'active': np.array([True, False, True])
+    }
+    attrs = shape_attributes(columns, constants={'mode': 'linear'})
+    assert attrs == [
+        {'population': 1000.0, 'area': 1.5, 'name': 'a', 'active': True, 'mode': 'linear'},
+        {'population': 2000.0, 'active': False, 'mode': 'linear'},
+        {'population': 3000.0, 'area': 3.5, 'name': 'c', 'active': True, 'mode': 'linear'}
+    ]
+    assert [type(value) for value in attrs[0].values()] == [float, float, str, bool, str]
+    assert shape_attributes(columns, feature_indices=np.array([2]))[0]['population'] == 3000.0
+    assert shape_attributes({}, constants={'mode': 'linear'}) == [{'mode': 'linear'}]
+
+
+def test_shapely_polygons():
+    shapely = pytest.importorskip('shapely')
+    from feature_shapes import ragged_from_shapely
+
+    geometries = [shapely.Polygon(SQUARE, [HOLE]), None, shapely.MultiPolygon([shapely.Polygon(OTHER_SQUARE)])]
+    shapes, feature_indices = shape_data_from_ragged(*ragged_from_shapely(geometries))
+    assert feature_indices.tolist() == [0, 2]
+    assert shapes[0][3] == [[0, 1]] and shapes[1][0] == legacy_vertices(OTHER_SQUARE)
@@ -0,0 +1,129 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+import numpy as np
+import pytest
+import pyprt
+
+from batch_generation import make_initial_shape
+from conftest import asset_file
+from geometry_store import GeometryStore, GeometryStoreWriter
+from synthetic_data import synthetic_parcels
+
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+
+
+class FakeModel:
+    # the getters of pyprt.GeneratedModel used by the writer
+    def __init__(self, initial_shape_index, vertices, indices, faces, report):
+        self.initial_shape_index = initial_shape_index
+        self.vertices = vertices
+        self.indices = indices
+        self.faces = faces
+        self.report = report
+
+    def get_initial_shape_index(self):
+        return self.initial_shape_index
+
+    def get_vertices(self):
+        return self.vertices
+
+    def get_indices(self):
+        return self.indices
+
+    def get_faces(self):
+        return self.faces
+
+    def get_report(self):
+        return self.report
+
+
+def fake_models():
+    triangle = FakeModel(3, [0, 0, 0, 1, 0, 0, 1, 0, 1], [0, 1, 2], [3], {'Area_sum': 0.5, 'Valid': True})
+    quads = FakeModel(5, [0, 0, 0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 1, 1, 0, 1, 1, 1], [0, 1, 2, 3, 3, 2, 5, 4], [4, 4],
+                      {'Area_sum': 2.0, 'Valid': False, 'Type': 'quad'})
+    return [triangle, None, quads]
+
+
+def test_round_trip(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    models = fake_models()
+    with GeometryStoreWriter(store_dir, parameters={'rpk': 'test.rpk'}) as writer:
+        writer.append(models[:2])
+        writer.append(models[2:])
+
+    store = GeometryStore(store_dir)
+    assert len(store) == 2
+    assert store.meta['parameters'] == {'rpk': 'test.rpk'}
+    assert store.initial_shape_indices.tolist() == [3, 5]
+    assert store.vertices.shape == (9, 3)
+    assert store.model_ids().tolist() == [0, 0, 0, 1, 1, 1, 1, 1, 1]
+    for k, model in enumerate([models[0], models[2]]):
+        geometry = store.model(k)
+        assert geometry.vertex_buffer.tolist() == model.vertices
+        assert geometry.indices.tolist() == model.indices
+        assert geometry.face_counts.tolist() == model.faces
+        assert store.report(k) == model.report
+        assert [type(value) for value in store.report(k).values()] == [type(value) for value in model.report.values()]
+
+    assert store.report_column('Area_sum').tolist() == [0.5, 2.0]
+    assert store.report_column('Valid').tolist() == [1.0, 0.0]
+    assert store.report_column('Type') == [None, 'quad']
+
+
+def test_missing_numeric_reports(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    with GeometryStoreWriter(store_dir) as writer:
+        writer.append([FakeModel(0, [0, 0, 0], [0], [1], {}), FakeModel(1, [0, 0, 0], [0], [1], {'Height': 3.0})])
+    store = GeometryStore(store_dir)
+    assert np.array_equal(store.report_column('Height'), [np.nan, 3.0], equal_nan=True)
+    assert store.report(0) == {} and store.report(1) == {'Height': 3.0}
+
+
+def test_empty_store(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    GeometryStoreWriter(store_dir).close()
+    store = GeometryStore(store_dir)
+    assert len(store) == 0 and store.vertices.shape == (0, 3) and store.report_names() == []
+
+
+def test_unfinished_store(tmp_path):
+    # meta.json is written last: an interrupted write, or an interrupted overwrite, leaves no loadable store
+    store_dir = str(tmp_path / 'store')
+    with GeometryStoreWriter(store_dir) as writer:
+        writer.append(fake_models())
+    writer = GeometryStoreWriter(store_dir)
+    writer.append(fake_models())
+    with pytest.raises(FileNotFoundError):
+        GeometryStore(store_dir)
+    writer.close()
+    assert len(GeometryStore(store_dir)) == 2
+
+
+def test_generated_models(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    model_generator = pyprt.ModelGenerator([make_initial_shape(shape) for shape in synthetic_parcels(4)])
+    models = model_generator.generate_model([{}], asset_file('extrusion_rule.rpk'), PY_ENCODER, {})
+    with GeometryStoreWriter(store_dir) as writer:
+        writer.append(models)
+
+    store = GeometryStore(store_dir)
+    assert len(store) == len(models)
+    for k, model in enumerate(models):
+        geometry = store.model(k)
+        assert np.array_equal(geometry.vertex_buffer, model.get_vertices())
+        assert geometry.indices.tolist() == model.get_indices()
+        assert geometry.face_counts.tolist() == model.get_faces()
+        assert store.report(k) == model.get_report()
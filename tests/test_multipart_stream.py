@@ -0,0 +1,87 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+import io
+
+import pytest
+
+from multipart_stream import MAX_HEADERS_SIZE, MultipartError, MultipartStreamParser, get_boundary
+
+BOUNDARY = b'----boundary42'
+
+
+def multipart_body(parts):
+    # parts: (name, filename or None, content)
+    body = b'preamble\r\n'
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else '')
+        body += (b'--' + BOUNDARY + b'\r\nContent-Disposition: ' + disposition.encode('utf-8')
+                 + b'\r\nContent-Type: application/octet-stream\r\n\r\n' + content + b'\r\n')
+    return body + b'--' + BOUNDARY + b'--\r\nepilogue'
+
+
+def parse(body, chunk_size):
+    sinks = {}
+
+    def open_part(name, filename):
+        sinks[name] = (filename, io.BytesIO())
+        return sinks[name][1]
+
+    parser = MultipartStreamParser(BOUNDARY, open_part)
+    for start in range(0, len(body), chunk_size):
+        parser.feed(body[start:start + chunk_size])
+    parser.finish()
+    return {name: (filename, sink.getvalue()) for name, (filename, sink) in sinks.items()}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, len(BOUNDARY) + 3, 1 << 20])
+def test_parts_split_across_chunks(chunk_size):
+    # the content contains line breaks, dashes and a prefix of the delimiter
+    content = b'v 0 0 0\r\n--\r\n--' + BOUNDARY[:-1] + b'\r\n' + bytes(range(256))
+    parts = parse(multipart_body([('model', 'model.obj', content), ('format', None, b'slpk')]), chunk_size)
+    assert parts == {'model': ('model.obj', content), 'format': (None, b'slpk')}
+
+
+def test_empty_part():
+    assert parse(multipart_body([('model', 'empty.obj', b'')]), 3) == {'model': ('empty.obj', b'')}
+
+
+def test_incomplete_body():
+    body = multipart_body([('model', 'model.obj', b'v 0 0 0')])
+    parser = MultipartStreamParser(BOUNDARY, lambda name, filename: io.BytesIO())
+    parser.feed(body[:body.index(b'--' + BOUNDARY + b'--')])
+    with pytest.raises(MultipartError):
+        parser.finish()
+
+
+def test_part_without_name():
+    body = b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data\r\n\r\ndata\r\n--' + BOUNDARY + b'--'
+    parser = MultipartStreamParser(BOUNDARY, lambda name, filename: io.BytesIO())
+    with pytest.raises(MultipartError):
+        parser.feed(body)
+
+
+def test_headers_too_large():
+    parser = MultipartStreamParser(BOUNDARY, lambda name, filename: io.BytesIO())
+    with pytest.raises(MultipartError):
+        parser.feed(b'--' + BOUNDARY + b'\r\nX-Padding: ' + b'x' * (MAX_HEADERS_SIZE + 1))
+
+
+def test_get_boundary():
+    assert get_boundary('multipart/form-data; boundary="' + BOUNDARY.decode() + '"') == BOUNDARY
+    with pytest.raises(MultipartError):
+        get_boundary('application/json')
+    with pytest.raises(MultipartError):
+        get_boundary('multipart/form-data')
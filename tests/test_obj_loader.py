@@ -0,0 +1,108 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+import os
+
+import numpy as np
+import pytest
+import pyprt
+
+from conftest import asset_file
+from obj_loader import ObjShapeCache, make_initial_shape, read_obj
+
+PY_ENCODER = 'com.esri.pyprt.PyEncoder'
+
+
+def write_obj(path, text, newline='\n'):
+    with open(path, 'w', newline='') as f:
+        f.write(text.replace('\n', newline))
+    return str(path)
+
+
+def face_coordinates(initial_shape):
+    # the path constructor numbers the vertices in the order of their first use
+    model = pyprt.ModelGenerator([initial_shape]).generate_model(
+        [{}], asset_file('noRule.rpk'), PY_ENCODER, {'emitReport': False})[0]
+    return np.asarray(model.get_vertices()).reshape(-1, 3)[model.get_indices()], model.get_faces()
+
+
+def test_vertices_and_faces(tmp_path):
+    obj_path = write_obj(tmp_path / 'quad.obj', 'o quad\nv 0 0 0\nv 0 0 1.5\nv 1e1 0 1.5\nv 10 0 -0\n'
+                                                'vt 0 0\nvn 0 1 0\nf 1/1/1 2/1/1 3//1 4\n')
+    vertices, indices, face_counts = read_obj(obj_path)
+    assert vertices.dtype == np.float64 and indices.dtype == np.int32 and face_counts.dtype == np.int32
+    assert vertices.tolist() == [0, 0, 0, 0, 0, 1.5, 10, 0, 1.5, 10, 0, 0]
+    assert indices.tolist() == [0, 1, 2, 3]
+    assert face_counts.tolist() == [4]
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_indentation_and_comments(tmp_path, newline):
+    obj_path = write_obj(tmp_path / 'commented.obj', '# header\n  v 0 0 0 # first\n\tv 1 0 0\nv 1 0 1#glued\n'
+                                                     ' \t f 1 2 3   # face\n\n', newline)
+    vertices, indices, face_counts = read_obj(obj_path)
+    assert vertices.tolist() == [0, 0, 0, 1, 0, 0, 1, 0, 1]
+    assert indices.tolist() == [0, 1, 2]
+    assert face_counts.tolist() == [3]
+
+
+def test_negative_indices_and_homogeneous_coordinates(tmp_path):
+    obj_path = write_obj(tmp_path / 'relative.obj', 'v 0 0 0 1\nv 1 0 0 1\nv 1 0 1 1\nf -3 -2 -1\n'
+                                                    'v 0 0 1 1\nf -4 -2 -1\n')
+    vertices, indices, face_counts = read_obj(obj_path)
+    assert vertices.tolist() == [0, 0, 0, 1, 0, 0, 1, 0, 1, 0, 0, 1]
+    assert indices.tolist() == [0, 1, 2, 0, 2, 3]
+    assert face_counts.tolist() == [3, 3]
+
+
+@pytest.mark.parametrize('text', ['v 0 0 0\nv 1 0 0\nf 1 2 3\n', 'v 0 0 0\nv 1 0 0\nv 1 x 1\nf 1 2 3\n'])
+def test_invalid_files(tmp_path, text):
+    obj_path = write_obj(tmp_path / 'invalid.obj', text)
+    with pytest.raises(ValueError, match='invalid.obj'):
+        read_obj(obj_path)
+
+
+def test_same_shape_as_path_constructor(tmp_path):
+    # indented records with a trailing comment and CRLF line endings, as in bench_obj_loader.py
+    with open(asset_file('building_parcel.obj'), 'r') as f:
+        lines = f.read().splitlines()
+    commented_path = write_obj(tmp_path / 'commented_parcel.obj', ''.join(
+        f'  {line} # comment\n' if line and not line.startswith('#') else f'{line}\n' for line in lines), '\r\n')
+
+    for obj_path in (asset_file('building_parcel.obj'), commented_path):
+        coordinates, faces = face_coordinates(make_initial_shape(*read_obj(obj_path)))
+        path_coordinates, path_faces = face_coordinates(pyprt.InitialShape(obj_path))
+        assert np.array_equal(coordinates, path_coordinates)
+        assert faces == path_faces
+
+
+def test_cache(tmp_path):
+    obj_path = write_obj(tmp_path / 'triangle.obj', 'v 0 0 0\nv 1 0 0\nv 1 0 1\nf 1 2 3\n')
+    cache_dir = str(tmp_path / 'obj_cache')
+    obj_cache = ObjShapeCache(cache_dir)
+    for arrays in (obj_cache.load(obj_path), obj_cache.load(obj_path)):
+        assert [array.tolist() for array in arrays] == [array.tolist() for array in read_obj(obj_path)]
+    assert (obj_cache.hits, obj_cache.misses) == (1, 1)
+
+    # a touched but unchanged file is hashed again and still hits, the index is persisted
+    stat = os.stat(obj_path)
+    os.utime(obj_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    obj_cache = ObjShapeCache(cache_dir)
+    obj_cache.load(obj_path)
+    assert (obj_cache.hits, obj_cache.misses) == (1, 0)
+
+    write_obj(obj_path, 'v 0 0 0\nv 2 0 0\nv 2 0 2\nf 1 2 3\n')
+    assert obj_cache.load(obj_path)[0].tolist() == [0, 0, 0, 2, 0, 0, 2, 0, 2]
+    assert obj_cache.stats()['entries'] == 2
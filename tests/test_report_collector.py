@@ -0,0 +1,92 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+import numpy as np
+import pytest
+
+from report_collector import SHAPE_INDEX_COLUMN, ReportCollector
+
+
+def test_columns_and_growth():
+    collector = ReportCollector(initial_capacity=2)
+    for k in range(5):
+        collector.append({'Area_sum': 10.0 * k, 'Count_n': k, 'Valid': k % 2 == 0}, k, height=float(k))
+    assert len(collector) == 5
+    columns = collector.to_dict()
+    assert columns[SHAPE_INDEX_COLUMN].tolist() == [0, 1, 2, 3, 4]
+    assert columns['height'].dtype == np.float64 and columns['height'].tolist() == [0, 1, 2, 3, 4]
+    assert columns['Area_sum'].tolist() == [0, 10, 20, 30, 40]
+    # int report values are stored as float
+    assert columns['Count_n'].dtype == np.float64
+    assert columns['Valid'].dtype == np.bool_ and columns['Valid'].tolist() == [True, False, True, False, True]
+
+
+def test_key_filter():
+    collector = ReportCollector(key_filter=lambda key: key.endswith('_sum'))
+    collector.append({'Area_sum': 1.0, 'Area_avg': 1.0}, 0)
+    collector.append({'Area_sum': 2.0, 'Area_avg': 2.0, 'Floor_sum': 3.0, 'Floor_avg': 3.0}, 1)
+    columns = collector.to_dict()
+    assert sorted(columns) == ['Area_sum', 'Floor_sum', SHAPE_INDEX_COLUMN]
+    assert np.isnan(columns['Floor_sum'][0]) and columns['Floor_sum'][1] == 3.0
+
+
+def test_missing_values():
+    collector = ReportCollector()
+    collector.append({'Area_sum': 1.0, 'Valid': True}, 0)
+    collector.append({}, 1)
+    columns = collector.to_dict()
+    assert columns['Area_sum'][0] == 1.0 and np.isnan(columns['Area_sum'][1])
+    # a bool column cannot hold a missing value
+    assert columns['Valid'].dtype == object and columns['Valid'].tolist() == [True, None]
+
+
+@pytest.mark.parametrize('values', [[1.0, 'high'], [True, 2.5], ['low', 3.0]])
+def test_type_changes(values):
+    collector = ReportCollector()
+    for k, value in enumerate(values):
+        collector.append({'Level': value}, k)
+    column = collector.to_dict()['Level']
+    assert column.dtype == object
+    assert column.tolist() == values and [type(value) for value in column] == [type(value) for value in values]
+
+
+def test_late_and_missing_params():
+    collector = ReportCollector()
+    collector.append({'Area_sum': 1.0}, 0, height=10.0)
+    collector.append({'Area_sum': 2.0}, 0, height=20.0, mode='linear')
+    collector.append({'Area_sum': 3.0}, 0, mode='logarithmic')
+    collector.append({'Area_sum': 4.0}, 0, mode='linear', height=40.0)
+    columns = collector.to_dict()
+    assert np.array_equal(columns['height'], [10.0, 20.0, np.nan, 40.0], equal_nan=True)
+    assert columns['mode'].tolist() == [None, 'linear', 'logarithmic', 'linear']
+
+
+def test_dataframe_shares_the_columns():
+    collector = ReportCollector()
+    collector.append({'Area_sum': 1.0}, 0)
+    df = collector.to_dataframe()
+    assert list(df.columns) == [SHAPE_INDEX_COLUMN, 'Area_sum']
+    assert np.shares_memory(df['Area_sum'].to_numpy(), collector.columns['Area_sum'])
+
+
+def test_parquet(tmp_path):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    collector = ReportCollector()
+    collector.append({'Area_sum': 1.0, 'Text': 'a'}, 0, height=10.0)
+    collector.append({'Area_sum': 2.0, 'Text': 'b'}, 1, height=20.0)
+    collector.write_parquet(str(tmp_path / 'reports.parquet'))
+    table = pyarrow_parquet.read_table(str(tmp_path / 'reports.parquet'))
+    assert table.to_pydict() == {SHAPE_INDEX_COLUMN: [0, 1], 'height': [10.0, 20.0], 'Area_sum': [1.0, 2.0],
+                                 'Text': ['a', 'b']}
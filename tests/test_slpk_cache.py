@@ -0,0 +1,101 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+import os
+import threading
+
+from slpk_cache import SlpkCache, make_cache_key
+
+OPTIONS = {'sceneType': 'Local', 'baseName': 'upload', 'outputPath': '/tmp/a'}
+
+
+def write_slpk(tmp_path, name, size):
+    slpk_path = tmp_path / f'{name}.slpk'
+    slpk_path.write_bytes(b'x' * size)
+    return str(slpk_path)
+
+
+def test_cache_key():
+    key = make_cache_key('upload', 100.2, 200.4, 0.0, 'rpk', OPTIONS)
+    # the coordinates are rounded to the precision, the output location and name are ignored
+    assert make_cache_key('upload', 99.9, 199.6, 0.3, 'rpk', dict(OPTIONS, baseName='other', outputPath='/b')) == key
+    assert make_cache_key('upload', 100.2, 200.4, 0.0, 'rpk', dict(OPTIONS, sceneType='Global')) != key
+    assert make_cache_key('upload', 101.0, 200.4, 0.0, 'rpk', OPTIONS) != key
+    assert (make_cache_key('upload', 101.0, 200.4, 0.0, 'rpk', OPTIONS, precision=10.0)
+            == make_cache_key('upload', 100.2, 200.4, 0.0, 'rpk', OPTIONS, precision=10.0))
+    assert make_cache_key('other', 100.2, 200.4, 0.0, 'rpk', OPTIONS) != key
+    assert make_cache_key('upload', 100.2, 200.4, 0.0, 'other', OPTIONS) != key
+
+
+def test_put_and_get(tmp_path):
+    cache = SlpkCache(str(tmp_path / 'cache'), max_bytes=1000)
+    assert cache.get('a') is None
+    slpk_path = write_slpk(tmp_path, 'a', 100)
+    cache.put('a', slpk_path, 'portal_a')
+    assert not os.path.exists(slpk_path)
+
+    entry = cache.get('a')
+    assert entry['portal_id'] == 'portal_a' and entry['size'] == 100
+    assert os.path.getsize(entry['file']) == 100
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hitRate': 0.5, 'entries': 1, 'bytes': 100, 'maxBytes': 1000}
+
+
+def test_lru_eviction(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    cache = SlpkCache(cache_dir, max_bytes=250)
+    for key in ('a', 'b'):
+        cache.put(key, write_slpk(tmp_path, key, 100), f'portal_{key}')
+    # 'a' becomes the most recently used entry, 'b' is evicted
+    cache.get('a')
+    cache.put('c', write_slpk(tmp_path, 'c', 100), 'portal_c')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert sorted(os.listdir(cache_dir)) == ['a.slpk', 'c.slpk', 'index.json']
+
+
+def test_too_large_slpk(tmp_path):
+    cache = SlpkCache(str(tmp_path / 'cache'), max_bytes=50)
+    slpk_path = write_slpk(tmp_path, 'large', 100)
+    cache.put('large', slpk_path, 'portal_large')
+    assert os.path.exists(slpk_path)
+    assert cache.get('large') is None and cache.stats()['entries'] == 0
+
+
+def test_persisted_index(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    cache = SlpkCache(cache_dir, max_bytes=1000)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, write_slpk(tmp_path, key, 100), f'portal_{key}')
+    cache.get('a')
+    cache.put('d', write_slpk(tmp_path, 'd', 100), 'portal_d')
+    # the entries whose SLPK was removed are dropped
+    os.remove(os.path.join(cache_dir, 'c.slpk'))
+
+    reloaded = SlpkCache(cache_dir, max_bytes=1000)
+    assert list(reloaded.entries) == ['b', 'a', 'd']
+    assert reloaded.get('b')['portal_id'] == 'portal_b'
+
+
+def test_concurrent_puts(tmp_path):
+    cache = SlpkCache(str(tmp_path / 'cache'), max_bytes=1000)
+    slpk_paths = [write_slpk(tmp_path, f'slpk_{k}', 100) for k in range(20)]
+    threads = [threading.Thread(target=cache.put, args=(f'key_{k}', slpk_path, f'portal_{k}'))
+               for k, slpk_path in enumerate(slpk_paths)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()['entries'] == 10 and cache.total_bytes() == 1000
+    assert len(os.listdir(cache.cache_dir)) == 11
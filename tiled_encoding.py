@@ -0,0 +1,166 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Spatially tiled encoding of large initial shape sets, e.g. the features of example 10 with the I3S encoder.
+# The shapes are partitioned by a quadtree on the centers of their footprints (xz bounds), a tile is split
+# until it holds at most max_features shapes. The tiles are encoded in parallel worker processes, each one
+# into <outputPath>/<tile>/<baseName>_<tile>.*, so the peak memory of an encoder call is bounded by the tile
+# size instead of the dataset size. SLPKs cannot be merged without encoding them again, the tiles are
+# described by a manifest (<outputPath>/<baseName>_tiles.json) with the extent (source x/y coordinates),
+# shape count, files, size and encoding time of each tile. The time of a single encoder call on all the shapes
+# can be added to the manifest with add_baseline, which records the speedup of the tiled encoding.
+# The shapes are given as shape_data (see batch_generation.py and feature_shapes.shape_data_from_ragged), the
+# footprints of the path shapes are read from the files, which must be OBJ files.
+#
+# Example:
+#   shapes, feature_indices = shape_data_from_ragged(*ragged_from_arrow(table.column('geometry')))
+#   manifest = encode_tiled(shapes, attrs, rpk, SLPK_ENCODER, slpk_encoder_options('layer', output_dir))
+
+import os
+import json
+import time
+
+import numpy as np
+import pyprt
+
+from batch_generation import make_initial_shape
+from obj_loader import read_obj
+from rpk_cache import preloaded_executor
+
+MANIFEST_SUFFIX = '_tiles.json'
+
+
+def footprint_bounds(shapes):
+    # (N, 4) bounds (xmin, zmin, xmax, zmax) of the shapes in the PRT xz plane
+    bounds = np.empty((len(shapes), 4))
+    for k, shape in enumerate(shapes):
+        if isinstance(shape, str):
+            if os.path.splitext(shape)[1].lower() != '.obj':
+                raise TypeError(f'Footprint of {shape} unknown, only the OBJ path shapes are supported')
+            vertices = read_obj(shape)[0].reshape(-1, 3)
+        elif isinstance(shape, tuple):
+            vertices = np.asarray(shape[0], dtype=np.float64).reshape(-1, 3)
+        else:
+            raise TypeError(f'Footprint of {type(shape).__name__} unknown, the shapes must be given as shape_data')
+        if len(vertices) == 0:
+            raise ValueError(f'Shape {k} has no vertices')
+        bounds[k, :2] = vertices[:, [0, 2]].min(axis=0)
+        bounds[k, 2:] = vertices[:, [0, 2]].max(axis=0)
+    return bounds
+
+
+def quadtree_tiles(bounds, max_features, max_depth=16):
+    # returns the shape indices of each tile, a shape belongs to the quadrant of the center of its footprint
+    centers = 0.5 * (bounds[:, :2] + bounds[:, 2:])
+    tiles = []
+    if len(centers) == 0:
+        return tiles
+
+    # (shape indices, quadrant bounds, depth)
+    pending = [(np.arange(len(centers)), np.concatenate([centers.min(axis=0), centers.max(axis=0)]), 0)]
+    while pending:
+        indices, (xmin, zmin, xmax, zmax), depth = pending.pop()
+        if len(indices) <= max_features or depth == max_depth:
+            tiles.append(indices)
+            continue
+        x_split = 0.5 * (xmin + xmax)
+        z_split = 0.5 * (zmin + zmax)
+        east = centers[indices, 0] >= x_split
+        south = centers[indices, 1] >= z_split
+        for is_east, is_south in ((False, False), (True, False), (False, True), (True, True)):
+            in_quadrant = (east == is_east) & (south == is_south)
+            if in_quadrant.any():
+                quadrant = (x_split if is_east else xmin, z_split if is_south else zmin,
+                            xmax if is_east else x_split, zmax if is_south else z_split)
+                pending.append((indices[in_quadrant], quadrant, depth + 1))
+    return tiles
+
+
+def encode_tile(tile_name, shapes, attrs, rpk, encoder, encoder_options):
+    # runs in a worker process, returns the manifest entry of the tile without its extent
+    tile_dir = os.path.join(encoder_options['outputPath'], tile_name)
+    os.makedirs(tile_dir, exist_ok=True)
+    tile_options = dict(encoder_options, outputPath=tile_dir, baseName=f"{encoder_options['baseName']}_{tile_name}")
+
+    start = time.perf_counter()
+    model_generator = pyprt.ModelGenerator([make_initial_shape(shape) for shape in shapes])
+    model_generator.generate_model(attrs, rpk, encoder, tile_options)
+    seconds = time.perf_counter() - start
+
+    files = sorted(os.path.join(tile_name, name) for name in os.listdir(tile_dir))
+    return {
+        'name': tile_name,
+        'features': len(shapes),
+        'files': files,
+        'bytes': sum(os.path.getsize(os.path.join(encoder_options['outputPath'], file)) for file in files),
+        'seconds': seconds
+    }
+
+
+def encode_tiled(shapes, attrs, rpk, encoder, encoder_options, max_features=1000, max_workers=None):
+    # shapes: list of shape_data, attrs: one dictionary per shape or a single one for all the shapes
+    # encoder_options must contain outputPath and baseName, returns the manifest (also written to the output path)
+    if len(attrs) != 1 and len(attrs) != len(shapes):
+        raise ValueError('Expected one shape attribute dictionary per initial shape or a single one for all.')
+
+    bounds = footprint_bounds(shapes)
+    tiles = quadtree_tiles(bounds, max_features)
+    # the largest tiles are submitted first, the small ones fill the gaps at the end
+    order = sorted(range(len(tiles)), key=lambda k: len(tiles[k]), reverse=True)
+    max_workers = max_workers if max_workers else os.cpu_count()
+
+    start = time.perf_counter()
+    with preloaded_executor([rpk], min(max_workers, max(1, len(tiles)))) as executor:
+        futures = {}
+        for k in order:
+            tile_shapes = [shapes[index] for index in tiles[k].tolist()]
+            tile_attrs = attrs if len(attrs) == 1 else [attrs[index] for index in tiles[k].tolist()]
+            futures[k] = executor.submit(encode_tile, f'{k:04d}', tile_shapes, tile_attrs, rpk, encoder,
+                                         encoder_options)
+
+        tile_entries = []
+        for k, tile_indices in enumerate(tiles):
+            entry = futures[k].result()
+            # extent in source coordinates: (x, y) = (x, -z)
+            xmin, zmin = bounds[tile_indices, :2].min(axis=0)
+            xmax, zmax = bounds[tile_indices, 2:].max(axis=0)
+            entry['extent'] = [float(xmin), float(-zmax), float(xmax), float(-zmin)]
+            tile_entries.append(entry)
+    seconds = time.perf_counter() - start
+
+    manifest = {
+        'baseName': encoder_options['baseName'],
+        'encoder': encoder,
+        'features': len(shapes),
+        'maxFeatures': max_features,
+        'workers': max_workers,
+        'seconds': seconds,
+        'bytes': sum(entry['bytes'] for entry in tile_entries),
+        'tiles': tile_entries
+    }
+    write_manifest(manifest, encoder_options['outputPath'])
+    return manifest
+
+
+def write_manifest(manifest, output_path):
+    with open(os.path.join(output_path, manifest['baseName'] + MANIFEST_SUFFIX), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+
+def add_baseline(manifest, output_path, baseline_seconds):
+    # baseline_seconds: time of a single encoder call on all the shapes
+    manifest['baselineSeconds'] = baseline_seconds
+    manifest['speedup'] = baseline_seconds / manifest['seconds']
+    write_manifest(manifest, output_path)
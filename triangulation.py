@@ -0,0 +1,44 @@
+# Copyright (c) 2012-2024 Esri R&D Center Zurich
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# A copy of the license is available in the repository's LICENSE file.
+
+# Vectorized triangulation of the faces of generated models, used by example 6.
+# A face with k >= 3 vertices becomes a fan of k - 2 triangles around its first vertex (exact for
+# convex faces). Faces with 1 or 2 vertices become a degenerate triangle repeating the last vertex.
+
+import numpy as np
+
+
+def fan_triangulate(indices, face_counts):
+    # indices, face_counts: as returned by GeneratedModel.get_indices() and get_faces()
+    # returns a contiguous (T, 3) int32 array of vertex indices
+    indices = np.asarray(indices, dtype=np.int32)
+    face_counts = np.asarray(face_counts, dtype=np.int64)
+    face_offsets = np.cumsum(face_counts) - face_counts
+
+    triangle_counts = np.where(face_counts >= 3, face_counts - 2, np.minimum(face_counts, 1))
+    triangles_count = int(triangle_counts.sum())
+
+    # face and position in the fan of each triangle
+    triangle_face = np.repeat(np.arange(len(face_counts)), triangle_counts)
+    triangle_first = np.cumsum(triangle_counts) - triangle_counts
+    fan_position = np.arange(triangles_count) - np.repeat(triangle_first, triangle_counts)
+
+    offsets = face_offsets[triangle_face]
+    last = face_counts[triangle_face] - 1
+    triangles = np.empty((triangles_count, 3), dtype=np.int32)
+    triangles[:, 0] = indices[offsets]
+    triangles[:, 1] = indices[offsets + np.minimum(fan_position + 1, last)]
+    triangles[:, 2] = indices[offsets + np.minimum(fan_position + 2, last)]
+    return triangles